@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the VoltWiz application.
+
+Run a benchmark as a module from the project root, e.g.
+``python -m benchmarks.bench_recommendation``.
+"""
@@ -0,0 +1,59 @@
+"""
+Benchmark bulk ranking throughput as the number of worker processes grows.
+
+Ranks every plan of a synthetic catalogue for a file of hour-of-day load
+profiles, once per worker count, each run into a fresh output directory.
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from benchmarks.bench_recommendation import synthetic_plans
+from src.core.bulk_ranking import SHARD_SIZE, BulkRanker
+from src.core.calculator import Provider
+from src.core.savings import SavingsEngine
+
+def default_workers() -> List[int]:
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+def run(plans: int, customers: int, workers: List[int], shard_size: int) -> None:
+    discounts = SavingsEngine([Provider(plan) for plan in synthetic_plans(plans)]).discount_matrix
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        profiles_file = Path(tmp) / "profiles.npy"
+        profiles = np.lib.format.open_memmap(profiles_file, mode="w+", dtype=np.float32, shape=(customers, 24))
+        for start in range(0, customers, shard_size):
+            stop = min(start + shard_size, customers)
+            profiles[start:stop] = rng.gamma(2.0, 0.3 * 365, size=(stop - start, 24))
+        profiles.flush()
+        del profiles
+
+        print(f"{plans} plans, {customers:,} customers, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>8} {'customers/s':>12} {'speedup':>8}")
+        baseline = None
+        for count in workers:
+            ranker = BulkRanker(discounts, shard_size=shard_size, workers=count)
+            report = ranker.run(profiles_file, Path(tmp) / f"out-{count}")
+            baseline = baseline or report.seconds
+            print(f"{count:>8} {report.seconds:>8.2f} {report.customers_per_second:>12,.0f} "
+                  f"{baseline / report.seconds:>7.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel bulk ranking")
+    parser.add_argument("--plans", type=int, default=1_000)
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    args = parser.parse_args()
+    run(args.plans, args.customers, args.workers, args.shard_size)
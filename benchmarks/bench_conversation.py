@@ -0,0 +1,111 @@
+"""
+Benchmark conversation state transitions: the table-driven flow against the
+original if/elif implementation.
+
+Both run complete conversations on bare UserState objects (no state store),
+so only the question and answer dispatch is measured.
+"""
+
+import argparse
+import timeit
+
+from src.core.conversation import DEFAULT_FLOW, ConversationState, UserState
+
+# A full conversation: answers given after each question
+ANSWERS = ["כן", "הנחה בשעות משתנות", "לילה (23:00-7:00)", "אף אחד מהם"]
+# Questions asked plus answers given, including the final move to COMPLETED
+TRANSITIONS = 2 * len(ANSWERS) + 1
+
+def legacy_next_question(state: UserState):
+    """The if/elif chain ConversationHandler.get_next_question used before the flow table."""
+    if state.state == ConversationState.INITIAL:
+        state.state = ConversationState.ASKING_SMART_METER
+        return "האם יש לכם שעון חכם?", [["כן", "לא"]]
+    elif state.state == ConversationState.ASKING_SMART_METER:
+        if state.has_smart_meter:
+            state.state = ConversationState.ASKING_DISCOUNT_TYPE
+            return "איזה סוג הנחה אתם מעדיפים?", [["הנחה קבועה", "הנחה בשעות משתנות"]]
+        else:
+            state.state = ConversationState.ASKING_VENDOR
+            return "האם אתם לקוחות של אחת מהחברות הבאות?", [["הוט", "אמישראגז", "אף אחד מהם"]]
+    elif state.state == ConversationState.ASKING_DISCOUNT_TYPE:
+        if state.discount_type == "variable":
+            state.state = ConversationState.ASKING_TIME_PREFERENCE
+            return "באיזו שעות אתם מעדיפים את ההנחה?", [["יום (7:00-17:00)", "לילה (23:00-7:00)"]]
+        else:
+            state.state = ConversationState.ASKING_VENDOR
+            return "האם אתם לקוחות של אחת מהחברות הבאות?", [["הוט", "אמישראגז", "אף אחד מהם"]]
+    elif state.state == ConversationState.ASKING_TIME_PREFERENCE:
+        state.state = ConversationState.ASKING_VENDOR
+        return "האם אתם לקוחות של אחת מהחברות הבאות?", [["הוט", "אמישראגז", "אף אחד מהם"]]
+    elif state.state == ConversationState.ASKING_VENDOR:
+        state.state = ConversationState.COMPLETED
+        return None, None
+
+def legacy_process_answer(state: UserState, answer: str):
+    """The if/elif chain ConversationHandler.process_answer used before the flow table."""
+    if state.state == ConversationState.ASKING_SMART_METER:
+        answer = answer.lower()
+        if answer in ['כן', 'yes', 'y', 'true']:
+            state.has_smart_meter = True
+        elif answer in ['לא', 'no', 'n', 'false']:
+            state.has_smart_meter = False
+        else:
+            return "לא הבנתי. אנא בחר 'כן' או 'לא'."
+        return None
+    elif state.state == ConversationState.ASKING_DISCOUNT_TYPE:
+        if answer == "הנחה קבועה":
+            state.discount_type = "fixed"
+        elif answer == "הנחה בשעות משתנות":
+            state.discount_type = "variable"
+        else:
+            return "אנא בחר אחת מהאפשרויות המוצגות."
+        return None
+    elif state.state == ConversationState.ASKING_TIME_PREFERENCE:
+        if answer == "יום (7:00-17:00)":
+            state.time_preference = "day"
+        elif answer == "לילה (23:00-7:00)":
+            state.time_preference = "night"
+        else:
+            return "אנא בחר אחת מהאפשרויות המוצגות."
+        return None
+    elif state.state == ConversationState.ASKING_VENDOR:
+        if answer == "הוט":
+            state.vendor = "hot"
+        elif answer == "אמישראגז":
+            state.vendor = "amisragaz"
+        elif answer == "אף אחד מהם":
+            state.vendor = "none"
+        else:
+            return "אנא בחר אחת מהאפשרויות המוצגות."
+        return None
+    return None
+
+def converse(next_question, process_answer, answers):
+    state = UserState()
+    next_question(state)
+    for answer in answers:
+        process_answer(state, answer)
+        next_question(state)
+    assert state.state == ConversationState.COMPLETED
+
+def run(conversations: int, repeat: int) -> None:
+    callback_codes = ["m1", "d2", "t2", "v0"]
+    variants = [
+        ("if/elif chain", legacy_next_question, legacy_process_answer, ANSWERS),
+        ("flow table", DEFAULT_FLOW.advance, DEFAULT_FLOW.apply_answer, ANSWERS),
+        ("flow table, codes", DEFAULT_FLOW.advance, DEFAULT_FLOW.apply_answer, callback_codes),
+    ]
+    print(f"{'implementation':<20} {'transitions/s':>14} {'per conversation (us)':>22}")
+    for name, next_question, process_answer, answers in variants:
+        seconds = min(timeit.repeat(
+            lambda: converse(next_question, process_answer, answers), number=conversations, repeat=repeat
+        )) / conversations
+        print(f"{name:<20} {TRANSITIONS / seconds:>14,.0f} {seconds * 1e6:>22.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark conversation transitions")
+    parser.add_argument("--conversations", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.conversations, args.repeat)
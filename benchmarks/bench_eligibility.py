@@ -0,0 +1,72 @@
+"""
+Benchmark eligibility filtering: the three-pass list scan, the PlanTable NumPy
+masks and the PlanBitsets ANDs, at catalogue sizes up to a million plans.
+
+Each method finds the best plan for the complete answers of every preference
+in PREFERENCES. Building the PlanTable and the bitsets is timed separately.
+"""
+
+import argparse
+import time
+import timeit
+from typing import Dict, List
+
+from benchmarks.bench_recommendation import PREFERENCES, scan_recommendation, synthetic_plans, user_window
+from src.core.bitsets import PlanBitsets
+from src.core.calculator import PREFERENCE_FIELDS, Provider
+from src.core.plan_table import PlanTable
+
+def preference_answers(user_prefs: Dict) -> List:
+    """
+    The (field, answer) pairs a conversation records for the preferences.
+    """
+    return [
+        (field, user_prefs[field]) for field in PREFERENCE_FIELDS
+        if field != "time_preference" or user_prefs["discount_type"] == "variable"
+    ]
+
+def bitset_recommendation(bitsets: PlanBitsets, answers: List, window):
+    mask = bitsets.all
+    for field, value in answers:
+        mask &= bitsets.answer_mask(field, value)
+    return bitsets.best(mask, window)
+
+def build_time(build) -> float:
+    start = time.perf_counter()
+    build()
+    return time.perf_counter() - start
+
+def run(sizes: List[int], repeat: int) -> None:
+    print(f"{'plans':>10} {'scan (us)':>12} {'numpy (us)':>12} {'bitsets (us)':>13} "
+          f"{'table build (s)':>16} {'bitset build (s)':>17}")
+    for size in sizes:
+        providers = [Provider(plan) for plan in synthetic_plans(size)]
+        table_seconds = build_time(lambda: PlanTable.from_providers(providers))
+        bitset_seconds = build_time(lambda: PlanBitsets(providers))
+        table = PlanTable.from_providers(providers)
+        bitsets = PlanBitsets(providers)
+        answers = [preference_answers(prefs) for prefs in PREFERENCES]
+        windows = [user_window(prefs) for prefs in PREFERENCES]
+
+        for prefs, prefs_answers, window in zip(PREFERENCES, answers, windows):
+            expected = scan_recommendation(providers, prefs)
+            assert bitset_recommendation(bitsets, prefs_answers, window) is expected
+            row = table.best(table.mask(prefs), window)
+            assert (None if row is None else providers[row]) is expected
+
+        def per_call(function, number):
+            return timeit.timeit(function, number=number) / (number * len(PREFERENCES))
+
+        # Fewer repetitions for the slow methods keep large catalogues practical
+        scan = per_call(lambda: [scan_recommendation(providers, p) for p in PREFERENCES], repeat)
+        numpy = per_call(lambda: [table.best(table.mask(p), w) for p, w in zip(PREFERENCES, windows)], repeat * 10)
+        bits = per_call(lambda: [bitset_recommendation(bitsets, a, w) for a, w in zip(answers, windows)], repeat * 10)
+        print(f"{size:>10} {scan * 1e6:>12.0f} {numpy * 1e6:>12.1f} {bits * 1e6:>13.1f} "
+              f"{table_seconds:>16.2f} {bitset_seconds:>17.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark eligibility filtering")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
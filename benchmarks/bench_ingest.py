@@ -0,0 +1,65 @@
+"""
+Benchmark smart-meter export ingestion: parse throughput in rows per second
+and the memory it takes, for a synthetic multi-year 15-minute export.
+"""
+
+import argparse
+import resource
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from src.core.meter_data import MeterStore, ingest
+
+PREAMBLE = (
+    "שם לקוח,ישראל ישראלי\n"
+    "כתובת,הרצל 1 תל אביב\n"
+    "מספר מונה,12345678\n"
+    "\n"
+    'תאריך,מועד תחילת הפעימה,"צריכה בקוט""ש"\n'
+)
+
+def write_export(path: Path, days: int, seed: int = 0) -> int:
+    """
+    Write an IEC-style export with a 15-minute reading for every interval of the given days.
+
+    Returns:
+        The number of readings written
+    """
+    rng = np.random.default_rng(seed)
+    starts = [f"{hour:02d}:{minute:02d}" for hour in range(24) for minute in (0, 15, 30, 45)]
+    day = date(2021, 1, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(PREAMBLE)
+        for _ in range(days):
+            label = day.strftime("%d/%m/%Y")
+            values = rng.gamma(2.0, 0.08, size=len(starts))
+            f.write("".join(f"{label},{start},{value:.3f}\n" for start, value in zip(starts, values)))
+            day += timedelta(days=1)
+    return days * len(starts)
+
+def run(days: int, chunk_rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        export = Path(tmp) / "customer.csv"
+        rows = write_export(export, days)
+        size = export.stat().st_size
+        store = MeterStore(Path(tmp) / "profiles")
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report = ingest(export, store, chunk_rows=chunk_rows)
+        growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+        _, profile = store.load(report.customer)
+        assert report.rows == rows and len(profile) == days * 24
+
+    print(f"{'rows':>10} {'file (MB)':>10} {'seconds':>8} {'rows/s':>11} {'MB/s':>7} "
+          f"{'profile (KB)':>13} {'peak RSS growth (MB)':>21}")
+    print(f"{rows:>10} {size / 2**20:>10.1f} {report.seconds:>8.2f} {report.rows_per_second:>11,.0f} "
+          f"{size / 2**20 / report.seconds:>7.1f} {profile.nbytes / 1024:>13.0f} {growth / 1024:>21.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark meter export ingestion")
+    parser.add_argument("--days", type=int, default=3 * 365, help="Days of 15-minute readings in the export")
+    parser.add_argument("--chunk-rows", type=int, default=65_536)
+    args = parser.parse_args()
+    run(args.days, args.chunk_rows)
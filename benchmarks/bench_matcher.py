@@ -0,0 +1,108 @@
+"""
+Benchmark free-text answer matching on a corpus of noisy answers.
+
+The corpus is built from each question's labels and synonyms with random
+noise: case changes, punctuation, filler words and single-character typos
+(insertions, deletions, substitutions and swaps). Reports messages per second
+and how many answers were understood correctly, misread or not understood, for
+the flow's exact button decoding and for the AnswerMatcher.
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, List, Tuple
+
+from src.core.answer_matcher import DATA_DIR, AnswerMatcher
+from src.core.conversation import _MISSING, DEFAULT_FLOW, ConversationState
+from src.core.registry import VENDORS
+
+FILLERS = ["please", "בבקשה", "I think", "אני חושב", "thanks", "תודה"]
+LETTERS = "abcdefghijklmnopqrstuvwxyzאבגדהוזחטיכלמנסעפצקרשת"
+
+def typo(rng: random.Random, text: str) -> str:
+    """
+    Apply one random single-character edit to text.
+    """
+    i = rng.randrange(len(text))
+    kind = rng.randrange(4)
+    if kind == 0:
+        return text[:i] + rng.choice(LETTERS) + text[i:]
+    if kind == 1:
+        return text[:i] + text[i + 1:]
+    if kind == 2:
+        return text[:i] + rng.choice(LETTERS) + text[i + 1:]
+    if i == len(text) - 1:
+        i -= 1
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+def noisy(rng: random.Random, phrase: str) -> str:
+    """
+    A typed variant of phrase.
+    """
+    text = phrase
+    if rng.random() < 0.3:
+        text = text.upper() if rng.random() < 0.5 else text.title()
+    if rng.random() < 0.4 and len(text.replace(" ", "")) >= 5:
+        text = typo(rng, text)
+    if rng.random() < 0.3:
+        text = text + rng.choice(["!", "?", ".", " :)", "!!"])
+    if rng.random() < 0.2:
+        text = f"{text} {rng.choice(FILLERS)}" if rng.random() < 0.5 else f"{rng.choice(FILLERS)} {text}"
+    if rng.random() < 0.2:
+        text = f"  {text} "
+    return text
+
+def corpus(size: int, seed: int = 0) -> List[Tuple[ConversationState, str, Any]]:
+    """
+    size (state, typed answer, intended value) triples.
+    """
+    with open(DATA_DIR / 'answer_synonyms.json', 'r', encoding='utf-8') as f:
+        synonyms = json.load(f)
+    phrases = []
+    for state, step in DEFAULT_FLOW.steps.items():
+        phrases.extend((state, choice.label, choice.value) for row in step.choices for choice in row)
+        for entry in synonyms.get(step.field, []):
+            phrases.extend((state, phrase, entry["value"]) for phrase in entry["phrases"])
+        if step.field == "vendor":
+            phrases.extend((state, VENDORS.name(value), value) for value in step.values if isinstance(value, int))
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(size):
+        state, phrase, value = rng.choice(phrases)
+        samples.append((state, noisy(rng, phrase), value))
+    return samples
+
+def exact_decode(state: ConversationState, text: str) -> Tuple[bool, Any]:
+    """
+    Baseline: only buttons and aliases, as before free-text matching.
+    """
+    value = DEFAULT_FLOW.steps[state].decode(text)
+    return (False, None) if value is _MISSING else (True, value)
+
+def evaluate(name: str, match: Callable[[ConversationState, str], Tuple[bool, Any]],
+             samples: List[Tuple[ConversationState, str, Any]]) -> None:
+    start = time.perf_counter()
+    results = [match(state, text) for state, text, _ in samples]
+    elapsed = time.perf_counter() - start
+    correct = sum(found and value == expected for (found, value), (_, _, expected) in zip(results, samples))
+    wrong = sum(found and value != expected for (found, value), (_, _, expected) in zip(results, samples))
+    missed = len(samples) - correct - wrong
+    print(f"{name:<14} {len(samples) / elapsed:>12,.0f} {elapsed / len(samples) * 1e6:>8.2f} "
+          f"{100 * correct / len(samples):>8.1f}% {100 * wrong / len(samples):>6.1f}% {100 * missed / len(samples):>7.1f}%")
+
+def run(size: int) -> None:
+    samples = corpus(size)
+    start = time.perf_counter()
+    matcher = AnswerMatcher.from_files()
+    print(f"matcher compiled in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    print(f"{'matcher':<14} {'messages/s':>12} {'us/msg':>8} {'correct':>9} {'wrong':>7} {'missed':>8}")
+    evaluate("exact buttons", exact_decode, samples)
+    evaluate("AnswerMatcher", matcher.match, samples)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark free-text answer matching")
+    parser.add_argument("--size", type=int, default=200_000, help="Noisy answers in the corpus")
+    args = parser.parse_args()
+    run(args.size)
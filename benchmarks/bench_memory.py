@@ -0,0 +1,68 @@
+"""
+Benchmark the memory footprint of plan representations.
+
+Compares a list of dict-backed plan objects (the original Provider layout),
+a list of __slots__ Provider objects, and a columnar PlanTable, by the memory
+each holds once built and the peak reached while building it (which includes
+the parsed JSON).
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from benchmarks.bench_recommendation import synthetic_plans
+from src.core.calculator import Provider
+from src.core.plan_table import PlanTable
+
+class DictProvider:
+    """
+    The original Provider layout: a per-instance __dict__ and list hours.
+    """
+    def __init__(self, data):
+        self.name = data['name']
+        self.vendor = data['vendor']
+        self.discount_pct = data['discount_pct']
+        self.hours = data['hours']
+        self.requires_smart_meter = data['requires_smart_meter']
+
+def measure(build):
+    """
+    Memory in bytes held by a built structure, and the peak while building it.
+
+    Returns:
+        (held, peak) byte counts
+    """
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = build()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return held, peak
+
+def run(count: int) -> None:
+    """
+    Print the memory held and peak of each representation for a catalogue of count plans.
+    """
+    # Every representation is built from a fresh parse, as when loading providers.json
+    raw = json.dumps({"providers": synthetic_plans(count)})
+
+    results = {
+        "dict objects": measure(lambda: [DictProvider(p) for p in json.loads(raw)["providers"]]),
+        "__slots__ objects": measure(lambda: [Provider(p) for p in json.loads(raw)["providers"]]),
+        "PlanTable": measure(lambda: PlanTable(json.loads(raw)["providers"])),
+    }
+
+    print(f"{count:,} plans")
+    for label, (held, peak) in results.items():
+        print(f"  {label:<18} {held / 2**20:>8.1f} MiB  {held / count:>6.1f} B/plan"
+              f"  (peak {peak / 2**20:.1f} MiB)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark plan representation memory")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.count)
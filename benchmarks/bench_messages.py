@@ -0,0 +1,79 @@
+"""
+Benchmark formatting recommendation messages: the original f-string built on
+every call against assembling the pre-rendered per-plan fragments.
+
+The message cache is bypassed, so every call formats a message; the segment
+statistics both implementations read are the same.
+"""
+
+import argparse
+import timeit
+from typing import Dict, List, Tuple
+
+from benchmarks.bench_recommendation import load_calculator, synthetic_plans
+from src.core.calculator import Provider, ProviderCalculator
+from src.core.message_templates import hours_description
+from src.core.stats import preference_score
+
+def legacy_format_recommendation(calculator: ProviderCalculator, provider: Provider, user_prefs: Dict) -> str:
+    """The f-string ProviderCalculator.format_recommendation built before the fragment templates."""
+    hours_desc = hours_description(provider)
+
+    segment, window = calculator._eligible_segment(calculator.catalogue, user_prefs)
+    score = preference_score(provider, window)
+    savings_vs_avg = score - segment.mean
+    better_than = segment.better_than(score)
+
+    return (
+        f"✅ *הספק המומלץ: {provider.vendor} - {provider.name}*\n\n"
+        f"📊 *פרטי התוכנית:*\n"
+        f"- הנחה: {provider.discount_pct}%\n"
+        f"- שעות: {hours_desc}\n"
+        f"- דורש שעון חכם: {'כן' if provider.requires_smart_meter else 'לא'}\n\n"
+        f"💰 *יתרונות התוכנית:*\n"
+        f"- הנחה {'גבוהה יותר' if savings_vs_avg >= 0 else 'נמוכה'} מהממוצע ב-{abs(savings_vs_avg):.1f}%\n"
+        f"- טובה יותר מ-{better_than:.0f}% מהתוכניות המתאימות לך\n"
+        f"- {'הנחה קבועה' if provider.hours is None else 'הנחה בשעות מועדפות'}\n\n"
+        f"ℹ️ *הצעדים הבאים:*\n"
+        f"- צור קשר עם {provider.vendor} להרשמה לתוכנית '{provider.name}'\n"
+        f"- {'התקן שעון חכם' if provider.requires_smart_meter else 'אין צורך בשעון חכם'}\n"
+        f"- {'התאם את צריכת החשמל לשעות ההנחה' if provider.hours is not None else 'הנחה קבועה לאורך כל היום'}"
+    )
+
+def workload(calculator: ProviderCalculator, count: int) -> List[Tuple[Provider, Dict]]:
+    """
+    Plans paired with preferences they are eligible for, cycling through the catalogue.
+    """
+    pairs = []
+    for i in range(count):
+        provider = calculator.providers[i % len(calculator.providers)]
+        pairs.append((provider, {
+            "has_smart_meter": True,
+            "discount_type": "fixed" if provider.hours is None else "variable",
+            "time_preference": "day",
+            "vendor": provider.vendor,
+        }))
+    return pairs
+
+def run(sizes: List[int], messages: int, repeat: int) -> None:
+    print(f"{'plans':>8} {'f-string msg/s':>15} {'fragments msg/s':>16} {'speedup':>8}")
+    for size in sizes:
+        calculator = load_calculator(synthetic_plans(size))
+        pairs = workload(calculator, messages)
+        for provider, prefs in pairs[:100]:
+            assert calculator.format_recommendation(provider, prefs) == \
+                legacy_format_recommendation(calculator, provider, prefs)
+
+        legacy = min(timeit.repeat(
+            lambda: [legacy_format_recommendation(calculator, p, u) for p, u in pairs], number=1, repeat=repeat))
+        templated = min(timeit.repeat(
+            lambda: [calculator.format_recommendation(p, u) for p, u in pairs], number=1, repeat=repeat))
+        print(f"{size:>8} {messages / legacy:>15,.0f} {messages / templated:>16,.0f} {legacy / templated:>7.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recommendation message formatting")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000])
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.messages, args.repeat)
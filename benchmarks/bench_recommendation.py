@@ -0,0 +1,151 @@
+"""
+Benchmark recommendation latency of the indexed calculator against a linear scan.
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import timeit
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.core.calculator import DEFAULT_RANKING, Provider, ProviderCalculator, Ranking
+from src.core.windows import preference_window, window_overlap
+
+VENDORS = ["PazGaz", "Bezeq", "Cellcom", "HOT", "AmisraGaz", "Partner", "Electra"]
+HOURS = [None, [7, 17], [23, 7], [14, 20], [17, 23]]
+PLAN_NAMES = ["Fixed", "Day", "Night", "Savings", "Work From Home", "Family Savings", "Power", "Nightlife"]
+
+PREFERENCES = [
+    {"has_smart_meter": True, "discount_type": "variable", "time_preference": "night", "vendor": "none"},
+    {"has_smart_meter": True, "discount_type": "variable", "time_preference": "day", "vendor": "hot"},
+    {"has_smart_meter": True, "discount_type": "fixed", "time_preference": None, "vendor": "amisragaz"},
+    {"has_smart_meter": False, "discount_type": "fixed", "time_preference": None, "vendor": "none"},
+]
+
+def synthetic_plans(count: int, seed: int = 0) -> List[Dict]:
+    """
+    Generate a synthetic plan catalogue.
+
+    Args:
+        count: Number of plans to generate
+        seed: Random seed for reproducibility
+
+    Returns:
+        A list of plan dictionaries in the providers.json format
+    """
+    rng = random.Random(seed)
+    plans = []
+    for i in range(count):
+        hours = rng.choice(HOURS)
+        plans.append({
+            "name": f"{rng.choice(PLAN_NAMES)} {i % 100}",
+            "vendor": rng.choice(VENDORS),
+            "discount_pct": round(rng.uniform(3, 25), 1),
+            "hours": hours,
+            "requires_smart_meter": hours is not None or rng.random() < 0.2,
+        })
+    return plans
+
+def user_window(user_prefs: Dict) -> Optional[Tuple[int, int]]:
+    """
+    The preferred discount window of the preferences, or None for a fixed discount.
+    """
+    if user_prefs["discount_type"] == "fixed":
+        return None
+    return preference_window(user_prefs["time_preference"])
+
+def scan_recommendation(providers: List[Provider], user_prefs: Dict) -> Optional[Provider]:
+    """
+    Reference implementation: the original three-pass linear scan.
+    """
+    valid = [p for p in providers if (not p.requires_smart_meter or user_prefs["has_smart_meter"])]
+    window = user_window(user_prefs)
+    if window is None:
+        valid = [(p, 1.0) for p in valid if p.hours is None]
+    else:
+        valid = [(p, window_overlap(p.hours, window)) for p in valid if p.hours is not None]
+        valid = [(p, overlap) for p, overlap in valid if overlap]
+    if user_prefs["vendor"] != "none":
+        valid = [(p, overlap) for p, overlap in valid if p.vendor.lower() == user_prefs["vendor"].lower()]
+    if not valid:
+        return None
+    return max(valid, key=lambda entry: entry[0].discount_pct * entry[1])[0]
+
+def load_calculator(plans: List[Dict]) -> ProviderCalculator:
+    """
+    Build a calculator over the given plans via a temporary providers file.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        providers_file = Path(tmp) / "providers.json"
+        with open(providers_file, "w") as f:
+            json.dump({"providers": plans}, f)
+        return ProviderCalculator(str(providers_file))
+
+def run(sizes: List[int], repeat: int) -> None:
+    """
+    Run the benchmark and print per-call latency for each catalogue size.
+    """
+    print(f"{'plans':>10} {'scan (us)':>12} {'index (us)':>12} {'speedup':>10}")
+    for size in sizes:
+        calculator = load_calculator(synthetic_plans(size))
+        providers = calculator.providers
+
+        for prefs in PREFERENCES:
+            assert calculator.get_recommendation(prefs) is scan_recommendation(providers, prefs)
+
+        scan = timeit.timeit(
+            lambda: [scan_recommendation(providers, p) for p in PREFERENCES], number=repeat
+        ) / (repeat * len(PREFERENCES))
+        indexed = timeit.timeit(
+            lambda: [calculator.get_recommendation(p) for p in PREFERENCES], number=repeat * 100
+        ) / (repeat * 100 * len(PREFERENCES))
+
+        print(f"{size:>10} {scan * 1e6:>12.1f} {indexed * 1e6:>12.2f} {scan / indexed:>9.0f}x")
+
+def run_top_k(sizes: List[int], k: int, repeat: int) -> None:
+    """
+    Time uncached top-k rankings against sorting every eligible plan, for the
+    default ranking (merged from the index) and a multi-key one (heap selection).
+    """
+    ranking = Ranking(("smart_meter", "discount"))
+    print(f"{'plans':>10} {'ranking':>12} {'sort (us)':>12} {'top-k (us)':>12} {'speedup':>8}")
+    for size in sizes:
+        calculator = load_calculator(synthetic_plans(size))
+        catalogue = calculator.catalogue
+        # The baseline gets its eligible sets for free and only sorts them
+        eligible_sets = [
+            [p for p in calculator.providers if scan_recommendation([p], prefs) is p] for prefs in PREFERENCES
+        ]
+
+        windows = [user_window(prefs) for prefs in PREFERENCES]
+
+        for name, options in (("discount", {}), ("multi-key", {"ranking": ranking})):
+            sort_keys = [options.get("ranking", DEFAULT_RANKING).sort_key(window) for window in windows]
+
+            def full_sort():
+                for eligible, sort_key in zip(eligible_sets, sort_keys):
+                    sorted(eligible, key=sort_key)[:k]
+
+            def top():
+                for prefs in PREFERENCES:
+                    catalogue.ranked.clear()
+                    calculator.get_top_recommendations(prefs, k, **options)
+
+            for prefs, eligible, sort_key in zip(PREFERENCES, eligible_sets, sort_keys):
+                assert calculator.get_top_recommendations(prefs, k, **options) == sorted(eligible, key=sort_key)[:k]
+            per_call = repeat * len(PREFERENCES)
+            sort = timeit.timeit(full_sort, number=repeat) / per_call
+            selected = timeit.timeit(top, number=repeat) / per_call
+            print(f"{size:>10} {name:>12} {sort * 1e6:>12.0f} {selected * 1e6:>12.1f} {sort / selected:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recommendation latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=10, help="Size of the ranked lists timed after the lookups")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
+    print()
+    run_top_k(args.sizes, args.top_k, args.repeat)
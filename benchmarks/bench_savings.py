@@ -0,0 +1,36 @@
+"""
+Benchmark the vectorised savings engine on large catalogues and annual profiles.
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from benchmarks.bench_recommendation import synthetic_plans
+from src.core.calculator import Provider
+from src.core.savings import SavingsEngine
+
+def run(sizes, hours: int, repeat: int) -> None:
+    """
+    Time engine construction and evaluation of an hourly profile for each catalogue size.
+    """
+    rng = np.random.default_rng(0)
+    profile = rng.gamma(2.0, 0.3, size=hours)
+
+    print(f"{'plans':>8} {'hours':>6} {'build (ms)':>12} {'savings (ms)':>14} {'rank (ms)':>11}")
+    for size in sizes:
+        providers = [Provider(p) for p in synthetic_plans(size)]
+        build = timeit.timeit(lambda: SavingsEngine(providers), number=repeat) / repeat
+        engine = SavingsEngine(providers)
+        savings = timeit.timeit(lambda: engine.savings(profile), number=repeat) / repeat
+        rank = timeit.timeit(lambda: engine.rank(profile, top=10), number=repeat) / repeat
+        print(f"{size:>8} {hours:>6} {build * 1e3:>12.2f} {savings * 1e3:>14.3f} {rank * 1e3:>11.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the savings engine")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000])
+    parser.add_argument("--hours", type=int, default=8760)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    run(args.sizes, args.hours, args.repeat)
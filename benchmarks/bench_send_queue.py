@@ -0,0 +1,110 @@
+"""
+Simulate outgoing message traffic against a flood-limited fake Bot API.
+
+A mix of interactive replies (a reply followed by the next question, to a
+user's chat) and broadcasts (single messages to random chats) is offered at
+a fixed rate. Each message is either sent directly, retrying after every 429,
+or submitted to the SendScheduler. Reports p50/p99 delivery latency per
+priority and how many 429 errors the fake Telegram returned.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+from telegram import Bot
+from telegram.error import RetryAfter
+
+from benchmarks.fake_bot_api import FakeBotAPI
+from src.api.send_queue import BROADCAST, INTERACTIVE, SendScheduler
+from src.utils.metrics import Metrics
+
+INTERACTIVE_CHATS = 200
+BROADCAST_CHATS = 100_000
+
+async def simulate(rate: float, duration: float, scheduled: bool, latency: float,
+                   broadcast_share: float, seed: int = 0) -> Dict:
+    """
+    Offer rate messages per second for duration seconds and wait until all are delivered.
+    """
+    rng = random.Random(seed)
+    api = FakeBotAPI(latency=latency, global_rate=30, chat_rate=1, chat_burst=3)
+    bot = Bot("123:SIM", request=api)
+    await bot.initialize()
+    scheduler = SendScheduler(bot, metrics=Metrics()) if scheduled else None
+    if scheduler:
+        scheduler.start()
+    latencies: Dict[int, List[float]] = {INTERACTIVE: [], BROADCAST: []}
+
+    async def send(chat_id: int, text: str, priority: int, **kwargs):
+        submitted = time.perf_counter()
+        if scheduler:
+            await scheduler.send_message(chat_id, text, priority, **kwargs)
+        else:
+            while True:
+                try:
+                    await bot.send_message(chat_id, text, **kwargs)
+                    break
+                except RetryAfter as error:
+                    await asyncio.sleep(error.retry_after)
+        latencies[priority].append(time.perf_counter() - submitted)
+
+    tasks = []
+    start = time.perf_counter()
+    offered = 0
+    while offered < rate * duration:
+        delay = start + offered / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < broadcast_share:
+            tasks.append(asyncio.create_task(send(rng.randrange(BROADCAST_CHATS) + 1000, "news", BROADCAST)))
+            offered += 1
+        else:
+            chat_id = rng.randrange(INTERACTIVE_CHATS)
+            tasks.append(asyncio.create_task(send(chat_id, "got it", INTERACTIVE)))
+            tasks.append(asyncio.create_task(send(chat_id, "next question?", INTERACTIVE, reply_markup=None)))
+            offered += 2
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    if scheduler:
+        await scheduler.stop()
+    await bot.shutdown()
+
+    return {
+        "offered": offered,
+        "api_calls": len(api.sent_messages()),
+        "flood_errors": api.flood_errors,
+        "elapsed": elapsed,
+        "latencies": latencies,
+    }
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return f"{'-':>8} {'-':>8}"
+    p50, p99 = np.percentile(values, [50, 99])
+    return f"{p50 * 1e3:>8.0f} {p99 * 1e3:>8.0f}"
+
+def run(rates: List[float], duration: float, latency: float, broadcast_share: float) -> None:
+    print(f"{'rate/s':>7} {'mode':>9} {'int p50':>8} {'int p99':>8} {'bc p50':>8} {'bc p99':>8} "
+          f"{'calls':>6} {'429s':>5} {'drain (s)':>10}")
+    for rate in rates:
+        for scheduled in (False, True):
+            result = asyncio.run(simulate(rate, duration, scheduled, latency, broadcast_share))
+            print(f"{rate:>7.0f} {'scheduled' if scheduled else 'direct':>9} "
+                  f"{percentiles(result['latencies'][INTERACTIVE])} {percentiles(result['latencies'][BROADCAST])} "
+                  f"{result['api_calls']:>6} {result['flood_errors']:>5} {result['elapsed']:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate outgoing message scheduling")
+    parser.add_argument("--rates", type=float, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of offered traffic per run")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated Bot API latency in seconds")
+    parser.add_argument("--broadcast-share", type=float, default=0.3)
+    args = parser.parse_args()
+    logging.getLogger("telegram").setLevel(logging.WARNING)
+    logging.getLogger("src.api.send_queue").setLevel(logging.ERROR)
+    run(args.rates, args.duration, args.latency, args.broadcast_share)
@@ -0,0 +1,90 @@
+"""
+Measure bot start-up cost: module import time and catalogue loading.
+
+Import times come from `python -X importtime` in a fresh interpreter, so they
+include everything the import pulls in. Catalogue loading compares parsing and
+indexing the providers JSON against unpickling a precompiled snapshot.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.bench_recommendation import synthetic_plans
+from src.core.calculator import Catalogue
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def import_times(module: str) -> Dict[str, int]:
+    """
+    Import a module in a fresh interpreter under -X importtime.
+
+    Args:
+        module: Dotted module name
+
+    Returns:
+        Cumulative import time in microseconds for every module loaded, keyed by name
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def top_level(times: Dict[str, int]) -> Dict[str, int]:
+    """
+    Cumulative times per top-level package, e.g. 'telegram' for 'telegram.ext'.
+    """
+    packages: Dict[str, int] = {}
+    for name, cumulative in times.items():
+        package = name.split(".")[0]
+        packages[package] = max(packages.get(package, 0), cumulative)
+    return packages
+
+def catalogue_load_times(count: int, repeat: int) -> Dict[str, float]:
+    """
+    Seconds to load a synthetic catalogue of count plans from JSON and from a snapshot.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        providers_file = Path(tmp) / "providers.json"
+        snapshot_file = Path(tmp) / "providers.snapshot"
+        providers_file.write_text(json.dumps({"providers": synthetic_plans(count)}))
+        Catalogue.load(providers_file, snapshot_file)
+        return {
+            "json": min(timeit.repeat(lambda: Catalogue.from_file(providers_file), number=1, repeat=repeat)),
+            "snapshot": min(timeit.repeat(lambda: Catalogue.load(providers_file, snapshot_file), number=1, repeat=repeat)),
+        }
+
+def run(modules: List[str], sizes: List[int], repeat: int, show: int) -> None:
+    for module in modules:
+        times = import_times(module)
+        print(f"import {module}: {times[module] / 1000:.1f} ms")
+        heaviest = sorted(top_level(times).items(), key=lambda item: item[1], reverse=True)[:show]
+        for package, cumulative in heaviest:
+            print(f"  {package:<28} {cumulative / 1000:>8.1f} ms")
+    print()
+    print(f"{'plans':>9} {'json (ms)':>10} {'snapshot (ms)':>14} {'speedup':>8}")
+    for size in sizes:
+        result = catalogue_load_times(size, repeat)
+        print(f"{size:>9,} {result['json'] * 1e3:>10.1f} {result['snapshot'] * 1e3:>14.1f} "
+              f"{result['json'] / result['snapshot']:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark start-up time")
+    parser.add_argument("--modules", nargs="+", default=["src.app", "src.api.telegram_bot"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--show", type=int, default=8, help="Heaviest top-level packages to list")
+    args = parser.parse_args()
+    run(args.modules, args.sizes, args.repeat, args.show)
@@ -0,0 +1,62 @@
+"""
+Benchmark the calendar-aware tariff simulator: compiling a year's discount
+matrix and simulating annual bills of every plan for 15-minute meter series.
+"""
+
+import argparse
+import random
+import time
+import timeit
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.bench_recommendation import synthetic_plans
+from src.core.calculator import WEEKDAYS, Provider
+from src.core.tariffs import TariffSimulator
+
+def calendar_plans(count: int, seed: int = 0) -> List[Dict]:
+    """
+    Synthetic plans, about half of them with weekend, seasonal or holiday rules.
+    """
+    rng = random.Random(seed)
+    plans = synthetic_plans(count, seed)
+    for plan in plans:
+        if rng.random() < 0.5:
+            continue
+        rules = []
+        if rng.random() < 0.5:
+            rules.append({"discount_pct": round(rng.uniform(10, 30), 1), "days": ["fri", "sat"]})
+        if rng.random() < 0.3:
+            rules.append({"discount_pct": 25, "holidays": True})
+        if rng.random() < 0.5:
+            start = rng.randint(5, 8)
+            rules.append({"discount_pct": round(rng.uniform(5, 20), 1),
+                          "months": list(range(start, start + 3)), "days": list(WEEKDAYS[:5])})
+        rules.append({"discount_pct": plan["discount_pct"], "hours": plan["hours"]})
+        plan["rules"] = rules
+    return plans
+
+def run(plans: int, customers: int, year: int, intervals_per_hour: int) -> None:
+    providers = [Provider(plan) for plan in calendar_plans(plans)]
+    simulator = TariffSimulator(providers)
+    start = time.perf_counter()
+    matrix = simulator.discount_matrix(year, intervals_per_hour)
+    compile_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    series = rng.gamma(2.0, 0.3 / intervals_per_hour, size=(customers, matrix.shape[1])).astype(np.float32)
+    seconds = timeit.timeit(lambda: [simulator.bills(s, year) for s in series], number=1) / customers
+    print(f"{'plans':>7} {'intervals':>10} {'matrix (MB)':>12} {'compile (s)':>12} "
+          f"{'per customer (ms)':>18} {'customers/s':>12} {'plan-intervals/s':>17}")
+    print(f"{plans:>7} {matrix.shape[1]:>10} {matrix.nbytes / 2**20:>12.0f} {compile_seconds:>12.2f} "
+          f"{seconds * 1e3:>18.2f} {1 / seconds:>12.1f} {matrix.size / seconds:>17.3g}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the tariff simulator")
+    parser.add_argument("--plans", type=int, default=1_000)
+    parser.add_argument("--customers", type=int, default=50)
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--intervals-per-hour", type=int, default=4)
+    args = parser.parse_args()
+    run(args.plans, args.customers, args.year, args.intervals_per_hour)
@@ -0,0 +1,131 @@
+"""
+Load test for webhook mode.
+
+Replays synthetic Telegram updates over HTTP against the webhook server of a
+real bot Application whose Bot API calls go to a local FakeBotAPI, and
+reports ingestion and end-to-end throughput.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from benchmarks.fake_bot_api import FakeBotAPI, callback_update, command_update
+from src.api.webhook_server import WebhookServer
+
+# Button presses of a complete conversation after /start
+PRESSES = ["m1", "d2", "t2", "v0"]
+
+def synthetic_updates(users: int):
+    """
+    Updates for complete conversations of the given number of users, grouped per user.
+    """
+    update_id = 0
+    for user in range(users):
+        user_id = 100_000 + user
+        updates = []
+        update_id += 1
+        updates.append(command_update(update_id, user_id))
+        for press in PRESSES:
+            update_id += 1
+            updates.append(callback_update(update_id, user_id, press))
+        yield updates
+
+def encode(update, secret: str) -> bytes:
+    body = json.dumps(update).encode()
+    return (
+        f"POST /hook HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+        f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\n\r\n"
+    ).encode() + body
+
+async def client(port: int, requests):
+    """
+    Send pre-encoded requests over one keep-alive connection, awaiting each response.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for request in requests:
+        writer.write(request)
+        await writer.drain()
+        await reader.readuntil(b"\r\n\r\n")
+    writer.close()
+
+async def replay(port: int, users: int, connections: int, secret: str) -> int:
+    """
+    Replay the synthetic conversations over several connections.
+
+    Returns:
+        The number of updates sent
+    """
+    # Each user's updates go through one connection, in order
+    shards = [[] for _ in range(connections)]
+    for i, updates in enumerate(synthetic_updates(users)):
+        shards[i % connections].extend(encode(u, secret) for u in updates)
+    await asyncio.gather(*(client(port, shard) for shard in shards))
+    return sum(len(shard) for shard in shards)
+
+async def run_server_only(users: int, connections: int) -> None:
+    """
+    Measure raw ingestion of the webhook server with a no-op update handler.
+    """
+    async def discard(update):
+        pass
+
+    server = WebhookServer(discard, path="/hook", secret_token="load", host="127.0.0.1", port=0)
+    await server.start()
+    start = time.perf_counter()
+    total = await replay(server.port, users, connections, "load")
+    elapsed = time.perf_counter() - start
+    await server.stop()
+    print(f"server only: {total / elapsed:>10,.0f} updates/s ({total} updates in {elapsed:.2f} s)")
+
+async def run_bot(users: int, connections: int, latency: float) -> None:
+    """
+    Measure a full bot Application behind the webhook server against a FakeBotAPI.
+    """
+    os.environ.setdefault("CATALOGUE_RELOAD_INTERVAL", "0")
+    # Measure update handling, not outgoing flood-limit pacing
+    os.environ.setdefault("OUTBOUND_RATE_LIMIT", "0")
+    from src.api import telegram_bot
+
+    api = FakeBotAPI(latency=latency)
+    application = telegram_bot.build_application("123:LOAD", concurrent_updates=256, request=api)
+
+    processed = 0
+
+    async def count(update, context):
+        nonlocal processed
+        processed += 1
+
+    # Group 1 runs after the bot's own handlers for every update
+    application.add_handler(TypeHandler(Update, count), group=1)
+    server = await telegram_bot.start_webhook(
+        application, "https://example.com/hook", port=0, secret_token="load", listen="127.0.0.1"
+    )
+
+    start = time.perf_counter()
+    total = await replay(server.port, users, connections, "load")
+    ingested = time.perf_counter() - start
+    while processed < total:
+        await asyncio.sleep(0.001)
+    completed = time.perf_counter() - start
+    await telegram_bot.stop_webhook(application, server)
+
+    print(f"full bot:    {total / completed:>10,.0f} updates/s end-to-end "
+          f"({total} updates in {completed:.2f} s, ingestion done after {ingested:.2f} s, "
+          f"api latency {latency * 1e3:.0f} ms)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the webhook server")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated Bot API latency in seconds")
+    args = parser.parse_args()
+    logging.getLogger("telegram").setLevel(logging.WARNING)
+    asyncio.run(run_server_only(args.users, args.connections))
+    asyncio.run(run_bot(args.users, args.connections, args.latency))
@@ -0,0 +1,167 @@
+"""
+Local stand-in for the Telegram Bot API and synthetic update generators.
+
+FakeBotAPI plugs into python-telegram-bot as its request backend, so a real
+Application can run end to end (handlers, Bot methods, JSON round-trips)
+without any network access. Used by the load tests and simulations.
+"""
+
+import asyncio
+import json
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+from src.api.send_queue import TokenBucket
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "VoltWiz", "username": "voltwiz_bot"}
+
+class FakeBotAPI(BaseRequest):
+    """
+    Answers every Bot API call locally and records it.
+
+    With flood limits set, sendMessage calls beyond them are answered with
+    429 Too Many Requests and a retry_after, as Telegram does.
+    """
+    def __init__(self, latency: float = 0.0, global_rate: Optional[float] = None,
+                 chat_rate: Optional[float] = None, chat_burst: float = 3):
+        """
+        Args:
+            latency: Simulated round-trip time of each call, in seconds
+            global_rate: sendMessage calls per second allowed across all chats (None for no limit)
+            chat_rate: sendMessage calls per second allowed to one chat (None for no limit)
+            chat_burst: sendMessage calls allowed at once to one chat
+        """
+        self.latency = latency
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.calls: List[Tuple[str, Dict]] = []
+        self.flood_errors = 0
+        self._message_id = 0
+        self._global_bucket = TokenBucket(global_rate, global_rate, time.monotonic()) if global_rate else None
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def sent_messages(self, chat_id: Optional[int] = None) -> List[Dict]:
+        """
+        Parameters of every sendMessage call, optionally for one chat only.
+        """
+        return [
+            params for endpoint, params in self.calls
+            if endpoint == "sendMessage" and (chat_id is None or int(params["chat_id"]) == chat_id)
+        ]
+
+    async def do_request(self, url: str, method: str, request_data: RequestData = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        params = dict(request_data.parameters) if request_data else {}
+        retry_after = self._flood_wait(int(params["chat_id"])) if endpoint == "sendMessage" else 0
+        if not retry_after:
+            self.calls.append((endpoint, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if retry_after:
+            self.flood_errors += 1
+            return 429, json.dumps({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after}
+            }).encode()
+        return 200, json.dumps({"ok": True, "result": self._result(endpoint, params)}).encode()
+
+    def _flood_wait(self, chat_id: int) -> int:
+        """
+        Whole seconds the caller must wait if this message breaks a flood limit, else 0.
+        """
+        now = time.monotonic()
+        buckets = [self._global_bucket] if self._global_bucket else []
+        if self.chat_rate:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+            buckets.append(bucket)
+        wait = max((bucket.delay(now) for bucket in buckets), default=0.0)
+        if wait > 0:
+            return max(1, math.ceil(wait))
+        for bucket in buckets:
+            bucket.consume()
+        return 0
+
+    def _result(self, endpoint: str, params: Dict):
+        if endpoint == "getMe":
+            return BOT_USER
+        if endpoint == "sendMessage":
+            self._message_id += 1
+            return {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(params["chat_id"]), "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", "")
+            }
+        return True
+
+def _user(user_id: int) -> Dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"}
+
+def command_update(update_id: int, user_id: int, command: str = "/start") -> Dict:
+    """
+    A synthetic update carrying a bot command from a private chat.
+    """
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": command,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        }
+    }
+
+def text_update(update_id: int, user_id: int, text: str) -> Dict:
+    """
+    A synthetic update carrying a plain text message from a private chat.
+    """
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": text
+        }
+    }
+
+def callback_update(update_id: int, user_id: int, data: str) -> Dict:
+    """
+    A synthetic update for an inline keyboard button press.
+    """
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "question"
+            }
+        }
+    }
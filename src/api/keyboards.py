@@ -0,0 +1,93 @@
+"""
+Prebuilt inline keyboards for the conversation's questions.
+
+Each question's InlineKeyboardMarkup is built once and reused for every
+message. Buttons carry the compact callback codes from the conversation flow,
+which ConversationHandler.process_answer decodes with a dictionary lookup.
+"""
+
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from src.core.conversation import DEFAULT_FLOW, Choice, ConversationFlow, ConversationState
+from src.core.messages import DEFAULT_LOCALE, MESSAGES
+
+# Telegram rejects callback_data longer than this many bytes
+MAX_CALLBACK_DATA = 64
+# Callback data of the button paging through ranked plans, followed by the rank to continue from
+MORE_PREFIX = "more:"
+
+class KeyboardRegistry:
+    """
+    Inline keyboards keyed by locale and conversation state.
+
+    Every supported locale's questions are built up front, so a locale whose
+    prompt isn't translated still gets the buttons of its own language.
+    """
+    def __init__(self, flow: ConversationFlow = DEFAULT_FLOW):
+        """
+        Args:
+            flow: Conversation flow whose questions get keyboards
+        """
+        self._keyboards: Dict[Tuple[str, Hashable], InlineKeyboardMarkup] = {}
+        for locale in dict.fromkeys((*MESSAGES.locales, *flow.translations)):
+            self._keyboards.update({
+                (locale, state): self.build(step.choices) for state, step in flow.localized(locale).items()
+            })
+
+    def more(self, offset: int, locale: str = DEFAULT_LOCALE) -> InlineKeyboardMarkup:
+        """
+        Get the keyboard of a "more" button continuing a ranking at offset.
+        """
+        code = f"{MORE_PREFIX}{offset}"
+        keyboard = self._keyboards.get((locale, code))
+        if keyboard is None:
+            keyboard = self._keyboards[locale, code] = self.build(
+                [[Choice(code, MESSAGES.text("more_label", locale), offset)]]
+            )
+        return keyboard
+
+    def __len__(self) -> int:
+        return len(self._keyboards)
+
+    @staticmethod
+    def build(rows: List[List[Choice]]) -> InlineKeyboardMarkup:
+        """
+        Build a keyboard whose buttons answer with their callback codes.
+
+        Raises:
+            ValueError: If a callback code exceeds Telegram's limit
+        """
+        for row in rows:
+            for choice in row:
+                if len(choice.code.encode()) > MAX_CALLBACK_DATA:
+                    raise ValueError(f"Callback code for '{choice.label}' is longer than {MAX_CALLBACK_DATA} bytes")
+        return InlineKeyboardMarkup(
+            [[InlineKeyboardButton(choice.label, callback_data=choice.code) for choice in row] for row in rows]
+        )
+
+    def markup(self, locale: str, state: ConversationState,
+               buttons: Optional[List[List[str]]] = None) -> Optional[InlineKeyboardMarkup]:
+        """
+        Get the keyboard for the question a user is asked.
+
+        A question missing from the table gets a keyboard built from its button
+        labels, with each label as its own callback data; it is cached as well.
+
+        Args:
+            locale: The user's locale
+            state: The conversation state whose question is asked
+            buttons: Button labels as returned by get_next_question
+
+        Returns:
+            The shared keyboard, or None if the question is unknown and has no buttons
+        """
+        keyboard = self._keyboards.get((locale, state))
+        if keyboard is None and buttons:
+            keyboard = self._keyboards[locale, state] = self.build(
+                [[Choice(label, label, label) for label in row] for row in buttons]
+            )
+        return keyboard
+
+keyboards = KeyboardRegistry()
@@ -0,0 +1,384 @@
+"""
+Rate-limit-aware scheduler for outgoing Telegram messages.
+
+Telegram accepts roughly 30 messages per second per bot and about one per
+second per chat, and answers anything faster with 429 Too Many Requests.
+Messages are queued per chat and released through a global and a per-chat
+token bucket. Consecutive queued messages to the same chat are coalesced into
+one, interactive replies go out before broadcasts, and a RetryAfter from
+Telegram pauses all sending for as long as it asks.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from telegram.error import RetryAfter
+
+from src.utils.metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+# Priorities, most urgent first
+INTERACTIVE = 0
+BROADCAST = 1
+PRIORITIES = (INTERACTIVE, BROADCAST)
+
+MAX_MESSAGE_LENGTH = 4096
+COALESCE_SEPARATOR = "\n\n"
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a fixed rate.
+    """
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (the allowed burst)
+            now: Current clock reading
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """
+        Seconds until a token is available, 0 if one is available now.
+        """
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def time_to_full(self, now: float) -> float:
+        """
+        Seconds until the bucket is full again.
+        """
+        self.delay(now)
+        return (self.capacity - self.tokens) / self.rate
+
+    def consume(self):
+        """Take one token. Callers check delay() first."""
+        self.tokens -= 1
+
+class OutgoingMessage:
+    """
+    A queued sendMessage call, possibly several coalesced ones.
+    """
+    __slots__ = ("text", "kwargs", "priority", "enqueued_at", "futures", "attempts")
+
+    def __init__(self, text: str, kwargs: Dict[str, Any], priority: int, enqueued_at: float,
+                 future: asyncio.Future):
+        self.text = text
+        self.kwargs = kwargs
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.futures = [future]
+        self.attempts = 0
+
+    def absorb(self, text: str, kwargs: Dict[str, Any], priority: int, future: asyncio.Future,
+               max_length: int = MAX_MESSAGE_LENGTH) -> bool:
+        """
+        Append a following message to this one if they can be sent as one.
+
+        Only a message without a keyboard can absorb another, since its buttons
+        would otherwise move below the new text. The combined message adopts the
+        follower's keyboard and the higher of the two priorities.
+
+        Returns:
+            True if the message was absorbed
+        """
+        if self.kwargs.get("reply_markup") is not None:
+            return False
+        if _without_markup(self.kwargs) != _without_markup(kwargs):
+            return False
+        if len(self.text) + len(COALESCE_SEPARATOR) + len(text) > max_length:
+            return False
+        self.text = f"{self.text}{COALESCE_SEPARATOR}{text}"
+        self.kwargs = kwargs
+        self.priority = min(self.priority, priority)
+        self.futures.append(future)
+        return True
+
+    def resolve(self, result):
+        for future in self.futures:
+            if not future.done():
+                future.set_result(result)
+
+    def fail(self, error: BaseException):
+        for future in self.futures:
+            if not future.done():
+                future.set_exception(error)
+
+class _ChatQueue:
+    """
+    Pending messages and rate-limit state of one chat.
+
+    level is the ready queue the chat is waiting in and due the time it is
+    delayed until; both are None while it is in neither.
+    """
+    __slots__ = ("messages", "bucket", "busy", "level", "due")
+
+    def __init__(self, bucket: TokenBucket):
+        self.messages: Deque[OutgoingMessage] = deque()
+        self.bucket = bucket
+        self.busy = False
+        self.level: Optional[int] = None
+        self.due: Optional[float] = None
+
+    @property
+    def idle(self) -> bool:
+        return not self.messages and not self.busy
+
+class SendScheduler:
+    """
+    Queues outgoing messages and sends them within Telegram's rate limits.
+    """
+    def __init__(self, bot, global_rate: float = 30.0, global_burst: float = 1,
+                 chat_rate: float = 1.0, chat_burst: float = 3, coalesce: bool = True,
+                 max_retries: int = 3, clock: Callable[[], float] = time.monotonic,
+                 metrics: Metrics = None):
+        """
+        Args:
+            bot: telegram.Bot (or anything with an async send_message) used for sending
+            global_rate: Messages per second across all chats
+            global_burst: Messages that may be sent at once across all chats
+            chat_rate: Messages per second to a single chat
+            chat_burst: Messages that may be sent at once to a single chat
+            coalesce: Merge consecutive queued messages to the same chat
+            max_retries: Times a message is retried after RetryAfter before failing
+            clock: Monotonic time source
+            metrics: Metrics registry (default: the global one)
+        """
+        self.bot = bot
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.coalesce = coalesce
+        self.max_retries = max_retries
+        self.clock = clock
+        self.metrics = metrics if metrics is not None else default_metrics
+        self.pending = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.retries = 0
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        self._paused_until = 0.0
+        self._chats: Dict[int, _ChatQueue] = {}
+        self._ready: List[Deque[int]] = [deque() for _ in PRIORITIES]
+        self._delayed: List[Tuple[float, int, int]] = []
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._inflight: Set[asyncio.Task] = set()
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, chat_id: int, text: str, priority: int = INTERACTIVE, **kwargs) -> asyncio.Future:
+        """
+        Queue a message without waiting for it to be sent.
+
+        Args:
+            chat_id: Target chat
+            text: Message text
+            priority: INTERACTIVE or BROADCAST
+            **kwargs: Further Bot.send_message arguments, e.g. reply_markup
+
+        Returns:
+            Future resolved with the sent telegram.Message (shared by coalesced messages)
+        """
+        future = asyncio.get_running_loop().create_future()
+        # _send and stop log failures, so callers that never await the future lose
+        # nothing and asyncio doesn't warn about an unretrieved exception
+        future.add_done_callback(_retrieve_exception)
+        now = self.clock()
+
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _ChatQueue(TokenBucket(self.chat_rate, self.chat_burst, now))
+        last = chat.messages[-1] if chat.messages else None
+        if self.coalesce and last is not None and last.absorb(text, kwargs, priority, future):
+            self.coalesced += 1
+            self.metrics.increment("messages_coalesced")
+        else:
+            chat.messages.append(OutgoingMessage(text, kwargs, priority, now, future))
+            self.pending += 1
+        self._schedule(chat_id, chat, now)
+        return future
+
+    async def send_message(self, chat_id: int, text: str, priority: int = INTERACTIVE, **kwargs):
+        """
+        Queue a message and wait until it has been sent.
+
+        Returns:
+            The sent telegram.Message
+        """
+        return await self.submit(chat_id, text, priority, **kwargs)
+
+    def start(self):
+        """Start the sending task on the running event loop."""
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        """
+        Wait up to timeout seconds for queued messages to go out, then stop.
+        Messages still queued after that fail with asyncio.CancelledError.
+        """
+        if self._worker is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (self.pending or self._inflight) and loop.time() < deadline:
+            await asyncio.sleep(0.01)
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self.pending:
+            logger.warning(f"Dropping {self.pending} queued messages that weren't sent within {timeout}s")
+        for chat in self._chats.values():
+            for message in chat.messages:
+                message.fail(asyncio.CancelledError())
+        self._chats.clear()
+        self.pending = 0
+
+    def _schedule(self, chat_id: int, chat: _ChatQueue, now: float):
+        """
+        Put a chat with pending messages in the ready queue of its most urgent
+        message, or in the delay heap if its bucket is empty.
+        """
+        if chat.busy or not chat.messages:
+            return
+        level = min(message.priority for message in chat.messages)
+        if chat.level is not None and chat.level <= level:
+            return
+        wait = chat.bucket.delay(now)
+        if wait > 0:
+            if chat.due is None:
+                chat.due = now + wait
+                self._seq += 1
+                heapq.heappush(self._delayed, (chat.due, self._seq, chat_id))
+            return
+        # Any entry at a lower level becomes stale and is skipped when reached
+        chat.level = level
+        self._ready[level].append(chat_id)
+        self._wakeup.set()
+
+    def _promote(self, now: float):
+        """Move chats whose delay has passed to the ready queues."""
+        while self._delayed and self._delayed[0][0] <= now:
+            due, _, chat_id = heapq.heappop(self._delayed)
+            chat = self._chats.get(chat_id)
+            if chat is not None and chat.due == due:
+                chat.due = None
+                self._schedule(chat_id, chat, now)
+
+    def _next_ready(self) -> Optional[int]:
+        """The most urgent ready chat, dropping stale queue entries on the way."""
+        for level, queue in enumerate(self._ready):
+            while queue:
+                chat = self._chats.get(queue[0])
+                if chat is not None and chat.level == level and not chat.busy:
+                    return level
+                queue.popleft()
+        return None
+
+    async def _run(self):
+        while True:
+            now = self.clock()
+            self._promote(now)
+            level = self._next_ready()
+            if level is None:
+                self._wakeup.clear()
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            wait = max(self._global.delay(now), self._paused_until - now)
+            if wait > 0:
+                # Re-evaluate afterwards: a more urgent message may have arrived
+                await asyncio.sleep(wait)
+                continue
+
+            chat_id = self._ready[level].popleft()
+            chat = self._chats[chat_id]
+            message = chat.messages.popleft()
+            self.pending -= 1
+            chat.level = None
+            chat.busy = True
+            chat.bucket.consume()
+            self._global.consume()
+            task = asyncio.create_task(self._deliver(chat_id, chat, message))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, chat_id: int, chat: _ChatQueue, message: OutgoingMessage):
+        try:
+            result = await self.bot.send_message(chat_id, message.text, **message.kwargs)
+        except RetryAfter as error:
+            self.retries += 1
+            self.metrics.increment("send_retry_after")
+            self._paused_until = max(self._paused_until, self.clock() + _seconds(error.retry_after))
+            message.attempts += 1
+            if message.attempts <= self.max_retries:
+                chat.messages.appendleft(message)
+                self.pending += 1
+            else:
+                logger.warning(f"Giving up on message to chat {chat_id} after {message.attempts} flood waits",
+                               exc_info=error)
+                message.fail(error)
+        except Exception as error:
+            logger.warning(f"Sending message to chat {chat_id} failed: {error}", exc_info=error)
+            self.metrics.increment("send_failures")
+            message.fail(error)
+        else:
+            self.sent += 1
+            self.metrics.increment("messages_sent")
+            self.metrics.observe("send_latency_seconds", self.clock() - message.enqueued_at)
+            message.resolve(result)
+        finally:
+            chat.busy = False
+            now = self.clock()
+            if chat.messages:
+                self._schedule(chat_id, chat, now)
+            else:
+                self._forget_later(chat_id, chat, now)
+            self._wakeup.set()
+
+    def _forget_later(self, chat_id: int, chat: _ChatQueue, now: float):
+        """Drop an idle chat once its bucket has refilled, when forgetting it changes nothing."""
+        refill = chat.bucket.time_to_full(now)
+        if refill <= 0:
+            self._chats.pop(chat_id, None)
+        else:
+            asyncio.get_running_loop().call_later(refill, self._forget, chat_id)
+
+    def _forget(self, chat_id: int):
+        chat = self._chats.get(chat_id)
+        if chat is not None and chat.idle and chat.bucket.time_to_full(self.clock()) <= 0:
+            del self._chats[chat_id]
+
+def _without_markup(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in kwargs.items() if key != "reply_markup"}
+
+def _seconds(retry_after) -> float:
+    # retry_after is an int in python-telegram-bot 20 and a timedelta in later versions
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+def _retrieve_exception(future: asyncio.Future):
+    """
+    Mark a message's failure as handled; _send or stop has already logged it.
+    """
+    if not future.cancelled():
+        future.exception()
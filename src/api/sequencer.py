@@ -0,0 +1,93 @@
+"""
+Per-user sequencing of concurrently processed updates.
+
+With concurrent update processing, two quick button presses from the same
+user could otherwise interleave inside the conversation handlers and skip a
+state. Updates are serialized per user with an asyncio lock; updates from
+different users still run in parallel. A user's lock only exists while one of
+their updates is in flight, so idle users cost nothing.
+
+An update waits for its user's lock before it takes one of the processor's
+concurrency slots, so a user flooding the bot queues behind their own updates
+without holding slots other users need.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Dict, Hashable, List, Optional
+import asyncio
+
+from telegram.ext import BaseUpdateProcessor
+
+class UserSequencer:
+    """
+    Per-key asyncio locks that are dropped as soon as nobody holds or awaits them.
+    """
+    def __init__(self):
+        # key -> [lock, number of tasks holding or waiting for it]
+        self._locks: Dict[Hashable, List] = {}
+
+    def __len__(self) -> int:
+        """Number of keys with an update in flight."""
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, key: Optional[Hashable]):
+        """
+        Run the enclosed block exclusively for key. Waiters are served in arrival order.
+
+        Args:
+            key: Sequencing key, usually the user ID (None runs unsequenced)
+        """
+        if key is None:
+            yield
+            return
+
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+def user_key(update: object) -> Optional[int]:
+    """
+    Sequencing key for an update: the sender's user ID, else the chat ID.
+    """
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(update, "effective_chat", None)
+    return chat.id if chat is not None else None
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Update processor that runs updates concurrently across users but in order for each user.
+    """
+    def __init__(self, max_concurrent_updates: int = 256):
+        """
+        Args:
+            max_concurrent_updates: Maximum number of updates processed at the same time
+        """
+        super().__init__(max_concurrent_updates)
+        self.sequencer = UserSequencer()
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Wait for the user's earlier updates, then process the update in a concurrency slot.
+        """
+        async with self.sequencer.hold(user_key(update)):
+            await super().process_update(update, coroutine)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
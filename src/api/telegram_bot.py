@@ -1,142 +1,443 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Tuple, Union
+from urllib.parse import urlparse
 import os
 import logging
 
-from src.core.conversation import ConversationHandler
-from src.core.calculator import ProviderCalculator
+from src.core.messages import MESSAGES
 
-# Load environment variables
-load_dotenv()
+# python-telegram-bot, the state store and the catalogue are imported where they
+# are first used, so importing this module (e.g. from src.app) stays cheap
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import Application, ContextTypes
+    from src.api.keyboards import KeyboardRegistry
+    from src.api.webhook_server import WebhookServer
+    from src.core.answer_matcher import AnswerMatcher
+    from src.core.calculator import Catalogue, ProviderCalculator
+    from src.core.conversation import ConversationFlow, ConversationHandler
 
-# Enable logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
-# Initialize handlers
-conversation_handler = ConversationHandler()
-calculator = ProviderCalculator()
+_configured = False
+_calculator = None
+_conversation_handler = None
+_keyboards = None
+# The vendors offered by the vendor question of the current flow
+_flow_vendors = None
+# Outgoing messages are paced through this while the bot runs (None sends directly)
+send_scheduler = None
+# Ranked plans shown per message; the rest are paged with a "more" button
+RANKING_PAGE_SIZE = 3
 
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+def configure() -> None:
+    """Load environment variables from .env and enable logging, once."""
+    global _configured
+    if _configured:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    _configured = True
+
+def get_calculator() -> 'ProviderCalculator':
+    """
+    The shared plan calculator, created on first use.
+
+    If CATALOGUE_SNAPSHOT names a file, the indexed catalogue is loaded from it
+    while it is current and rewritten from the providers file when it is not.
+    """
+    global _calculator
+    if _calculator is None:
+        configure()
+        from src.core.calculator import ProviderCalculator
+        _calculator = ProviderCalculator(snapshot_file=os.getenv("CATALOGUE_SNAPSHOT") or None)
+    return _calculator
+
+def _build_flow(vendors) -> Tuple['ConversationFlow', 'AnswerMatcher']:
+    """The bot's flow, with a vendor question offering the given vendors, and its answer matcher."""
+    from src.core.answer_matcher import AnswerMatcher
+    from src.core.conversation import ConversationFlow
+    flow = ConversationFlow.from_file(vendors=vendors)
+    return flow, AnswerMatcher.from_files(flow)
+
+def get_conversation_handler() -> 'ConversationHandler':
+    """The shared conversation handler, created on first use."""
+    global _conversation_handler, _flow_vendors
+    if _conversation_handler is None:
+        configure()
+        from src.core.conversation import ConversationHandler
+        from src.core.state_store import create_state_store
+        calculator = get_calculator()
+        # The vendor question offers the vendors of the catalogue
+        vendors = calculator.catalogue.vendor_ids
+        flow, matcher = _build_flow(vendors)
+        # Abandoned conversations expire after an hour idle; at most 100k are kept in memory.
+        # Questions that can no longer change the recommendation are skipped, and
+        # typed answers are matched against the answer synonyms
+        _conversation_handler = ConversationHandler(
+            create_state_store(os.getenv("STATE_STORE", "memory://?max_size=100000&ttl=3600")),
+            flow=flow,
+            calculator=calculator,
+            matcher=matcher
+        )
+        _flow_vendors = vendors
+    return _conversation_handler
+
+def get_keyboards() -> 'KeyboardRegistry':
+    """The inline keyboards of the conversation handler's questions, built on first use."""
+    global _keyboards
+    if _keyboards is None:
+        from src.api.keyboards import KeyboardRegistry
+        _keyboards = KeyboardRegistry(get_conversation_handler().flow)
+    return _keyboards
+
+def refresh_vendors(catalogue: 'Catalogue') -> None:
+    """
+    Offer the vendors of a newly loaded catalogue in the vendor question.
+
+    The flow, answer matcher and keyboards are rebuilt only when the set of
+    vendors changed; conversations in progress continue with the new question.
+
+    Args:
+        catalogue: The catalogue that was just swapped in
+    """
+    global _keyboards, _flow_vendors
+    vendors = catalogue.vendor_ids
+    if _conversation_handler is None or vendors == _flow_vendors:
+        return
+    from src.api.keyboards import KeyboardRegistry
+    flow, matcher = _build_flow(vendors)
+    keyboards = KeyboardRegistry(flow)
+    _conversation_handler.flow, _conversation_handler.matcher = flow, matcher
+    _keyboards, _flow_vendors = keyboards, vendors
+    logger.info(f"Vendor question now offers {len(vendors)} vendors")
+
+def __getattr__(name: str):
+    # Module attributes for the lazily created singletons
+    if name == "calculator":
+        return get_calculator()
+    if name == "conversation_handler":
+        return get_conversation_handler()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def reply(update: 'Update', text: str, **kwargs) -> None:
+    """Send a message to the update's chat, through the send scheduler when it is running."""
+    if send_scheduler is not None:
+        send_scheduler.submit(update.effective_chat.id, text, **kwargs)
+    else:
+        await update.effective_message.reply_text(text, **kwargs)
+
+def user_locale(update: 'Update') -> str:
+    """The locale of the update's user: the one stored with their conversation, else their client's language."""
+    user = update.effective_user
+    if user is None:
+        return MESSAGES.default_locale
+    return get_conversation_handler().get_locale(str(user.id), user.language_code)
+
+async def start(update: 'Update', context: 'ContextTypes.DEFAULT_TYPE') -> None:
     """Start the conversation and ask the first question."""
     user = update.effective_user
-    welcome_message = (
-        "אני VoltWiz – היועץ החכם שלך לבחירת תכנית החשמל הכי משתלמת! ⚡️\n"
-        "בשיחה קצרה אני אכיר אותך ואמצא עבורך את החבילה שתעזור לך לחסוך הכי הרבה כסף, בדיוק לפי הסגנון שלך.\n\n"
-        "בלי כאבי ראש, בלי אותיות קטנות – רק המלצה ברורה, פשוטה ומדויקת.\n"
-        "יאללה, בוא נתחיל לחסוך 🙂"
-    )
-    await update.message.reply_text(welcome_message)
+    locale = user_locale(update)
+    await reply(update, MESSAGES.text("welcome", locale))
     
     # Reset any previous conversation
-    conversation_handler.reset_conversation(str(user.id))
-    # Get first question and buttons
-    question, buttons = conversation_handler.get_next_question(str(user.id))
-    keyboard = [[InlineKeyboardButton(btn, callback_data=btn) for btn in row] for row in buttons]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(question, reply_markup=reply_markup)
-
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    get_conversation_handler().reset_conversation(str(user.id), locale)
+    # Ask the first question
+    await ask_next_question(update, str(user.id))
+
+async def help_command(update: 'Update', context: 'ContextTypes.DEFAULT_TYPE') -> None:
     """Send a message when the command /help is issued."""
-    await update.message.reply_text(
-        'אני בוט שיעזור לך למצוא את ספק החשמל המתאים ביותר עבורך.\n'
-        'אני אשאל אותך כמה שאלות קצרות כדי להבין את הצרכים שלך.\n\n'
-        'הפקודות הזמינות:\n'
-        '/start - התחל שיחה חדשה\n'
-        '/help - הצג עזרה\n'
-        '/reset - אפס את השיחה הנוכחית'
-    )
+    await reply(update, MESSAGES.text("help", user_locale(update)))
 
-async def reset(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def reset(update: 'Update', context: 'ContextTypes.DEFAULT_TYPE') -> None:
     """Reset the conversation."""
     user = update.effective_user
-    conversation_handler.reset_conversation(str(user.id))
-    await update.message.reply_text('השיחה אופסה. בוא נתחיל מחדש!')
-    question, buttons = conversation_handler.get_next_question(str(user.id))
-    keyboard = [[InlineKeyboardButton(btn, callback_data=btn) for btn in row] for row in buttons]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(question, reply_markup=reply_markup)
-
-async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    locale = user_locale(update)
+    get_conversation_handler().reset_conversation(str(user.id), locale)
+    await reply(update, MESSAGES.text("reset_done", locale))
+    await ask_next_question(update, str(user.id))
+
+async def language(update: 'Update', context: 'ContextTypes.DEFAULT_TYPE') -> None:
+    """Switch the user's language with /language <code>, or list the languages."""
+    user_id = str(update.effective_user.id)
+    if context.args and context.args[0].lower() in MESSAGES.locales:
+        locale = context.args[0].lower()
+        get_conversation_handler().set_locale(user_id, locale)
+        await reply(update, MESSAGES.text("language_set", locale))
+    else:
+        await reply(update, MESSAGES.format("language_usage", user_locale(update), locales=", ".join(MESSAGES.locales)))
+
+async def button_callback(update: 'Update', context: 'ContextTypes.DEFAULT_TYPE') -> None:
     """Handle button presses."""
     query = update.callback_query
     await query.answer()
     
-    user_id = str(query.from_user.id)
-    answer = query.data
+    await handle_answer(update, str(query.from_user.id), query.data)
+
+async def text_answer(update: 'Update', context: 'ContextTypes.DEFAULT_TYPE') -> None:
+    """Handle answers typed instead of pressed."""
+    user_id = str(update.effective_user.id)
+    if not get_conversation_handler().is_awaiting_answer(user_id):
+        await reply(update, MESSAGES.text("send_start", user_locale(update)))
+        return
+    await handle_answer(update, user_id, update.effective_message.text)
 
+async def handle_answer(update: 'Update', user_id: str, answer: str) -> None:
+    """Record an answer, then ask the next question or send the recommendation."""
     # Process the answer
-    response = conversation_handler.process_answer(user_id, answer)
+    response = get_conversation_handler().process_answer(user_id, answer)
     if response:
-        await query.message.reply_text(response)
+        await reply(update, response)
         return
 
     # If conversation is complete, get recommendation
-    if conversation_handler.is_conversation_complete(user_id):
-        user_data = conversation_handler.get_user_data(user_id)
-        if user_data:
-            # Create user preferences dictionary
-            user_prefs = {
-                "has_smart_meter": user_data.has_smart_meter,
-                "discount_type": user_data.discount_type,
-                "time_preference": user_data.time_preference,
-                "vendor": user_data.vendor
-            }
-
-            # Get recommendation
-            provider = calculator.get_recommendation(user_prefs)
-
-            # Display recommendation
-            if provider:
-                recommendation = calculator.format_recommendation(provider, user_prefs)
-                await query.message.reply_text(recommendation)
-            else:
-                await query.message.reply_text(
-                    "מצטערים, לא מצאנו ספקים מתאימים לדרישות שלך."
-                )
+    if get_conversation_handler().is_conversation_complete(user_id):
+        await send_recommendation(update, user_id)
+    else:
+        await ask_next_question(update, user_id)
+
+async def ask_next_question(update: 'Update', user_id: str) -> None:
+    """Ask the user's next question, or recommend a plan once none remain."""
+    handler = get_conversation_handler()
+    question, buttons = handler.get_next_question(user_id)
+    if question:
+        state = handler.get_user_state(user_id)
+        await reply(update, question, reply_markup=get_keyboards().markup(state.locale, state.state, buttons))
+    else:
+        await send_recommendation(update, user_id)
+
+def user_preferences(user_data) -> dict:
+    """The calculator's preferences dictionary for a user's answers."""
+    return {
+        "has_smart_meter": user_data.has_smart_meter,
+        "discount_type": user_data.discount_type,
+        "time_preference": user_data.time_preference,
+        "vendor": user_data.vendor
+    }
+
+def ranking_page(user_prefs: dict, offset: int, locale: str = MESSAGES.default_locale):
+    """
+    One page of the plans ranked for the user.
+
+    Returns:
+        The page text and, if more plans follow, a keyboard with a "more" button
+    """
+    calculator = get_calculator()
+    # One plan past the page tells whether another page exists
+    plans = calculator.get_top_recommendations(user_prefs, RANKING_PAGE_SIZE + 1, offset)
+    title = MESSAGES.text("ranking_title" if offset == 0 else "ranking_more_title", locale)
+    text = f"{title}\n{calculator.format_ranking(plans[:RANKING_PAGE_SIZE], offset, locale)}"
+    markup = get_keyboards().more(offset + RANKING_PAGE_SIZE, locale) if len(plans) > RANKING_PAGE_SIZE else None
+    return text, markup
+
+async def send_recommendation(update: 'Update', user_id: str) -> None:
+    """Send the recommendation for a completed conversation, followed by the top ranked plans."""
+    user_data = get_conversation_handler().get_user_data(user_id)
+    if user_data:
+        user_prefs = user_preferences(user_data)
+        locale = user_data.locale
+
+        # Get recommendation (memoized per preference combination and locale)
+        recommendation = get_calculator().get_recommendation_message(user_prefs, locale)
+
+        # Display recommendation
+        if recommendation:
+            ranking, markup = ranking_page(user_prefs, 0, locale)
+            await reply(update, f"{recommendation}\n\n{ranking}", reply_markup=markup)
         else:
-            await query.message.reply_text(
-                "משהו השתבש. אנא נסה שוב עם /start"
-            )
+            await reply(update, MESSAGES.text("no_provider", locale))
     else:
-        # Get next question and buttons
-        question, buttons = conversation_handler.get_next_question(user_id)
-        if question:
-            keyboard = [[InlineKeyboardButton(btn, callback_data=btn) for btn in row] for row in buttons]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.message.reply_text(question, reply_markup=reply_markup)
-
-async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        await reply(update, MESSAGES.text("try_again", user_locale(update)))
+
+async def more_callback(update: 'Update', context: 'ContextTypes.DEFAULT_TYPE') -> None:
+    """Show the next page of ranked plans."""
+    from src.api.keyboards import MORE_PREFIX
+    query = update.callback_query
+    await query.answer()
+
+    user_id = str(query.from_user.id)
+    handler = get_conversation_handler()
+    if not handler.is_conversation_complete(user_id):
+        await reply(update, MESSAGES.text("try_again", user_locale(update)))
+        return
+    offset = int(query.data[len(MORE_PREFIX):])
+    user_data = handler.get_user_data(user_id)
+    text, markup = ranking_page(user_preferences(user_data), offset, user_data.locale)
+    await reply(update, text, reply_markup=markup)
+
+async def start_catalogue_watcher(application) -> None:
+    """Hot-reload the plan catalogue while the bot is running."""
+    interval = float(os.getenv("CATALOGUE_RELOAD_INTERVAL", 30))
+    if interval > 0:
+        from src.core.catalogue_watcher import CatalogueWatcher
+        watcher = CatalogueWatcher(get_calculator(), interval=interval, on_swap=refresh_vendors)
+        application.create_task(watcher.run())
+
+async def start_send_scheduler(application) -> None:
+    """Pace outgoing messages within Telegram's flood limits."""
+    global send_scheduler
+    rate = float(os.getenv("OUTBOUND_RATE_LIMIT", 30))
+    if rate > 0:
+        from src.api.send_queue import SendScheduler
+        send_scheduler = SendScheduler(application.bot, global_rate=rate)
+        send_scheduler.start()
+
+async def stop_send_scheduler(application) -> None:
+    """Send what is still queued, then stop pacing."""
+    global send_scheduler
+    if send_scheduler is not None:
+        await send_scheduler.stop()
+        send_scheduler = None
+
+async def post_init(application) -> None:
+    """Start background maintenance tasks once the application is initialised."""
+    await start_catalogue_watcher(application)
+    await start_send_scheduler(application)
+    from src.core.state_store import MemoryStateStore
+    store = get_conversation_handler().store
+    if isinstance(store, MemoryStateStore):
+        store.start_sweeper(float(os.getenv("SESSION_SWEEP_INTERVAL", 60)))
+
+async def close_state_store(application) -> None:
+    """Flush buffered conversation state on shutdown."""
+    get_conversation_handler().store.close()
+
+async def error_handler(update: 'Update', context: 'ContextTypes.DEFAULT_TYPE') -> None:
     """Log the error and send a message to the user."""
     logger.error(f"Update {update} caused error {context.error}")
     if update and update.effective_message:
-        await update.effective_message.reply_text(
-            "מצטערים, אירעה שגיאה. אנא נסה שוב או השתמש ב /reset כדי להתחיל מחדש."
-        )
+        await reply(update, MESSAGES.text("error", user_locale(update)))
 
-def main() -> None:
-    """Start the bot."""
-    # Get token from environment variable
-    token = os.getenv("TELEGRAM_BOT_TOKEN")
+def build_application(token: str = None, concurrent_updates: Union[bool, int] = False, request=None) -> 'Application':
+    """
+    Create the bot application with all handlers registered.
+
+    Args:
+        token: Bot token (default: TELEGRAM_BOT_TOKEN from the environment)
+        concurrent_updates: Process updates concurrently (True, or the maximum number at once).
+            Each user's updates are still handled one at a time, in order.
+        request: Optional telegram.request.BaseRequest used for Bot API calls
+    """
+    from telegram.ext import ApplicationBuilder, CallbackQueryHandler, CommandHandler, MessageHandler, filters
+    from src.api.keyboards import MORE_PREFIX
+    from src.api.sequencer import PerUserUpdateProcessor
+
+    configure()
+    if token is None:
+        token = os.getenv("TELEGRAM_BOT_TOKEN")
     if not token:
         raise ValueError("No TELEGRAM_BOT_TOKEN found in environment variables")
+    if concurrent_updates:
+        # Handlers share conversation state, so only different users may run in parallel
+        concurrent_updates = PerUserUpdateProcessor(256 if concurrent_updates is True else concurrent_updates)
+    # Load the catalogue, state store and keyboards now rather than on the first update
+    get_keyboards()
 
     # Create the application
-    application = ApplicationBuilder().token(token).build()
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .concurrent_updates(concurrent_updates)
+        .post_init(post_init)
+        .post_stop(stop_send_scheduler)
+        .post_shutdown(close_state_store)
+    )
+    if request is not None:
+        builder = builder.request(request)
+    application = builder.build()
 
     # Add handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("reset", reset))
+    application.add_handler(CommandHandler("language", language))
+    application.add_handler(CallbackQueryHandler(more_callback, pattern=f"^{MORE_PREFIX}"))
     application.add_handler(CallbackQueryHandler(button_callback))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_answer))
     application.add_error_handler(error_handler)
 
-    # Start the Bot
-    application.run_polling()
+    return application
+
+async def start_webhook(application: 'Application', webhook_url: str, port: int = 5000,
+                        secret_token: str = None, listen: str = "0.0.0.0") -> 'WebhookServer':
+    """
+    Initialise the application, register the webhook with Telegram and start receiving updates.
+
+    Args:
+        application: The application returned by build_application
+        webhook_url: Public HTTPS URL Telegram should POST updates to
+        port: Local port to listen on (0 picks a free port)
+        secret_token: Secret Telegram must echo in every request
+        listen: Local interface to bind
+
+    Returns:
+        The running WebhookServer
+    """
+    from telegram import Update
+    from src.api.webhook_server import WebhookServer
+
+    async def enqueue(data):
+        await application.update_queue.put(Update.de_json(data, application.bot))
+
+    server = WebhookServer(
+        enqueue,
+        path=urlparse(webhook_url).path or "/",
+        secret_token=secret_token,
+        host=listen,
+        port=port,
+        max_body_size=int(os.getenv("WEBHOOK_MAX_BODY_SIZE", 1 << 20)),
+        max_pending=int(os.getenv("WEBHOOK_MAX_PENDING", 4096))
+    )
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    await server.start()
+    await application.bot.set_webhook(url=webhook_url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES)
+    return server
+
+async def stop_webhook(application: 'Application', server: 'WebhookServer') -> None:
+    """Stop receiving updates, finish in-flight ones and shut the application down."""
+    await server.stop()
+    await application.stop()
+    if application.post_stop:
+        await application.post_stop(application)
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+def run_webhook(webhook_url: str, port: int = 5000) -> None:
+    """Run the bot in webhook mode until interrupted."""
+    import asyncio
+    import secrets
+
+    # Updates from different chats are handled concurrently
+    application = build_application(concurrent_updates=int(os.getenv("WEBHOOK_CONCURRENCY", 256)))
+    secret_token = os.getenv("TELEGRAM_WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+
+    async def serve():
+        server = await start_webhook(application, webhook_url, port, secret_token)
+        try:
+            await server.serve_forever()
+        finally:
+            await stop_webhook(application, server)
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+def run_polling() -> None:
+    """Run the bot in long-polling mode."""
+    build_application().run_polling()
+
+def main() -> None:
+    """Start the bot."""
+    run_polling()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,217 @@
+"""
+Asyncio HTTP server for receiving Telegram webhook updates.
+
+Telegram POSTs each update as a JSON body. The server validates the secret
+token and body size, acknowledges the request immediately and processes the
+update in its own task, so slow handlers never hold up ingestion. Once
+max_pending updates are in flight, further updates are answered with 503 so
+Telegram retries them later, and clients that stall mid-request are
+disconnected after read_timeout seconds.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "x-telegram-bot-api-secret-token"
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    503: "Service Unavailable",
+}
+
+class WebhookServer:
+    """
+    Minimal HTTP/1.1 server that hands Telegram updates to an async callback.
+    """
+    def __init__(self, on_update: Callable[[Dict], Awaitable[None]], path: str = "/",
+                 secret_token: Optional[str] = None, host: str = "0.0.0.0", port: int = 5000,
+                 max_body_size: int = 1 << 20, max_concurrency: int = 256,
+                 max_header_size: int = 16 << 10, max_pending: int = 4096, read_timeout: float = 30.0):
+        """
+        Args:
+            on_update: Coroutine called with each decoded update
+            path: URL path the webhook is registered on
+            secret_token: Expected X-Telegram-Bot-Api-Secret-Token header (None to skip the check)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            max_body_size: Largest accepted request body, in bytes
+            max_concurrency: Maximum number of updates processed at the same time
+            max_header_size: Largest accepted request head, in bytes
+            max_pending: Maximum number of accepted updates not yet processed; more are answered with 503
+            read_timeout: Seconds a client may take to send a request head or body,
+                including the wait for the next request on a kept-alive connection
+        """
+        self.on_update = on_update
+        self.path = path
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self.max_body_size = max_body_size
+        self.max_header_size = max_header_size
+        self.max_pending = max_pending
+        self.read_timeout = read_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        # Open connections and the tasks serving them
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._server: Optional[asyncio.base_events.Server] = None
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self):
+        """
+        Start listening. When port is 0, self.port is updated to the bound port.
+        """
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=self.max_header_size
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+
+    async def serve_forever(self):
+        """
+        Start the server if needed and serve until cancelled.
+        """
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        """
+        Stop accepting connections, close open ones and wait for in-flight updates to finish.
+        """
+        if self._server is not None:
+            self._server.close()
+            # Idle keep-alive connections would otherwise keep wait_closed waiting
+            connections = list(self._connections.items())
+            for writer, _ in connections:
+                writer.close()
+            await asyncio.gather(*(task for _, task in connections), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            keep_alive = True
+            while keep_alive:
+                keep_alive = await self._handle_request(reader, writer)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """
+        Handle one request on a connection.
+
+        Returns:
+            True if the connection can be reused for another request
+        """
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.read_timeout)
+        except asyncio.LimitOverrunError:
+            await self._respond(writer, 431, keep_alive=False)
+            return False
+
+        method, path, headers = self._parse_head(head)
+        keep_alive = headers.get("connection", "").lower() != "close"
+
+        if path.split("?", 1)[0] != self.path:
+            return await self._reject(reader, writer, headers, 404, keep_alive)
+        if method != "POST":
+            return await self._reject(reader, writer, headers, 405, keep_alive)
+        if self.secret_token is not None and not hmac.compare_digest(
+            headers.get(SECRET_TOKEN_HEADER, "").encode(), self.secret_token.encode()
+        ):
+            return await self._reject(reader, writer, headers, 403, keep_alive)
+
+        length = headers.get("content-length")
+        if length is None or not length.isdigit():
+            self.rejected += 1
+            await self._respond(writer, 411, keep_alive=False)
+            return False
+        if int(length) > self.max_body_size:
+            # Don't read an oversized body, just drop the connection
+            self.rejected += 1
+            await self._respond(writer, 413, keep_alive=False)
+            return False
+
+        body = await asyncio.wait_for(reader.readexactly(int(length)), self.read_timeout)
+        try:
+            update = json.loads(body)
+        except ValueError:
+            self.rejected += 1
+            await self._respond(writer, 400, keep_alive)
+            return keep_alive
+
+        if len(self._tasks) >= self.max_pending:
+            # Push back instead of queueing without bound; Telegram redelivers the update
+            self.rejected += 1
+            await self._respond(writer, 503, keep_alive)
+            return keep_alive
+
+        self.received += 1
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        await self._respond(writer, 200, keep_alive)
+        return keep_alive
+
+    async def _process(self, update: Dict):
+        async with self._semaphore:
+            try:
+                await self.on_update(update)
+            except Exception:
+                logger.exception(f"Error processing webhook update {update.get('update_id')}")
+
+    async def _reject(self, reader, writer, headers: Dict[str, str], status: int, keep_alive: bool) -> bool:
+        """
+        Answer with an error status, discarding a reasonably sized body so the connection stays usable.
+        """
+        self.rejected += 1
+        length = headers.get("content-length", "0")
+        if not length.isdigit() or int(length) > self.max_body_size:
+            keep_alive = False
+        else:
+            await asyncio.wait_for(reader.readexactly(int(length)), self.read_timeout)
+        await self._respond(writer, status, keep_alive)
+        return keep_alive
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, Dict[str, str]]:
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        method, path = (parts[0], parts[1]) if len(parts) >= 2 else ("", "")
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        return method, path, headers
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, keep_alive: bool):
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Length: 0\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
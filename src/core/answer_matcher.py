@@ -0,0 +1,191 @@
+"""
+Free-text answer matching.
+
+Users often type an answer instead of pressing a button. The matcher compiles
+every question's labels in each locale, aliases, synonyms and vendor names
+(English and Hebrew, from the vendor registry) into normalised
+dictionaries once, so a typed answer is resolved with a bounded number of
+lookups: the normalised text itself, its single-character deletions (which
+catch one typo) and its words.
+"""
+
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.conversation import DEFAULT_FLOW, ConversationFlow, ConversationState, Step
+from src.core.registry import VENDORS
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+
+# Phrases shorter than this aren't typo-matched: one edit turns "כן" into too many things
+MIN_FUZZY_LENGTH = 4
+# Longer messages are only matched exactly or word by word
+MAX_FUZZY_LENGTH = 40
+
+_AMBIGUOUS = object()
+_SEPARATORS = re.compile(r"[\W_]+")
+
+def normalise(text: str) -> str:
+    """
+    Canonical form of a typed answer.
+
+    Unicode compatibility forms are folded, case and Hebrew vowel points are
+    dropped and punctuation runs become single spaces.
+
+    Args:
+        text: The raw answer
+
+    Returns:
+        The normalised answer, possibly empty
+    """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", text).strip()
+
+def deletions(text: str) -> Iterator[str]:
+    """
+    Every string one character shorter than text.
+    """
+    for i in range(len(text)):
+        yield text[:i] + text[i + 1:]
+
+class FieldMatcher:
+    """
+    The compiled phrases of one question.
+    """
+    __slots__ = ("exact", "variants")
+
+    def __init__(self, phrases: Iterable[Tuple[str, Any]]):
+        """
+        Args:
+            phrases: (phrase, value) pairs; phrases are normalised here
+
+        Raises:
+            ValueError: If one phrase is given two different values
+        """
+        self.exact: Dict[str, Any] = {}
+        for phrase, value in phrases:
+            key = normalise(phrase)
+            if not key:
+                continue
+            if key in self.exact and self.exact[key] != value:
+                raise ValueError(f"Answer '{phrase}' means both {self.exact[key]!r} and {value!r}")
+            self.exact[key] = value
+
+        # Each phrase and its deletions, so that lookups of the input and its
+        # deletions find phrases one insertion, deletion or substitution away.
+        # Short phrases only match inputs with one extra character
+        self.variants: Dict[str, Any] = {}
+        for key, value in self.exact.items():
+            for variant in (key, *deletions(key)) if len(key) >= MIN_FUZZY_LENGTH else (key,):
+                self.variants[variant] = value if self.variants.get(variant, value) == value else _AMBIGUOUS
+
+    def match(self, text: str) -> Tuple[bool, Any]:
+        """
+        Resolve a normalised answer.
+
+        Returns:
+            (True, value) if the answer means exactly one value, else (False, None)
+        """
+        value = self.exact.get(text, _AMBIGUOUS)
+        if value is not _AMBIGUOUS:
+            return True, value
+
+        if MIN_FUZZY_LENGTH <= len(text) <= MAX_FUZZY_LENGTH:
+            found = self._agree(self.variants.get(variant) for variant in (text, *deletions(text))
+                                if variant in self.variants)
+            if found[0]:
+                return found
+
+        words = text.split()
+        if len(words) > 1:
+            pairs = (f"{first} {second}" for first, second in zip(words, words[1:]))
+            return self._agree(self.exact[phrase] for phrase in (*words, *pairs) if phrase in self.exact)
+        return False, None
+
+    @staticmethod
+    def _agree(values: Iterable[Any]) -> Tuple[bool, Any]:
+        """
+        (True, value) if the values found are all the same unambiguous one, else (False, None).
+        """
+        found: List[Any] = []
+        for value in values:
+            if value is _AMBIGUOUS:
+                return False, None
+            if not found:
+                found.append(value)
+            elif value != found[0]:
+                return False, None
+        return (True, found[0]) if found else (False, None)
+
+class AnswerMatcher:
+    """
+    Resolves typed answers for every question of a conversation flow.
+    """
+    def __init__(self, flow: ConversationFlow = DEFAULT_FLOW, synonyms: Optional[Dict] = None):
+        """
+        Args:
+            flow: The conversation flow whose questions are matched
+            synonyms: Extra phrases per field, as in answer_synonyms.json
+
+        Raises:
+            ValueError: If a phrase is given two different values within one question
+        """
+        synonyms = synonyms or {}
+        self._fields: Dict[ConversationState, FieldMatcher] = {}
+        for state, step in flow.steps.items():
+            phrases = list(self._step_phrases(step))
+            for steps in flow.translations.values():
+                # Users of every locale may type any language's labels
+                phrases.extend(self._step_phrases(steps[state]))
+            for entry in synonyms.get(step.field, []):
+                if entry["value"] in step.values:
+                    phrases.extend((phrase, entry["value"]) for phrase in entry["phrases"])
+            self._fields[state] = FieldMatcher(phrases)
+
+    @classmethod
+    def from_files(cls, flow: ConversationFlow = DEFAULT_FLOW, synonyms_file=None) -> 'AnswerMatcher':
+        """
+        Build a matcher from a synonyms file (default: the packaged answer_synonyms.json).
+        """
+        with open(synonyms_file or DATA_DIR / 'answer_synonyms.json', 'r', encoding='utf-8') as f:
+            return cls(flow, json.load(f))
+
+    @staticmethod
+    def _step_phrases(step: Step) -> Iterator[Tuple[str, Any]]:
+        """
+        The phrases a question accepts anyway: labels, typed aliases, string values and vendor names.
+        """
+        codes = set()
+        for row in step.choices:
+            for choice in row:
+                codes.add(choice.code)
+                yield choice.label, choice.value
+                if isinstance(choice.value, str):
+                    yield choice.value, choice.value
+                elif step.field == "vendor":
+                    # Labels are the Hebrew names; users write the English ones too
+                    yield VENDORS.name(choice.value), choice.value
+        for answer, value in step.answers.items():
+            # Callback codes are button data, not something users type
+            if answer not in codes:
+                yield answer, value
+
+    def match(self, state: ConversationState, text: str) -> Tuple[bool, Any]:
+        """
+        Resolve a typed answer to the question asked in a state.
+
+        Args:
+            state: The conversation state whose question is being answered
+            text: The user's message
+
+        Returns:
+            (True, value) if the message clearly means one answer, else (False, None)
+        """
+        field = self._fields.get(state)
+        if field is None:
+            return False, None
+        return field.match(normalise(text))
@@ -0,0 +1,159 @@
+"""
+Eligibility bitsets over the plan catalogue.
+
+Every attribute value a preference can select on (no smart meter required,
+all-day discount, each preference window, any time-of-day window, each
+vendor) has one bitset: a Python int whose bit b is set if the b-th plan has
+that value. Plans are numbered best-first, by discount and then catalogue
+order, so the plans eligible for any combination of answers take a few ANDs
+and the best of them is the lowest set bit.
+
+Within a preference window plans score their discount times the fraction of
+the window they cover, so each window also has one bitset per number of hours
+covered. The best plan in a window is the best of the lowest set bits of those
+few bitsets.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.core.calculator import PreferenceKey, Provider, vendor_key
+from src.core.windows import PREFERENCE_WINDOWS, discount_hours, preference_window
+
+def value_bitsets(column: Sequence[Any]) -> Dict[Any, int]:
+    """
+    Build one bitset per distinct value of a column: bit b is set if column[b] is that value.
+
+    The column is written out as one byte per row, then each value's bitset is
+    a byte translation into binary digits parsed by int, so the work per row
+    happens in C.
+
+    Args:
+        column: Hashable values, one per bit
+
+    Returns:
+        The bitset of each value present in the column
+    """
+    codes = {value: code for code, value in enumerate(dict.fromkeys(column))}
+    if not codes:
+        return {}
+    if len(codes) > 256:
+        return {value: int(''.join(['1' if item == value else '0' for item in reversed(column)]), 2)
+                for value in codes}
+    # The last row is the most significant digit
+    encoded = bytes([codes[value] for value in reversed(column)])
+    bitsets = {}
+    for value, code in codes.items():
+        digits = bytes(0x31 if byte == code else 0x30 for byte in range(256))
+        bitsets[value] = int(encoded.translate(digits), 2)
+    return bitsets
+
+class PlanBitsets:
+    """
+    One bitset per plan attribute value, over the plans in rank order.
+    """
+    def __init__(self, providers: Sequence[Provider]):
+        """
+        Args:
+            providers: The plans, in catalogue order
+        """
+        discounts = [provider.discount_pct for provider in providers]
+        # Bit b stands for ranked[b], the plan at positions[b] in the catalogue;
+        # a reversed sort keeps ties in catalogue order
+        self.positions: List[int] = sorted(range(len(discounts)), key=discounts.__getitem__, reverse=True)
+        self.ranked: List[Provider] = [providers[position] for position in self.positions]
+        self.all = (1 << len(self.ranked)) - 1
+
+        ranked = self.ranked
+        self._bits: Dict[Tuple[str, Any], int] = {}
+        for attribute, column in (
+            ("vendor", [provider.vendor_id for provider in ranked]),
+            ("no_smart_meter", [not provider.requires_smart_meter for provider in ranked]),
+            ("windowed", [provider.hours is not None for provider in ranked]),
+        ):
+            for value, bits in value_bitsets(column).items():
+                self._bits[attribute, value] = bits
+        self._bits["hours", None] = self.all & ~self._bits.get(("windowed", True), 0)
+
+        # Per preference window, the plans covering each number of its hours, most hours first
+        self._levels: Dict[Tuple[int, int], List[Tuple[float, int]]] = {}
+        covered: Dict[Any, int] = {}
+        for window in PREFERENCE_WINDOWS:
+            hours = discount_hours(window)
+            for plan_hours in dict.fromkeys(provider.hours for provider in ranked):
+                if plan_hours is not None:
+                    covered[plan_hours] = len(discount_hours(plan_hours) & hours)
+            levels = value_bitsets([0 if provider.hours is None else covered[provider.hours] for provider in ranked])
+            levels.pop(0, None)
+            self._levels[window] = [(count / len(hours), levels[count]) for count in sorted(levels, reverse=True)]
+            self._bits["hours", window] = sum(levels.values())
+
+    def __len__(self) -> int:
+        return len(self.ranked)
+
+    def answer_mask(self, field: str, value: Any) -> int:
+        """
+        The plans a single preference answer leaves eligible, matching how lookup interprets it.
+
+        Args:
+            field: A preference field (any other field doesn't rule plans out)
+            value: The answer
+
+        Returns:
+            The bitset of eligible plans
+        """
+        bits = self._bits
+        if field == "has_smart_meter":
+            return self.all if value else bits.get(("no_smart_meter", True), 0)
+        if field == "discount_type":
+            return bits.get(("hours", None), 0) if value == "fixed" else bits.get(("windowed", True), 0)
+        if field == "time_preference":
+            return bits.get(("hours", preference_window(value)), 0)
+        if field == "vendor" and value != "none":
+            return bits.get(("vendor", vendor_key(value)), 0)
+        return self.all
+
+    def key_mask(self, key: PreferenceKey) -> int:
+        """
+        The plans eligible for a normalised preference key (see Catalogue.lookup).
+        """
+        has_smart_meter, hours, vendor = key
+        mask = self._bits.get(("hours", hours), 0)
+        if not has_smart_meter:
+            mask &= self._bits.get(("no_smart_meter", True), 0)
+        if vendor is not None:
+            mask &= self._bits.get(("vendor", vendor), 0)
+        return mask
+
+    def best(self, mask: int, window: Optional[Tuple[int, int]] = None) -> Optional[Provider]:
+        """
+        The best plan in a bitset, or None if it is empty.
+
+        Args:
+            mask: The eligible plans
+            window: A preference window the plans are ranked within, by discount
+                times overlap (default: by discount)
+        """
+        if not mask:
+            return None
+        if window is None:
+            return self.ranked[(mask & -mask).bit_length() - 1]
+        best = None
+        for overlap, level in self._levels.get(window, ()):
+            bits = mask & level
+            if bits:
+                bit = (bits & -bits).bit_length() - 1
+                rank = (-self.ranked[bit].discount_pct * overlap, self.positions[bit])
+                if best is None or rank < best[0]:
+                    best = (rank, bit)
+        return None if best is None else self.ranked[best[1]]
+
+    def plans(self, mask: int) -> Iterator[Provider]:
+        """
+        The plans in a bitset, best first.
+        """
+        # Scanning the binary digits keeps this linear in the catalogue size
+        digits = bin(mask)[:1:-1]
+        bit = digits.find('1')
+        while bit >= 0:
+            yield self.ranked[bit]
+            bit = digits.find('1', bit + 1)
@@ -0,0 +1,235 @@
+"""
+Parallel bulk ranking of plans by savings for large customer files.
+
+Customer load profiles are read from a .npy matrix (one row per customer, in
+the same intervals as the plan discount matrix, e.g. the 24 hour-of-day totals
+of fold_profile) that every worker memory-maps. The plan discount matrix is
+copied once into shared memory, so neither is pickled per task. Customers are
+split into shards that a process pool ranks independently; each finished shard
+is written to its own file, renamed into place when complete, so an
+interrupted job resumes by skipping the shards already on disk.
+"""
+
+import json
+import os
+import time
+from multiprocessing import get_context, shared_memory
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.core.calculator import file_signature
+from src.core.savings import DEFAULT_PRICE_PER_KWH
+
+# Customers ranked per task
+SHARD_SIZE = 20_000
+
+# Largest number of plans per customer selected by repeated argmax rather than a full sort
+SELECTION_TOP = 16
+
+MANIFEST = "manifest.json"
+
+class BulkReport(NamedTuple):
+    """
+    Summary of one run of a bulk ranking job.
+    """
+    customers: int    # Customers in the profile file
+    shards: int       # Shards in the job
+    ranked: int       # Customers ranked by this run; the rest were done already
+    seconds: float
+
+    @property
+    def customers_per_second(self) -> float:
+        return self.ranked / self.seconds if self.seconds else 0.0
+
+def rank_profiles(discounts: np.ndarray, profiles: np.ndarray, top: int,
+                  price_per_kwh: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The top plans of each customer by savings.
+
+    Args:
+        discounts: Plans x intervals discount fractions
+        profiles: Customers x intervals kWh
+        top: Plans to keep per customer
+        price_per_kwh: Undiscounted price in ILS per kWh
+
+    Returns:
+        (customers x top plan indices, customers x top savings in ILS), best first;
+        equal savings keep catalogue order
+    """
+    savings = profiles.astype(np.float32, copy=False) @ discounts.T
+    customers, plans = savings.shape
+    top = min(top, plans)
+    if top > SELECTION_TOP:
+        ranked = np.argsort(-savings, axis=1, kind="stable")[:, :top]
+        return ranked.astype(np.int32), np.take_along_axis(savings, ranked, axis=1) * np.float32(price_per_kwh)
+
+    # argmax returns the first of equal savings, so taking the best plan and
+    # ruling it out top times resolves ties in catalogue order
+    rows = np.arange(customers)
+    ranked = np.empty((customers, top), dtype=np.int32)
+    values = np.empty((customers, top), dtype=np.float32)
+    for rank in range(top):
+        best = savings.argmax(axis=1)
+        ranked[:, rank] = best
+        values[:, rank] = savings[rows, best]
+        savings[rows, best] = -np.inf
+    return ranked, values * np.float32(price_per_kwh)
+
+# Worker state set by _init_worker: the shared plan matrix and the memory-mapped profiles
+_worker: Dict = {}
+
+def _init_worker(shm_name: str, shape: Tuple[int, int], profiles_file: str, top: int, price_per_kwh: float):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker.update(
+        shm=shm,
+        discounts=np.ndarray(shape, dtype=np.float32, buffer=shm.buf),
+        profiles=np.load(profiles_file, mmap_mode="r"),
+        top=top,
+        price_per_kwh=price_per_kwh,
+    )
+
+def _rank_shard(task: Tuple[int, int, int, str]) -> int:
+    shard, start, stop, output_dir = task
+    plans, savings = rank_profiles(_worker["discounts"], _worker["profiles"][start:stop],
+                                   _worker["top"], _worker["price_per_kwh"])
+    path = shard_path(output_dir, shard)
+    tmp_file = path.with_suffix(".tmp")
+    with open(tmp_file, "wb") as f:
+        np.savez(f, plans=plans, savings=savings)
+    os.replace(tmp_file, path)
+    return shard
+
+def shard_path(output_dir, shard: int) -> Path:
+    """
+    The result file of a shard.
+    """
+    return Path(output_dir) / f"shard-{shard:06d}.npz"
+
+class BulkRanker:
+    """
+    Ranks plans for every customer of a profile file across a pool of processes.
+    """
+    def __init__(self, discounts: np.ndarray, price_per_kwh: float = DEFAULT_PRICE_PER_KWH, top: int = 3,
+                 shard_size: int = SHARD_SIZE, workers: Optional[int] = None):
+        """
+        Args:
+            discounts: Plans x intervals discount fractions, e.g. SavingsEngine.discount_matrix
+                or TariffSimulator.discount_matrix
+            price_per_kwh: Undiscounted price in ILS per kWh
+            top: Plans kept per customer
+            shard_size: Customers per task
+            workers: Worker processes (default: one per CPU); 1 ranks in this process
+        """
+        self.discounts = np.ascontiguousarray(discounts, dtype=np.float32)
+        self.price_per_kwh = price_per_kwh
+        self.top = top
+        self.shard_size = shard_size
+        self.workers = workers or os.cpu_count() or 1
+
+    def _manifest(self, profiles_file, customers: int) -> Dict:
+        return {
+            "profiles": str(Path(profiles_file).resolve()),
+            "signature": list(file_signature(profiles_file)),
+            "customers": customers,
+            "plans": self.discounts.shape[0],
+            "plan_checksum": float(self.discounts.sum(dtype=np.float64)),
+            "price_per_kwh": self.price_per_kwh,
+            "top": self.top,
+            "shard_size": self.shard_size,
+        }
+
+    def run(self, profiles_file, output_dir) -> BulkReport:
+        """
+        Rank every customer, resuming a job previously interrupted in output_dir.
+
+        Args:
+            profiles_file: A customers x intervals .npy matrix of load profiles
+            output_dir: Directory of the job's shard files and manifest
+
+        Returns:
+            A BulkReport
+
+        Raises:
+            ValueError: If the profiles don't match the plan matrix, or output_dir
+                holds a job with different inputs or settings
+        """
+        profiles = np.load(profiles_file, mmap_mode="r")
+        if profiles.ndim != 2 or profiles.shape[1] != self.discounts.shape[1]:
+            raise ValueError(f"Profiles of shape {profiles.shape} don't match the "
+                             f"{self.discounts.shape[1]} intervals of the plan matrix")
+        customers = profiles.shape[0]
+        del profiles
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._manifest(profiles_file, customers)
+        manifest_file = output_dir / MANIFEST
+        if manifest_file.exists():
+            with open(manifest_file, encoding="utf-8") as f:
+                if json.load(f) != manifest:
+                    raise ValueError(f"{output_dir} holds a different ranking job")
+        else:
+            with open(manifest_file, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+        tasks = [
+            (shard, start, min(start + self.shard_size, customers), str(output_dir))
+            for shard, start in enumerate(range(0, customers, self.shard_size))
+            if not shard_path(output_dir, shard).exists()
+        ]
+        started = time.perf_counter()
+        shm = shared_memory.SharedMemory(create=True, size=max(self.discounts.nbytes, 1))
+        try:
+            np.ndarray(self.discounts.shape, dtype=np.float32, buffer=shm.buf)[:] = self.discounts
+            initargs = (shm.name, self.discounts.shape, str(profiles_file), self.top, self.price_per_kwh)
+            if self.workers == 1 or len(tasks) <= 1:
+                _init_worker(*initargs)
+                try:
+                    for task in tasks:
+                        _rank_shard(task)
+                finally:
+                    # The views into the shared block go before the block is closed
+                    worker_shm = _worker.pop("shm")
+                    _worker.clear()
+                    worker_shm.close()
+            else:
+                with get_context().Pool(self.workers, _init_worker, initargs) as pool:
+                    for _ in pool.imap_unordered(_rank_shard, tasks):
+                        pass
+        finally:
+            shm.close()
+            shm.unlink()
+
+        shards = -(-customers // self.shard_size)
+        ranked = sum(stop - start for _, start, stop, _ in tasks)
+        return BulkReport(customers, shards, ranked, time.perf_counter() - started)
+
+def read_results(output_dir) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collect the results of a finished job.
+
+    Returns:
+        (customers x top plan indices, customers x top savings in ILS), in profile order
+
+    Raises:
+        ValueError: If shards are missing
+    """
+    output_dir = Path(output_dir)
+    with open(output_dir / MANIFEST, encoding="utf-8") as f:
+        manifest = json.load(f)
+    shards = -(-manifest["customers"] // manifest["shard_size"])
+    missing = [shard for shard in range(shards) if not shard_path(output_dir, shard).exists()]
+    if missing:
+        raise ValueError(f"{len(missing)} of {shards} shards are not ranked yet")
+    plans: List[np.ndarray] = []
+    savings: List[np.ndarray] = []
+    for shard in range(shards):
+        with np.load(shard_path(output_dir, shard)) as data:
+            plans.append(data["plans"])
+            savings.append(data["savings"])
+    top = min(manifest["top"], manifest["plans"])
+    if not plans:
+        return np.zeros((0, top), dtype=np.int32), np.zeros((0, top), dtype=np.float32)
+    return np.concatenate(plans), np.concatenate(savings)
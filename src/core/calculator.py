@@ -1,35 +1,607 @@
+import bisect
+import heapq
 import json
-from typing import Dict, Optional
+import os
+import pickle
+import sys
+from collections.abc import Mapping
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
 from pathlib import Path
 
+from src.core.message_templates import Fragments, assemble, hours_description, plan_fragments, render_fragments
+from src.core.messages import DEFAULT_LOCALE, MESSAGES
+from src.core.registry import PACKAGES, VENDORS
+from src.core.stats import CatalogueStats, SegmentStats, preference_score
+from src.core.windows import preference_window, preference_windows, window_overlap
+
+if TYPE_CHECKING:
+    from src.core.bitsets import PlanBitsets
+
+# Order of the fields in tuple-form preference records
+PREFERENCE_FIELDS = ("has_smart_meter", "discount_type", "time_preference", "vendor")
+
+# A sequence of (preference field, answer) pairs given so far in a conversation
+Answers = Tuple[Tuple[str, Any], ...]
+
+# Bumped whenever the pickled Catalogue layout changes, so older snapshots are rebuilt
+SNAPSHOT_VERSION = 8
+
+# Index key of a vendor preference no plan can match
+UNKNOWN_VENDOR = -1
+
+# Preference key: (has_smart_meter, hours window, vendor id or None for any vendor)
+PreferenceKey = Tuple[bool, Optional[Tuple[int, int]], Optional[int]]
+
+# Day names of calendar tariff rules, indexed by date.weekday()
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+class TariffRule(NamedTuple):
+    """
+    A discount that applies on part of the calendar.
+
+    A field left as None places no condition. The day conditions are checked on
+    the date of each interval, so a window wrapping past midnight continues
+    under the next day's rules.
+    """
+    discount_pct: float
+    hours: Optional[Tuple[int, int]] = None   # None for all day, or (start, end)
+    days: Optional[FrozenSet[int]] = None     # Weekdays, 0 for Monday (see WEEKDAYS)
+    months: Optional[FrozenSet[int]] = None   # 1 to 12
+    holidays: Optional[bool] = None           # True for holidays only, False for non-holidays only
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TariffRule':
+        """
+        Build a rule from its providers file entry, e.g. {"discount_pct": 20, "hours": [23, 7], "days": ["fri", "sat"]}.
+        """
+        hours = data.get('hours')
+        days = data.get('days')
+        months = data.get('months')
+        return cls(
+            data['discount_pct'],
+            None if hours is None else (hours[0], hours[1]),
+            None if days is None else frozenset(WEEKDAYS.index(day) for day in days),
+            None if months is None else frozenset(months),
+            data.get('holidays'),
+        )
+
+def file_signature(path) -> Optional[Tuple[int, int]]:
+    """
+    The (mtime, size) signature of a file, or None if it is missing.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
 class Provider:
     """
     Represents an electricity provider with its plan details.
     """
+    __slots__ = ('name', 'vendor', 'discount_pct', 'hours', 'requires_smart_meter', 'vendor_id', 'package_id',
+                 'rules')
+
     def __init__(self, data: Dict):
-        self.name = data['name']
-        self.vendor = data['vendor']
+        # Names repeat across plans and catalogue versions, so intern them
+        self.name = sys.intern(data['name'])
+        self.vendor = sys.intern(data['vendor'])
+        self.vendor_id = VENDORS.intern(self.vendor)
+        self.package_id = PACKAGES.intern(self.name)
         self.discount_pct = data['discount_pct']
-        self.hours = data['hours']  # None for all-day or Tuple[int, int] for specific hours
+        hours = data['hours']
+        self.hours = None if hours is None else (hours[0], hours[1])  # None for all-day or (start, end)
         self.requires_smart_meter = data['requires_smart_meter']
+        # Calendar tariff rules, first match wins; empty for plans fully described by discount_pct and hours
+        self.rules = tuple(TariffRule.from_dict(rule) for rule in data.get('rules', ()))
 
     def __str__(self) -> str:
         hours_str = "All day" if self.hours is None else f"{self.hours[0]}:00-{self.hours[1]}:00"
         return f"{self.vendor} - {self.name} ({self.discount_pct}% discount, {hours_str})"
 
+def validate_plan(data: Dict):
+    """
+    Validate a single plan entry from a providers file.
+
+    Args:
+        data: The plan dictionary
+
+    Raises:
+        ValueError: If a field is missing or has an invalid value
+    """
+    missing = [f for f in ('name', 'vendor', 'discount_pct', 'hours', 'requires_smart_meter') if f not in data]
+    if missing:
+        raise ValueError(f"Plan is missing fields: {', '.join(missing)}")
+    _validate_discount(data['name'], data)
+    for rule in data.get('rules', ()):
+        _validate_discount(data['name'], rule)
+        days = rule.get('days')
+        if days is not None and (not days or not all(day in WEEKDAYS for day in days)):
+            raise ValueError(f"Invalid days in a rule of plan '{data['name']}': {days!r}")
+        months = rule.get('months')
+        if months is not None and (not months or not all(isinstance(m, int) and 1 <= m <= 12 for m in months)):
+            raise ValueError(f"Invalid months in a rule of plan '{data['name']}': {months!r}")
+        if rule.get('holidays') not in (None, True, False):
+            raise ValueError(f"Invalid holidays in a rule of plan '{data['name']}': {rule['holidays']!r}")
+
+def _validate_discount(name: str, data: Dict):
+    """
+    Validate the discount_pct and hours of a plan or one of its rules.
+    """
+    if not isinstance(data.get('discount_pct'), (int, float)) or not 0 <= data['discount_pct'] <= 100:
+        raise ValueError(f"Invalid discount_pct for plan '{name}': {data.get('discount_pct')!r}")
+    hours = data.get('hours')
+    if hours is not None and (
+        len(hours) != 2 or not all(isinstance(h, int) and 0 <= h <= 23 for h in hours)
+    ):
+        raise ValueError(f"Invalid hours for plan '{name}': {hours!r}")
+
+def vendor_key(vendor: Union[str, int]) -> Optional[int]:
+    """
+    The index key for a vendor preference.
+
+    Args:
+        vendor: A vendor id, a vendor name in English or Hebrew, or "none"
+
+    Returns:
+        None for no preference, the vendor id, or UNKNOWN_VENDOR if the vendor isn't registered
+    """
+    if vendor == "none":
+        return None
+    vendor_id = VENDORS.lookup(vendor)
+    return UNKNOWN_VENDOR if vendor_id is None else vendor_id
+
+class Ranking(NamedTuple):
+    """
+    How ranked recommendations are ordered.
+
+    Criteria are compared in turn, and plans equal on all of them keep their
+    catalogue order. The available criteria are:
+        - discount: higher discount first; for a preferred window, the discount
+          times the fraction of the window the plan covers
+        - smart_meter: plans that don't require a smart meter first
+        - vendor: vendors earlier in preferred_vendors (names or ids) first, then all others
+    """
+    criteria: Tuple[str, ...] = ("discount",)
+    preferred_vendors: Tuple[Union[str, int], ...] = ()
+
+    def sort_key(self, window: Optional[Tuple[int, int]] = None) -> Callable[[Provider], Tuple]:
+        """
+        Build the key function ordering plans best-first.
+
+        Args:
+            window: The preferred discount window, or None for the fixed-discount preference
+
+        Raises:
+            ValueError: If a criterion is unknown
+        """
+        vendor_order = {}
+        for vendor in self.preferred_vendors:
+            vendor_order.setdefault(vendor_key(vendor), len(vendor_order))
+        unranked = len(vendor_order)
+        if window is None:
+            discount = lambda provider: -provider.discount_pct
+        else:
+            overlaps: Dict[Optional[Tuple[int, int]], float] = {}
+
+            def discount(provider):
+                overlap = overlaps.get(provider.hours)
+                if overlap is None:
+                    overlap = overlaps[provider.hours] = window_overlap(provider.hours, window)
+                return -provider.discount_pct * overlap
+        parts = {
+            "discount": discount,
+            "smart_meter": lambda provider: bool(provider.requires_smart_meter),
+            "vendor": lambda provider: vendor_order.get(provider.vendor_id, unranked),
+        }
+        unknown = [criterion for criterion in self.criteria if criterion not in parts]
+        if unknown:
+            raise ValueError(f"Unknown ranking criteria: {', '.join(unknown)}")
+        selected = [parts[criterion] for criterion in self.criteria]
+        # The key runs once per eligible plan, so short rankings are unrolled
+        if len(selected) == 1:
+            first, = selected
+            return lambda provider: (first(provider),)
+        if len(selected) == 2:
+            first, second = selected
+            return lambda provider: (first(provider), second(provider))
+        if len(selected) == 3:
+            first, second, third = selected
+            return lambda provider: (first(provider), second(provider), third(provider))
+        return lambda provider: tuple(part(provider) for part in selected)
+
+# Highest discount first, the order lookup picks the best plan in
+DEFAULT_RANKING = Ranking()
+
+class Catalogue:
+    """
+    A snapshot of the plan catalogue together with everything derived from it.
+
+    Holds the plans, the recommendation index, the catalogue statistics and the
+    formatted-message cache. Readers take a reference to one snapshot and use it
+    throughout a request, so replacing the catalogue is a single reference swap.
+    """
+    def __init__(self, providers: Iterable[Provider], source: Optional[str] = None):
+        self.providers = list(providers)
+        self.source = source
+        self.stats = CatalogueStats(self.providers)
+
+        # Formatted recommendation messages keyed on the normalised preference tuple and locale
+        self.messages: Dict[Tuple, Optional[str]] = {}
+        # Pre-rendered message fragments of every plan, keyed by locale and plan. The
+        # default locale is rendered now, other locales the first time they are used
+        self.fragments: Dict[str, Dict[Provider, Fragments]] = {DEFAULT_LOCALE: render_fragments(self.providers)}
+        # The message catalogue the fragments were rendered from
+        self.templates = MESSAGES.checksum
+        # Bitset of eligible plans and the best of them, keyed on the answers given so far
+        self.narrowed: Dict[Answers, Tuple[int, Optional[Provider]]] = {}
+        # Leading plans per (preference key, ranking), and whether that is all eligible plans
+        self.ranked: Dict[Tuple, Tuple[List[Provider], bool]] = {}
+
+        self._build_index()
+        self._table = None
+        self._bitsets = None
+
+    @property
+    def vendor_ids(self) -> List[int]:
+        """
+        Ids of the vendors with at least one plan, in registry order.
+        """
+        return sorted({provider.vendor_id for provider in self.providers})
+
+    @property
+    def table(self):
+        """
+        Columnar PlanTable view of the plans, built on first use; its rows map back to providers.
+        """
+        if self._table is None or len(self._table) != len(self.providers):
+            # Imported here so NumPy is only loaded when the columnar view is used
+            from src.core.plan_table import PlanTable
+            self._table = PlanTable.from_providers(self.providers)
+        return self._table
+
+    @property
+    def bitsets(self) -> 'PlanBitsets':
+        """
+        Eligibility bitsets over the plans, built on first use.
+        """
+        if self._bitsets is None:
+            from src.core.bitsets import PlanBitsets
+            self._bitsets = PlanBitsets(self.providers)
+        return self._bitsets
+
+    @classmethod
+    def from_file(cls, providers_file) -> 'Catalogue':
+        """
+        Load and validate a catalogue from a providers JSON file.
+
+        Args:
+            providers_file: Path to the providers file
+
+        Returns:
+            The loaded Catalogue
+
+        Raises:
+            ValueError: If the file does not contain a valid plan list
+        """
+        with open(providers_file, 'r') as f:
+            data = json.load(f)
+
+        plans = data.get("providers") if isinstance(data, dict) else None
+        if not isinstance(plans, list):
+            raise ValueError(f"{providers_file} has no 'providers' list")
+        for plan in plans:
+            validate_plan(plan)
+
+        return cls([Provider(p) for p in plans], source=str(providers_file))
+
+    @classmethod
+    def load(cls, providers_file, snapshot_file=None) -> 'Catalogue':
+        """
+        Load a catalogue, through a precompiled snapshot when one is given.
+
+        A snapshot that matches the providers file is unpickled with its index
+        and statistics already built. Otherwise the providers file is parsed and
+        the snapshot is rewritten for the next start; failing to write it is not an error.
+
+        Args:
+            providers_file: Path to the providers file
+            snapshot_file: Optional path of the snapshot to read and refresh
+
+        Returns:
+            The loaded Catalogue
+        """
+        if snapshot_file is not None:
+            catalogue = cls.load_snapshot(snapshot_file, providers_file)
+            if catalogue is not None:
+                return catalogue
+        catalogue = cls.from_file(providers_file)
+        if snapshot_file is not None:
+            try:
+                catalogue.save_snapshot(snapshot_file)
+            except OSError:
+                pass
+        return catalogue
+
+    @classmethod
+    def load_snapshot(cls, snapshot_file, providers_file) -> Optional['Catalogue']:
+        """
+        Read a snapshot written by save_snapshot.
+
+        Snapshots are pickles, so only load ones this application wrote.
+
+        Args:
+            snapshot_file: Path to the snapshot
+            providers_file: The providers file the snapshot must have been built from
+
+        Returns:
+            The Catalogue, or None if the snapshot is missing, unreadable, from
+            another SNAPSHOT_VERSION or older than the providers file
+        """
+        try:
+            with open(snapshot_file, 'rb') as f:
+                version, source, signature, names, catalogue = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError):
+            return None
+        if (version != SNAPSHOT_VERSION or source != str(providers_file)
+                or signature is None or signature != file_signature(providers_file)):
+            return None
+        # Plans and the index hold registry ids, which must mean the same names in this process
+        for registry, registry_names in zip((VENDORS, PACKAGES), names):
+            if any(registry.intern(name) != name_id for name_id, name in enumerate(registry_names)):
+                return None
+        if catalogue.templates != MESSAGES.checksum:
+            # The messages changed since the snapshot was written
+            catalogue.fragments = {DEFAULT_LOCALE: render_fragments(catalogue.providers)}
+            catalogue.templates = MESSAGES.checksum
+        return catalogue
+
+    def save_snapshot(self, snapshot_file):
+        """
+        Write the catalogue, with its index and statistics, to a snapshot file.
+
+        The snapshot records the signature of the providers file it was loaded
+        from and the vendor and package names behind the ids, and is replaced atomically.
+
+        Args:
+            snapshot_file: Path to write
+        """
+        signature = file_signature(self.source) if self.source else None
+        tmp_file = f"{snapshot_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            names = (VENDORS.names(), PACKAGES.names())
+            pickle.dump((SNAPSHOT_VERSION, self.source, signature, names, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, snapshot_file)
+
+    def __getstate__(self):
+        # Caches, the columnar view, the bitsets and the fragments of other locales
+        # are rebuilt on demand rather than stored
+        state = self.__dict__.copy()
+        state.update(messages={}, narrowed={}, ranked={}, _table=None, _bitsets=None,
+                     fragments={DEFAULT_LOCALE: self.fragments[DEFAULT_LOCALE]})
+        return state
+
+    def add(self, provider: Provider):
+        """
+        Add a single plan, updating the index and statistics incrementally.
+
+        Args:
+            provider: The Provider object to add
+        """
+        position = len(self.providers)
+        self.providers.append(provider)
+        for key, entry in self._index_entries(provider, position):
+            bisect.insort(self._index.setdefault(key, []), entry)
+        self.stats.add(provider)
+        for locale, fragments in list(self.fragments.items()):
+            fragments[provider] = plan_fragments(provider, locale)
+        # A new plan shifts the rank of every plan after it, so the bitsets are rebuilt
+        self._bitsets = None
+        self.messages.clear()
+        self.narrowed.clear()
+        self.ranked.clear()
+
+    def locale_fragments(self, locale: str) -> Dict[Provider, Fragments]:
+        """
+        The pre-rendered fragments of every plan in a locale, rendered on first use.
+        Unsupported locales get the default locale's.
+        """
+        fragments = self.fragments.get(locale)
+        if fragments is None:
+            if locale not in MESSAGES.locales:
+                return self.fragments[DEFAULT_LOCALE]
+            fragments = self.fragments[locale] = render_fragments(self.providers, locale)
+        return fragments
+
+    def lookup(self, key: PreferenceKey) -> Optional[Provider]:
+        """
+        Find the best plan for a normalised preference key in the plan index.
+        """
+        has_smart_meter, hours, vendor = key
+
+        # Users with a smart meter can take plans that do or don't require one
+        meter_options = (False, True) if has_smart_meter else (False,)
+
+        best = None
+        for requires_smart_meter in meter_options:
+            bucket = self._index.get((requires_smart_meter, hours, vendor))
+            if bucket and (best is None or bucket[0][0] < best[0]):
+                best = bucket[0]
+
+        return best[1] if best else None
+
+    def top(self, key: PreferenceKey, k: int,
+            ranking: Ranking = DEFAULT_RANKING) -> List[Provider]:
+        """
+        The k best plans for a normalised preference key.
+
+        The eligible plans are the index buckets lookup reads. With the default
+        ranking these are already ordered, so the first k are merged from them
+        directly; any other ranking selects k with a heap. Neither sorts the whole
+        eligible set. Results are cached and extended (at least doubling) when a
+        later call asks for more, so paging costs nothing for the common pages.
+
+        Args:
+            key: A normalised preference key (see lookup)
+            k: Number of plans wanted
+            ranking: Order of the plans
+
+        Returns:
+            Up to k plans, best first
+        """
+        cached = self.ranked.get((key, ranking))
+        if cached is not None and (len(cached[0]) >= k or cached[1]):
+            return cached[0][:k]
+        want = max(k, 2 * len(cached[0])) if cached else k
+
+        has_smart_meter, hours, vendor = key
+        meter_options = (False, True) if has_smart_meter else (False,)
+        buckets = [self._index.get((requires, hours, vendor), ()) for requires in meter_options]
+        if ranking == DEFAULT_RANKING:
+            # Bucket entries are (rank, provider) sorted by rank, rank ending in catalogue position
+            plans = [provider for _, provider in islice(heapq.merge(*buckets), want)]
+        else:
+            sort_key = ranking.sort_key(hours)
+            entries = heapq.nsmallest(want, (entry for bucket in buckets for entry in bucket),
+                                      key=lambda entry: (sort_key(entry[1]), entry[0][1]))
+            plans = [provider for _, provider in entries]
+
+        self.ranked[(key, ranking)] = (plans, len(plans) < want)
+        return plans[:k]
+
+    def narrow(self, answers: Answers) -> Tuple[int, Optional[Provider]]:
+        """
+        The plans still eligible after a sequence of answers, and the best of them.
+
+        Each answer selects one precomputed bitset (see PlanBitsets), ANDed onto
+        the set left by the answers before it, and every set is cached, so walking
+        a conversation one answer at a time costs one AND per new answer sequence.
+        Bits are in discount order, so the best plan is the lowest set bit until a
+        time of day is chosen; then it is the best by discount and window overlap.
+
+        Args:
+            answers: (field, answer) pairs in the order they were given
+
+        Returns:
+            The eligible plans as a bitset over bitsets.ranked, and the best one
+            (None if none is eligible)
+        """
+        result = self.narrowed.get(answers)
+        if result is None:
+            bitsets = self.bitsets
+            if answers:
+                mask, _ = self.narrow(answers[:-1])
+                mask &= bitsets.answer_mask(*answers[-1])
+            else:
+                mask = bitsets.all
+            window = next((preference_window(value) for field, value in answers if field == "time_preference"),
+                          None)
+            result = self.narrowed[answers] = (mask, bitsets.best(mask, window))
+        return result
+
+    def _build_index(self):
+        """
+        Build the plan index used by lookup.
+
+        Plans are bucketed by (requires_smart_meter, preference window, vendor id),
+        and additionally under a vendor of None for users with no vendor preference.
+        All-day plans are bucketed under the fixed-discount window None, windowed
+        plans under every preference window they overlap (see preference_windows).
+        Each bucket holds (rank, provider) pairs sorted best-first, where rank is
+        (-discount_pct times the overlap, catalogue position) so ties resolve
+        exactly like a linear scan.
+        """
+        index: Dict[Tuple, List[Tuple[Tuple[float, int], Provider]]] = {}
+        for position, provider in enumerate(self.providers):
+            for key, entry in self._index_entries(provider, position):
+                index.setdefault(key, []).append(entry)
+
+        for bucket in index.values():
+            bucket.sort(key=lambda item: item[0])
+        self._index = index
+
+    @staticmethod
+    def _index_entries(provider: Provider, position: int):
+        """
+        The (bucket key, (rank, provider)) pairs under which a plan is indexed.
+        """
+        for window, overlap in preference_windows(provider.hours):
+            rank = (-provider.discount_pct * overlap, position)
+            for vendor in (provider.vendor_id, None):
+                yield (bool(provider.requires_smart_meter), window, vendor), (rank, provider)
+
 class ProviderCalculator:
     """
     Calculator for recommending the best electricity provider based on user preferences.
     """
-    def __init__(self, providers_file: str = None):
+    def __init__(self, providers_file: str = None, snapshot_file: str = None):
+        """
+        Args:
+            providers_file: Path to the providers file (default: the packaged data/providers.json)
+            snapshot_file: Optional precompiled catalogue snapshot, see Catalogue.load
+        """
         if providers_file is None:
             # Use default path relative to the package
             package_dir = Path(__file__).parent.parent
             providers_file = package_dir / 'data' / 'providers.json'
         
-        with open(providers_file, 'r') as f:
-            data = json.load(f)
-        self.providers = [Provider(p) for p in data["providers"]]
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.catalogue = Catalogue.load(providers_file, snapshot_file)
+
+    @property
+    def providers(self) -> List[Provider]:
+        """
+        The plans of the current catalogue.
+        """
+        return self.catalogue.providers
+
+    @property
+    def stats(self) -> CatalogueStats:
+        """
+        The statistics of the current catalogue.
+        """
+        return self.catalogue.stats
+
+    def swap_catalogue(self, catalogue: Catalogue) -> Catalogue:
+        """
+        Atomically replace the current catalogue.
+
+        Requests already holding the previous snapshot finish against it; every
+        later request sees the new plans, index, statistics and an empty message cache.
+
+        Args:
+            catalogue: The fully built replacement Catalogue
+
+        Returns:
+            The previous Catalogue
+        """
+        previous, self.catalogue = self.catalogue, catalogue
+        return previous
+
+    def set_providers(self, providers: List[Provider]):
+        """
+        Replace the plan catalogue.
+
+        Rebuilds the plan index and catalogue statistics and invalidates every
+        cached recommendation message.
+
+        Args:
+            providers: The new list of Provider objects
+        """
+        self.swap_catalogue(Catalogue(providers))
+
+    def add_provider(self, provider: Provider):
+        """
+        Add a single plan to the catalogue.
+
+        The index and statistics are updated incrementally rather than rebuilt.
+
+        Args:
+            provider: The Provider object to add
+        """
+        self.catalogue.add(provider)
 
     def get_recommendation(self, user_prefs: Dict) -> Optional[Provider]:
         """
@@ -39,81 +611,229 @@ class ProviderCalculator:
             user_prefs: Dictionary with keys:
                 - has_smart_meter (bool): Whether the user has a smart meter
                 - discount_type (str): "fixed" or "variable"
-                - time_preference (str): "day" or "night" (only if discount_type is "variable")
-                - vendor (str): "hot", "amisragaz", or "none"
+                - time_preference (str): "day", "evening" or "night" (only if discount_type is "variable")
+                - vendor (str or int): A vendor name (English or Hebrew), a vendor id, or "none"
         
         Returns:
             The recommended Provider object or None if no suitable provider is found
         """
-        # 1. Filter out plans the user can't take
-        valid_providers = [
-            p for p in self.providers
-            if (not p.requires_smart_meter or user_prefs["has_smart_meter"])
-        ]
+        return self.catalogue.lookup(self._preference_key(user_prefs))
 
-        if not valid_providers:
-            return None
+    def get_recommendation_message(self, user_prefs: Dict, locale: str = DEFAULT_LOCALE) -> Optional[str]:
+        """
+        Get the formatted recommendation message for the user's preferences.
 
-        # 2. Filter by discount type
-        if user_prefs["discount_type"] == "fixed":
-            # For fixed discount, prefer plans with no specific hours
-            valid_providers = [p for p in valid_providers if p.hours is None]
-        else:  # variable discount
-            # For variable discount, filter by time preference
-            if user_prefs["time_preference"] == "day":
-                valid_providers = [p for p in valid_providers if p.hours == [7, 17]]
-            else:  # night
-                valid_providers = [p for p in valid_providers if p.hours == [23, 7]]
-
-        if not valid_providers:
-            return None
+        Messages are memoized per normalised preference tuple and locale, so identical
+        requests return the already-formatted message until the catalogue changes.
 
-        # 3. Filter by vendor if specified
-        if user_prefs["vendor"] != "none":
-            valid_providers = [p for p in valid_providers if p.vendor.lower() == user_prefs["vendor"].lower()]
+        Args:
+            user_prefs: The user preferences dictionary (see get_recommendation)
+            locale: Language of the message
 
-        if not valid_providers:
-            return None
+        Returns:
+            The formatted recommendation, or None if no suitable provider is found
+        """
+        catalogue = self.catalogue
+        preference_key = self._preference_key(user_prefs)
+        key = (preference_key, locale)
+        if key in catalogue.messages:
+            self.cache_hits += 1
+            return catalogue.messages[key]
+
+        self.cache_misses += 1
+        provider = catalogue.lookup(preference_key)
+        message = self._format_recommendation(catalogue, provider, user_prefs, locale) if provider else None
+        catalogue.messages[key] = message
+        return message
+
+    def get_top_recommendations(self, user_prefs: Dict, k: int = 3, offset: int = 0,
+                                ranking: Ranking = DEFAULT_RANKING) -> List[Provider]:
+        """
+        Rank the plans eligible for the user's preferences.
+
+        With the default ranking the first plan is always get_recommendation's.
+
+        Args:
+            user_prefs: The user preferences dictionary (see get_recommendation)
+            k: Number of plans to return
+            offset: Number of leading plans to skip, for paging
+            ranking: Order of the plans
 
-        # 4. Pick the plan with the highest discount
-        return max(valid_providers, key=lambda p: p.discount_pct)
+        Returns:
+            Up to k plans, best first
+        """
+        return self.catalogue.top(self._preference_key(user_prefs), offset + k, ranking)[offset:]
+
+    def format_ranking(self, providers: Sequence[Provider], start: int = 0, locale: str = DEFAULT_LOCALE) -> str:
+        """
+        Format ranked plans as a numbered list.
+
+        Args:
+            providers: The plans, best first
+            start: Rank of the first plan minus one
+            locale: Language of the plans' hours
+
+        Returns:
+            One line per plan
+        """
+        return "\n".join(
+            f"{rank}. {provider.vendor} - {provider.name} ({provider.discount_pct}%, {hours_description(provider, locale)})"
+            for rank, provider in enumerate(providers, start + 1)
+        )
+
+    def settled_answer(self, field: str, values: Sequence, answers: Answers) -> Tuple[bool, Any]:
+        """
+        Check whether a question's answer can still change the recommendation.
 
-    def format_recommendation(self, provider: Provider, user_prefs: Dict) -> str:
+        Answers that leave no eligible plan are not considered. If every other
+        answer leaves the same eligible plans, no later answer can tell them
+        apart, so asking is pointless. Leading to the same best plan is not
+        enough: the answer is recorded, and later questions narrow what it left.
+
+        Args:
+            field: The preference field the question records
+            values: The possible answers
+            answers: (field, answer) pairs given so far
+
+        Returns:
+            (True, an answer leaving those plans) if the question is settled, else (False, None)
+        """
+        if field not in PREFERENCE_FIELDS:
+            return False, None
+        catalogue = self.catalogue
+        outcome = chosen = None
+        alternatives = 0
+        for value in values:
+            mask, _ = catalogue.narrow(answers + ((field, value),))
+            if not mask:
+                continue
+            if outcome is None:
+                outcome, chosen = mask, value
+            elif mask != outcome:
+                return False, None
+            else:
+                alternatives += 1
+        if outcome is None:
+            # No answer leads to a plan; let the user answer anyway
+            return False, None
+        if field == "time_preference" and alternatives and outcome & (outcome - 1):
+            # Time preferences also rank the plans they leave, so the order of several plans still depends on it
+            return False, None
+        return True, chosen
+
+    def invalidate_cache(self):
+        """
+        Drop all cached recommendation messages.
+        """
+        self.catalogue.messages.clear()
+
+    def cache_info(self) -> Dict[str, int]:
+        """
+        Get the recommendation cache counters.
+
+        Returns:
+            A dictionary with the number of cache hits, misses and cached entries
+        """
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self.catalogue.messages)
+        }
+
+    def get_recommendations_batch(self, records: Iterable[Union[Dict, Sequence]]) -> List[Optional[Provider]]:
+        """
+        Recommend providers for many users at once.
+
+        Args:
+            records: Preference records, each either a user_prefs dictionary
+                (see get_recommendation) or a tuple in PREFERENCE_FIELDS order
+
+        Returns:
+            The recommended Provider (or None) for each record, in input order
+        """
+        return list(self.iter_recommendations(records))
+
+    def iter_recommendations(self, records: Iterable[Union[Dict, Sequence]]) -> Iterator[Optional[Provider]]:
+        """
+        Lazily recommend providers for a stream of preference records.
+
+        Each distinct combination of preference fields is resolved only once,
+        so arbitrarily long streams cost one dictionary lookup per record.
+
+        Args:
+            records: Preference records (see get_recommendations_batch)
+
+        Yields:
+            The recommended Provider (or None) for each record, in input order
+        """
+        catalogue = self.catalogue
+        results: Dict[Tuple, Optional[Provider]] = {}
+        for record in records:
+            if isinstance(record, Mapping):
+                raw = tuple(record[field] for field in PREFERENCE_FIELDS)
+            else:
+                raw = tuple(record)
+            if raw not in results:
+                results[raw] = catalogue.lookup(self._preference_key(dict(zip(PREFERENCE_FIELDS, raw))))
+            yield results[raw]
+
+    @staticmethod
+    def _preference_key(user_prefs: Dict) -> PreferenceKey:
+        """
+        Normalise user preferences into an index lookup key.
+
+        Args:
+            user_prefs: The user preferences dictionary (see get_recommendation)
+
+        Returns:
+            A tuple of (has_smart_meter, hours window, vendor id or None)
+        """
+        hours = None if user_prefs["discount_type"] == "fixed" else preference_window(user_prefs["time_preference"])
+        return bool(user_prefs["has_smart_meter"]), hours, vendor_key(user_prefs["vendor"])
+
+    def format_recommendation(self, provider: Provider, user_prefs: Dict, locale: str = DEFAULT_LOCALE) -> str:
         """
         Format the recommendation as a user-friendly message.
         
         Args:
             provider: The recommended Provider object
             user_prefs: The user preferences dictionary
+            locale: Language of the message
             
         Returns:
             A formatted string with the recommendation details
         """
-        # Determine hours description
-        if provider.hours is None:
-            hours_desc = "כל היום"
-        else:
-            start, end = provider.hours
-            hours_desc = f"{start}:00-{end}:00"
-            
-        # Calculate potential savings compared to average discount
-        avg_discount = sum(p.discount_pct for p in self.providers) / len(self.providers)
-        savings_vs_avg = provider.discount_pct - avg_discount
-        
-        # Format the recommendation message
-        recommendation = (
-            f"✅ *הספק המומלץ: {provider.vendor} - {provider.name}*\n\n"
-            f"📊 *פרטי התוכנית:*\n"
-            f"- הנחה: {provider.discount_pct}%\n"
-            f"- שעות: {hours_desc}\n"
-            f"- דורש שעון חכם: {'כן' if provider.requires_smart_meter else 'לא'}\n\n"
-            f"💰 *יתרונות התוכנית:*\n"
-            f"- הנחה גבוהה יותר מהממוצע ב-{abs(savings_vs_avg):.1f}%\n"
-            f"- {'הנחה קבועה' if provider.hours is None else 'הנחה בשעות מועדפות'}\n\n"
-            f"ℹ️ *הצעדים הבאים:*\n"
-            f"- צור קשר עם {provider.vendor} להרשמה לתוכנית '{provider.name}'\n"
-            f"- {'התקן שעון חכם' if provider.requires_smart_meter else 'אין צורך בשעון חכם'}\n"
-            f"- {'התאם את צריכת החשמל לשעות ההנחה' if provider.hours is not None else 'הנחה קבועה לאורך כל היום'}"
-        )
-        
-        return recommendation
+        return self._format_recommendation(self.catalogue, provider, user_prefs, locale)
+
+    def _format_recommendation(self, catalogue: Catalogue, provider: Provider, user_prefs: Dict,
+                               locale: str = DEFAULT_LOCALE) -> str:
+        """
+        Format a recommendation against the statistics of a specific catalogue snapshot.
+        """
+        # Compare against the plans this user is eligible for, falling back to the whole catalogue
+        segment, window = self._eligible_segment(catalogue, user_prefs)
+        score = preference_score(provider, window)
+        fragments = catalogue.locale_fragments(locale).get(provider)
+        if fragments is None:
+            # A plan from outside the catalogue
+            fragments = plan_fragments(provider, locale)
+        return assemble(fragments, score - segment.mean, segment.better_than(score), locale)
+
+    def _eligible_segment(self, catalogue: Catalogue, user_prefs: Dict) -> Tuple[SegmentStats, Optional[Tuple[int, int]]]:
+        """
+        Statistics of the plans eligible for the user's preferences.
+
+        Falls back to the whole catalogue when the preferences are incomplete
+        or no plan matches them.
+
+        Returns:
+            (the statistics, the preference window their scores are for, or None for plain discounts)
+        """
+        try:
+            key = self._preference_key(user_prefs)
+            segment = catalogue.stats.segment(key)
+        except (KeyError, AttributeError):
+            segment = None
+        if segment is None:
+            return catalogue.stats.overall, None
+        return segment, key[1]
@@ -0,0 +1,148 @@
+"""
+Hot reloading of the plan catalogue.
+
+The watcher polls the providers file for changes, loads and indexes the new
+catalogue off the event loop, and swaps it into the calculator in one step.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from src.core.calculator import Catalogue, ProviderCalculator, file_signature
+from src.utils.metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+class CatalogueWatcher:
+    """
+    Polls a providers file and hot-swaps the calculator's catalogue when it changes.
+    """
+    def __init__(self, calculator: ProviderCalculator, providers_file=None,
+                 interval: float = 5.0, metrics: Metrics = None,
+                 on_swap: Optional[Callable[[Catalogue], None]] = None):
+        """
+        Args:
+            calculator: The calculator whose catalogue is replaced
+            providers_file: The file to watch (default: the catalogue's source)
+            interval: Seconds between polls
+            metrics: Where reload counts and timings are recorded (default: the shared metrics)
+            on_swap: Called with each new catalogue right after it is installed, to
+                refresh anything built from the previous one
+        """
+        if providers_file is None:
+            providers_file = calculator.catalogue.source
+        self.calculator = calculator
+        self.providers_file = Path(providers_file)
+        self.interval = interval
+        self.metrics = metrics or default_metrics
+        self.on_swap = on_swap
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        """
+        The (mtime, size) signature of the providers file, or None if it is missing.
+        """
+        return file_signature(self.providers_file)
+
+    def changed(self) -> bool:
+        """
+        Check whether the providers file changed since the last load.
+        """
+        signature = self._stat()
+        return signature is not None and signature != self._signature
+
+    def load(self) -> Optional[Catalogue]:
+        """
+        Parse, validate and index the providers file.
+
+        This is the expensive part of a reload and is safe to run in a worker thread.
+
+        Returns:
+            The new Catalogue, or None if the file is invalid (the error is logged)
+        """
+        signature = self._stat()
+        start = time.perf_counter()
+        try:
+            catalogue = Catalogue.from_file(self.providers_file)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Failed to reload catalogue from {self.providers_file}: {e}")
+            self.metrics.increment("catalogue_reload_failures")
+            # Don't retry the same broken file on every poll
+            self._signature = signature
+            return None
+        self.metrics.observe("catalogue_reload_seconds", time.perf_counter() - start)
+        self._signature = signature
+        return catalogue
+
+    def swap(self, catalogue: Catalogue):
+        """
+        Install a loaded catalogue in the calculator.
+
+        Args:
+            catalogue: The Catalogue returned by load
+        """
+        self.calculator.swap_catalogue(catalogue)
+        if self.on_swap is not None:
+            self.on_swap(catalogue)
+        self.metrics.increment("catalogue_reloads")
+        self.metrics.set_gauge("catalogue_plans", len(catalogue.providers))
+        logger.info(f"Reloaded {len(catalogue.providers)} plans from {self.providers_file}")
+
+    def check(self) -> bool:
+        """
+        Reload synchronously if the providers file changed.
+
+        Returns:
+            True if a new catalogue was swapped in
+        """
+        if not self.changed():
+            return False
+        catalogue = self.load()
+        if catalogue is None:
+            return False
+        self.swap(catalogue)
+        return True
+
+    async def run(self):
+        """
+        Poll for changes forever from an asyncio event loop.
+
+        Loading runs in the default executor so in-flight handlers keep running;
+        only the final reference swap happens on the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.changed():
+                catalogue = await loop.run_in_executor(None, self.load)
+                if catalogue is not None:
+                    self.swap(catalogue)
+
+    def start(self):
+        """
+        Poll for changes in a background daemon thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll, name="catalogue-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background polling thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self.check()
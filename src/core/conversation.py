@@ -1,5 +1,15 @@
+import json
 from enum import Enum
-from typing import Dict, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.core.messages import DEFAULT_LOCALE, MESSAGES
+from src.core.registry import VENDORS
+
+if TYPE_CHECKING:
+    from src.core.answer_matcher import AnswerMatcher
+    from src.core.calculator import Provider, ProviderCalculator
+    from src.core.state_store import StateStore
 
 class ConversationState(Enum):
     """
@@ -12,6 +22,240 @@ class ConversationState(Enum):
     ASKING_VENDOR = 4
     COMPLETED = 5
 
+class Choice(NamedTuple):
+    """
+    One answer button: its compact callback code, its label and the value it records.
+    """
+    code: str
+    label: str
+    value: Any
+
+_MISSING = object()
+
+class Step:
+    """
+    One compiled question of a conversation flow.
+    """
+    __slots__ = ("state", "prompt", "field", "choices", "buttons", "values", "answers", "branches", "next",
+                 "invalid_answer")
+
+    def __init__(self, state: ConversationState, prompt: str, field: str, choices: List[List[Choice]],
+                 aliases: Dict[str, Any], branches: Dict[Any, ConversationState],
+                 next_state: ConversationState, invalid_answer: str):
+        self.state = state
+        self.prompt = prompt
+        self.field = field
+        self.choices = choices
+        self.buttons = [[choice.label for choice in row] for row in choices]
+        self.values = tuple(choice.value for row in choices for choice in row)
+        # Every accepted answer (callback code, label or typed alias) mapped to its value
+        self.answers = {choice.code: choice.value for row in choices for choice in row}
+        self.answers.update({choice.label: choice.value for row in choices for choice in row})
+        self.answers.update(aliases)
+        self.branches = branches
+        self.next = next_state
+        self.invalid_answer = invalid_answer
+
+    def decode(self, answer: str) -> Any:
+        """
+        The value an answer records, or _MISSING if it isn't accepted. Typed answers are case-insensitive.
+        """
+        value = self.answers.get(answer, _MISSING)
+        if value is _MISSING:
+            value = self.answers.get(answer.lower(), _MISSING)
+        return value
+
+    def next_state(self, user_state: 'UserState') -> ConversationState:
+        """
+        The state following this question, given the answer recorded so far.
+        """
+        if self.branches:
+            return self.branches.get(getattr(user_state, self.field), self.next)
+        return self.next
+
+class ConversationFlow:
+    """
+    A declarative conversation definition compiled into dictionary lookups.
+
+    The definition lists the questions in order. Each has a state, a prompt,
+    the UserState field it records, rows of answer choices, optional typed
+    aliases, optional branches on the recorded value and a default next state.
+    A question with "vendor_choices" gets one choice per vendor, recording the
+    vendor id, ahead of its listed choices.
+
+    Translations replace the prompts, button labels and error messages per
+    locale, compiled into their own steps with the same states, callback codes
+    and values, so a user's locale selects a step with one more lookup.
+    """
+    def __init__(self, definition: Dict, vendors: Optional[Iterable[int]] = None,
+                 translations: Optional[Dict[str, Dict]] = None):
+        """
+        Args:
+            definition: Flow definition, as loaded from conversation_flow.json
+            vendors: Vendor ids offered by vendor questions, such as the vendors of
+                a catalogue (default: every vendor in the registry)
+            translations: Flow translations keyed by locale, as in messages.json
+                (default: those of the message catalogue)
+
+        Raises:
+            ValueError: If the definition or a translation refers to unknown states, or the definition is incomplete
+        """
+        self._vendor_states = set()
+        try:
+            self.start = self._state(definition["start"])
+            default_invalid = definition["invalid_answer"]
+            self.steps: Dict[ConversationState, Step] = {}
+            for spec in definition["steps"]:
+                state = self._state(spec["state"])
+                choices = [[Choice(c["code"], c["label"], c["value"]) for c in row] for row in spec["choices"]]
+                if "vendor_choices" in spec:
+                    choices = self._vendor_choices(spec["vendor_choices"], vendors) + choices
+                    self._vendor_states.add(state)
+                branches = {branch["when"]: self._state(branch["next"]) for branch in spec.get("branches", [])}
+                self.steps[state] = Step(
+                    state, spec["prompt"], spec["field"], choices, spec.get("aliases", {}), branches,
+                    self._state(spec["next"]), spec.get("invalid_answer", default_invalid)
+                )
+        except KeyError as e:
+            raise ValueError(f"Conversation flow is missing {e}") from None
+
+        targets = {self.start} | {step.next for step in self.steps.values()}
+        targets.update(next_state for step in self.steps.values() for next_state in step.branches.values())
+        unknown = targets - set(self.steps) - {ConversationState.COMPLETED}
+        if unknown:
+            raise ValueError(f"Conversation flow moves to states without a step: {sorted(s.name for s in unknown)}")
+
+        # The steps of each translated locale; other locales use self.steps
+        self.translations: Dict[str, Dict[ConversationState, Step]] = {
+            locale: self._translate(translation)
+            for locale, translation in (MESSAGES.flows if translations is None else translations).items()
+        }
+
+    @classmethod
+    def from_file(cls, flow_file=None, vendors: Optional[Iterable[int]] = None,
+                  translations: Optional[Dict[str, Dict]] = None) -> 'ConversationFlow':
+        """
+        Load a flow definition from a JSON file (default: data/conversation_flow.json).
+        """
+        if flow_file is None:
+            flow_file = Path(__file__).parent.parent / 'data' / 'conversation_flow.json'
+        with open(flow_file, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), vendors, translations)
+
+    def _translate(self, translation: Dict) -> Dict[ConversationState, Step]:
+        """
+        Compile the steps of one locale.
+
+        Steps, buttons and error messages the translation leaves out keep the
+        definition's text, and translated states this flow doesn't ask are
+        ignored. Translated steps also accept the definition's labels.
+        """
+        specs = {self._state(state): spec for state, spec in translation.get("steps", {}).items()}
+        vendor_label = VENDORS.name if translation.get("vendor_labels") == "name" else VENDORS.translation
+        steps = {}
+        for state, step in self.steps.items():
+            spec = specs.get(state, {})
+            labels = dict(spec.get("choices", {}))
+            if state in self._vendor_states:
+                for row in step.choices:
+                    labels.update({choice.code: vendor_label(choice.value) for choice in row
+                                   if isinstance(choice.value, int) and choice.code not in labels})
+            choices = [[choice._replace(label=labels.get(choice.code, choice.label)) for choice in row]
+                       for row in step.choices]
+            invalid_answer = spec.get("invalid_answer", translation.get("invalid_answer", step.invalid_answer))
+            steps[state] = Step(state, spec.get("prompt", step.prompt), step.field, choices, step.answers,
+                                step.branches, step.next, invalid_answer)
+        return steps
+
+    def localized(self, locale: str) -> Dict[ConversationState, Step]:
+        """
+        The steps of a locale, or the definition's own if it has no translation.
+        """
+        return self.translations.get(locale, self.steps)
+
+    @staticmethod
+    def _vendor_choices(spec: Dict, vendors: Optional[Iterable[int]]) -> List[List[Choice]]:
+        """
+        Rows of choices for a vendor question, labelled with the vendors' Hebrew names.
+        """
+        if vendors is None:
+            vendors = range(len(VENDORS))
+        prefix, per_row = spec["code_prefix"], spec.get("per_row", 3)
+        # Code 0 is left for the question's own choices, such as "none of them"
+        choices = [Choice(f"{prefix}{vendor_id + 1}", VENDORS.translation(vendor_id), vendor_id) for vendor_id in vendors]
+        return [choices[i:i + per_row] for i in range(0, len(choices), per_row)]
+
+    @staticmethod
+    def _state(name: str) -> ConversationState:
+        try:
+            return ConversationState[name]
+        except KeyError:
+            raise ValueError(f"Unknown conversation state: {name}") from None
+
+    def advance(self, user_state: 'UserState', calculator: 'ProviderCalculator' = None
+                ) -> Tuple[Optional[str], Optional[List[List[str]]]]:
+        """
+        Move a user's state to the next question and return it with its buttons.
+
+        With a calculator, questions whose answer can no longer change the
+        recommendation are answered automatically and skipped.
+        """
+        if user_state.state == ConversationState.INITIAL:
+            next_state = self.start
+        else:
+            step = self.steps.get(user_state.state)
+            if step is None:
+                return None, None
+            next_state = step.next_state(user_state)
+        user_state.state = next_state
+        step = self.steps.get(next_state)
+
+        while step is not None and calculator is not None:
+            settled, value = calculator.settled_answer(step.field, step.values, self.answers(user_state))
+            if not settled:
+                break
+            setattr(user_state, step.field, value)
+            user_state.state = step.next_state(user_state)
+            step = self.steps.get(user_state.state)
+
+        if step is None:
+            return None, None
+        step = self.localized(user_state.locale)[step.state]
+        return step.prompt, step.buttons
+
+    def answers(self, user_state: 'UserState') -> Tuple[Tuple[str, Any], ...]:
+        """
+        The (field, answer) pairs recorded so far, in question order.
+        """
+        answers = []
+        for step in self.steps.values():
+            value = getattr(user_state, step.field, None)
+            if value is not None:
+                answers.append((step.field, value))
+        return tuple(answers)
+
+    def apply_answer(self, user_state: 'UserState', answer: str, matcher: 'AnswerMatcher' = None) -> Optional[str]:
+        """
+        Record an answer in a user's state, returning an error message if it is invalid.
+
+        With a matcher, answers that aren't a button are also matched as free text.
+        """
+        step = self.localized(user_state.locale).get(user_state.state)
+        if step is None:
+            return None
+        value = step.decode(answer)
+        if value is _MISSING and matcher is not None:
+            found, matched = matcher.match(user_state.state, answer)
+            if found:
+                value = matched
+        if value is _MISSING:
+            return step.invalid_answer
+        setattr(user_state, step.field, value)
+        return None
+
+# The bot's flow, loaded once
+DEFAULT_FLOW = ConversationFlow.from_file()
+
 class UserState:
     """
     Class representing the state of a user in a conversation.
@@ -20,15 +264,51 @@ class UserState:
         self.state = ConversationState.INITIAL
         self.has_smart_meter = None
         self.discount_type = None  # "fixed" or "variable"
-        self.time_preference = None  # "day" or "night"
-        self.vendor = None  # "hot", "amisragaz", or "none"
+        self.time_preference = None  # "day", "evening" or "night"
+        self.vendor = None  # vendor id, or "none"
+        self.locale = DEFAULT_LOCALE  # language of the user's messages, kept across resets
+
+    def to_dict(self) -> Dict:
+        """
+        Serialize the state to a JSON-compatible dictionary.
+        Answers to questions added by custom flows are included.
+        """
+        data = dict(vars(self))
+        data["state"] = self.state.name
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'UserState':
+        """
+        Restore a state serialized with to_dict.
+        """
+        user_state = cls()
+        vars(user_state).update(data)
+        user_state.state = ConversationState[data["state"]]
+        return user_state
 
 class ConversationHandler:
     """
     Handler for managing conversations with users.
     """
-    def __init__(self):
-        self.user_states: Dict[str, UserState] = {}
+    def __init__(self, store: 'StateStore' = None, flow: ConversationFlow = None,
+                 calculator: 'ProviderCalculator' = None, matcher: 'AnswerMatcher' = None):
+        """
+        Args:
+            store: Where user states are kept (default: an in-memory store)
+            flow: The questions to ask (default: the bot's flow)
+            calculator: Narrows the eligible plans as answers come in, so questions
+                that can't change the recommendation are skipped (default: ask everything)
+            matcher: Resolves typed answers that aren't a button (default: buttons and aliases only)
+        """
+        self.flow = flow if flow is not None else DEFAULT_FLOW
+        self.calculator = calculator
+        self.matcher = matcher
+        if store is None:
+            # Imported here because the stores themselves depend on UserState
+            from src.core.state_store import MemoryStateStore
+            store = MemoryStateStore()
+        self.store = store
 
     def get_user_state(self, user_id: str) -> UserState:
         """
@@ -40,9 +320,11 @@ class ConversationHandler:
         Returns:
             The user's state
         """
-        if user_id not in self.user_states:
-            self.user_states[user_id] = UserState()
-        return self.user_states[user_id]
+        state = self.store.get(user_id)
+        if state is None:
+            state = UserState()
+            self.store.set(user_id, state)
+        return state
 
     def get_next_question(self, user_id: str) -> tuple[str, list[list[str]]]:
         """
@@ -50,34 +332,9 @@ class ConversationHandler:
         Returns a tuple of (question_text, button_options)
         """
         state = self.get_user_state(user_id)
-        
-        if state.state == ConversationState.INITIAL:
-            state.state = ConversationState.ASKING_SMART_METER
-            return "האם יש לכם שעון חכם?", [["כן", "לא"]]
-        
-        elif state.state == ConversationState.ASKING_SMART_METER:
-            if state.has_smart_meter:
-                state.state = ConversationState.ASKING_DISCOUNT_TYPE
-                return "איזה סוג הנחה אתם מעדיפים?", [["הנחה קבועה", "הנחה בשעות משתנות"]]
-            else:
-                state.state = ConversationState.ASKING_VENDOR
-                return "האם אתם לקוחות של אחת מהחברות הבאות?", [["הוט", "אמישראגז", "אף אחד מהם"]]
-        
-        elif state.state == ConversationState.ASKING_DISCOUNT_TYPE:
-            if state.discount_type == "variable":
-                state.state = ConversationState.ASKING_TIME_PREFERENCE
-                return "באיזו שעות אתם מעדיפים את ההנחה?", [["יום (7:00-17:00)", "לילה (23:00-7:00)"]]
-            else:
-                state.state = ConversationState.ASKING_VENDOR
-                return "האם אתם לקוחות של אחת מהחברות הבאות?", [["הוט", "אמישראגז", "אף אחד מהם"]]
-        
-        elif state.state == ConversationState.ASKING_TIME_PREFERENCE:
-            state.state = ConversationState.ASKING_VENDOR
-            return "האם אתם לקוחות של אחת מהחברות הבאות?", [["הוט", "אמישראגז", "אף אחד מהם"]]
-        
-        elif state.state == ConversationState.ASKING_VENDOR:
-            state.state = ConversationState.COMPLETED
-            return None, None
+        question = self.flow.advance(state, self.calculator)
+        self.store.set(user_id, state)
+        return question
 
     def process_answer(self, user_id: str, answer: str) -> Optional[str]:
         """
@@ -90,48 +347,28 @@ class ConversationHandler:
         Returns:
             The next question to ask, or None if the conversation is complete
         """
-        state = self.get_user_state(user_id)
-        
-        if state.state == ConversationState.ASKING_SMART_METER:
-            answer = answer.lower()
-            if answer in ['כן', 'yes', 'y', 'true']:
-                state.has_smart_meter = True
-            elif answer in ['לא', 'no', 'n', 'false']:
-                state.has_smart_meter = False
-            else:
-                return "לא הבנתי. אנא בחר 'כן' או 'לא'."
-            return None
-        
-        elif state.state == ConversationState.ASKING_DISCOUNT_TYPE:
-            if answer == "הנחה קבועה":
-                state.discount_type = "fixed"
-            elif answer == "הנחה בשעות משתנות":
-                state.discount_type = "variable"
-            else:
-                return "אנא בחר אחת מהאפשרויות המוצגות."
-            return None
-        
-        elif state.state == ConversationState.ASKING_TIME_PREFERENCE:
-            if answer == "יום (7:00-17:00)":
-                state.time_preference = "day"
-            elif answer == "לילה (23:00-7:00)":
-                state.time_preference = "night"
-            else:
-                return "אנא בחר אחת מהאפשרויות המוצגות."
+        state = self.store.get(user_id)
+        if state is None:
+            # Nothing has been asked yet, so there is nothing to answer
             return None
-        
-        elif state.state == ConversationState.ASKING_VENDOR:
-            if answer == "הוט":
-                state.vendor = "hot"
-            elif answer == "אמישראגז":
-                state.vendor = "amisragaz"
-            elif answer == "אף אחד מהם":
-                state.vendor = "none"
-            else:
-                return "אנא בחר אחת מהאפשרויות המוצגות."
+        response = self.flow.apply_answer(state, answer, self.matcher)
+        self.store.set(user_id, state)
+        return response
+
+    def preview(self, user_id: str) -> Optional['Provider']:
+        """
+        The best plan for the answers a user has given so far.
+
+        Args:
+            user_id: The ID of the user
+
+        Returns:
+            The best eligible plan, or None if there is none or no calculator is set
+        """
+        state = self.store.get(user_id)
+        if state is None or self.calculator is None:
             return None
-        
-        return None
+        return self.calculator.catalogue.narrow(self.flow.answers(state))[1]
 
     def is_conversation_complete(self, user_id: str) -> bool:
         """
@@ -143,8 +380,21 @@ class ConversationHandler:
         Returns:
             True if the conversation is complete, False otherwise
         """
-        state = self.get_user_state(user_id)
-        return state.state == ConversationState.COMPLETED
+        state = self.store.get(user_id)
+        return state is not None and state.state == ConversationState.COMPLETED
+
+    def is_awaiting_answer(self, user_id: str) -> bool:
+        """
+        Check whether a question has been asked and not yet answered.
+
+        Args:
+            user_id: The ID of the user
+
+        Returns:
+            True if the user's next message answers a question
+        """
+        state = self.store.get(user_id)
+        return state is not None and state.state in self.flow.steps
 
     def get_user_data(self, user_id: str) -> Optional[UserState]:
         """
@@ -156,16 +406,51 @@ class ConversationHandler:
         Returns:
             The user's state if the conversation is complete, None otherwise
         """
-        state = self.get_user_state(user_id)
-        if self.is_conversation_complete(user_id):
+        state = self.store.get(user_id)
+        if state is not None and state.state == ConversationState.COMPLETED:
             return state
         return None
 
-    def reset_conversation(self, user_id: str):
+    def get_locale(self, user_id: str, language_code: Optional[str] = None) -> str:
+        """
+        The language to talk to a user in.
+
+        Args:
+            user_id: The ID of the user
+            language_code: The user's client language, used until a locale is stored
+
+        Returns:
+            The stored locale, else the supported locale of language_code, else the default
+        """
+        state = self.store.get(user_id)
+        if state is not None:
+            return state.locale
+        return MESSAGES.locale(language_code)
+
+    def set_locale(self, user_id: str, locale: str):
+        """
+        Talk to the user in another language from the next message on.
+
+        Args:
+            user_id: The ID of the user
+            locale: One of the message catalogue's locales
+        """
+        state = self.get_user_state(user_id)
+        state.locale = locale
+        self.store.set(user_id, state)
+
+    def reset_conversation(self, user_id: str, locale: Optional[str] = None):
         """
         Reset the conversation with the user.
         
         Args:
             user_id: The ID of the user
+            locale: The user's language (default: keep the current one)
         """
-        self.user_states[user_id] = UserState()
+        state = UserState()
+        if locale is None:
+            previous = self.store.get(user_id)
+            locale = previous.locale if previous is not None else None
+        if locale is not None:
+            state.locale = locale
+        self.store.set(user_id, state)
@@ -0,0 +1,74 @@
+"""
+Pre-rendered fragments of the recommendation message.
+
+Most of a recommendation depends only on the plan: its name, details, benefits
+and next steps. Those parts are rendered once per plan and locale from the
+message catalogue, and a message is assembled by joining them around the
+short part that depends on the user's eligible plans.
+"""
+
+from typing import TYPE_CHECKING, Dict, Iterable, Tuple
+
+from src.core.messages import DEFAULT_LOCALE, MESSAGES
+
+if TYPE_CHECKING:
+    from src.core.calculator import Provider
+
+# The text before and after the user-specific part of a plan's recommendation
+Fragments = Tuple[str, str]
+
+# The user-specific part of each locale, taking (points from the mean, better_than), for plans
+# at or above and below the eligible plans' mean
+_COMPARISONS = MESSAGES.compile("recommendation_comparison", ("savings_vs_avg", "better_than"))
+_COMPARISONS_BELOW = MESSAGES.compile("recommendation_comparison_below", ("savings_vs_avg", "better_than"))
+
+def hours_description(provider: 'Provider', locale: str = DEFAULT_LOCALE) -> str:
+    """
+    The plan's discount hours as shown to users.
+    """
+    if provider.hours is None:
+        return MESSAGES.text("all_day", locale)
+    start, end = provider.hours
+    return f"{start}:00-{end}:00"
+
+def plan_fragments(provider: 'Provider', locale: str = DEFAULT_LOCALE) -> Fragments:
+    """
+    Render the parts of a plan's recommendation that are the same for every user.
+    """
+    texts = MESSAGES.texts(locale)
+    head = texts["recommendation_head"].format(
+        vendor=provider.vendor,
+        name=provider.name,
+        discount_pct=provider.discount_pct,
+        hours=hours_description(provider, locale),
+        smart_meter=texts["yes" if provider.requires_smart_meter else "no"],
+    )
+    tail = texts["recommendation_tail"].format(
+        discount_kind=texts["fixed_discount" if provider.hours is None else "preferred_hours_discount"],
+        vendor=provider.vendor,
+        name=provider.name,
+        meter_step=texts["install_smart_meter" if provider.requires_smart_meter else "no_smart_meter_needed"],
+        usage_step=texts["match_usage" if provider.hours is not None else "fixed_all_day"],
+    )
+    return head, tail
+
+def render_fragments(providers: Iterable['Provider'], locale: str = DEFAULT_LOCALE) -> Dict['Provider', Fragments]:
+    """
+    Render the fragments of every plan in one locale, keyed by plan.
+    """
+    return {provider: plan_fragments(provider, locale) for provider in providers}
+
+def assemble(fragments: Fragments, savings_vs_avg: float, better_than: float, locale: str = DEFAULT_LOCALE) -> str:
+    """
+    Join a plan's fragments around the comparison with the user's eligible plans.
+
+    Args:
+        fragments: The plan's fragments, in the same locale
+        savings_vs_avg: Percentage points above the eligible plans' mean discount (negative if below)
+        better_than: Percentage of eligible plans with a lower discount
+        locale: Locale of the comparison
+    """
+    head, tail = fragments
+    comparisons = _COMPARISONS if savings_vs_avg >= 0 else _COMPARISONS_BELOW
+    comparison = comparisons.get(locale) or comparisons[DEFAULT_LOCALE]
+    return f"{head}{comparison(abs(savings_vs_avg), better_than)}{tail}"
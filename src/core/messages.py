@@ -0,0 +1,141 @@
+"""
+The catalogue of user-facing messages in every supported language.
+
+messages.json is read once, when this module is imported. Each locale's
+messages are merged over the default locale's, so a message missing from a
+translation falls back to the default text, and every string is interned.
+Serving a message in any language is then one dictionary lookup; messages
+with placeholders are filled in with str.format, and those formatted on hot
+paths are compiled once into positional templates per locale.
+
+The file also holds each locale's translation of the conversation flow's
+questions and buttons, which ConversationFlow compiles into per-locale steps.
+"""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+from string import Formatter
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+MESSAGES_FILE = Path(__file__).parent.parent / 'data' / 'messages.json'
+
+class MessageCatalogue:
+    """
+    Interned messages keyed by locale and message key.
+    """
+    def __init__(self, definition: Dict):
+        """
+        Args:
+            definition: Catalogue definition, as loaded from messages.json
+
+        Raises:
+            ValueError: If the definition is incomplete or its default locale has no messages
+        """
+        try:
+            self.default_locale = sys.intern(definition["default"])
+            locales = definition["locales"]
+            default = self._intern(locales[self.default_locale]["messages"])
+        except KeyError as e:
+            raise ValueError(f"Message catalogue is missing {e}") from None
+
+        self._texts: Dict[str, Dict[str, str]] = {}
+        # Translations of the conversation flow, keyed by locale
+        self.flows: Dict[str, Dict] = {}
+        for locale, spec in locales.items():
+            texts = dict(default)
+            texts.update(self._intern(spec.get("messages", {})))
+            self._texts[sys.intern(locale)] = texts
+            if "flow" in spec and locale != self.default_locale:
+                self.flows[locale] = spec["flow"]
+        self.locales: Tuple[str, ...] = tuple(self._texts)
+        self._default_texts = self._texts[self.default_locale]
+        # Identifies the texts, so text rendered from an older catalogue can be told apart
+        self.checksum = hashlib.sha1(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def _intern(messages: Dict[str, str]) -> Dict[str, str]:
+        return {sys.intern(key): sys.intern(text) for key, text in messages.items()}
+
+    @classmethod
+    def from_file(cls, messages_file=MESSAGES_FILE) -> 'MessageCatalogue':
+        """
+        Load a catalogue from a JSON file (default: data/messages.json).
+        """
+        with open(messages_file, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def locale(self, language_code: Optional[str]) -> str:
+        """
+        The supported locale for a language code such as Telegram's "en" or "pt-br".
+
+        Returns:
+            The locale, or the default locale if the language isn't supported
+        """
+        if not language_code:
+            return self.default_locale
+        code = language_code.lower()
+        if code in self._texts:
+            return code
+        language = code.replace("_", "-").split("-")[0]
+        return language if language in self._texts else self.default_locale
+
+    def texts(self, locale: str) -> Dict[str, str]:
+        """
+        Every message of a locale, keyed by message key; unsupported locales get the default locale's.
+        """
+        return self._texts.get(locale, self._default_texts)
+
+    def text(self, key: str, locale: str) -> str:
+        """
+        A message in a locale.
+
+        Raises:
+            KeyError: If no locale has the message
+        """
+        return self._texts.get(locale, self._default_texts)[key]
+
+    def format(self, key: str, locale: str, **values) -> str:
+        """
+        A message in a locale with its placeholders filled in.
+        """
+        return self._texts.get(locale, self._default_texts)[key].format(**values)
+
+    def compile(self, key: str, fields: Sequence[str]) -> Dict[str, Callable[..., str]]:
+        """
+        Compile a message with placeholders into a formatter per locale.
+
+        Each formatter takes the values of fields positionally, in that order,
+        whichever order the locale's text puts them in, and formats them without
+        the keyword arguments of format.
+
+        Args:
+            key: The message key
+            fields: The names of the message's placeholders
+
+        Returns:
+            The formatters keyed by locale
+
+        Raises:
+            ValueError: If a locale's text has a placeholder missing from fields
+        """
+        positions = {field: str(position) for position, field in enumerate(fields)}
+        formatters = {}
+        for locale, texts in self._texts.items():
+            parts = []
+            for literal, field, spec, conversion in Formatter().parse(texts[key]):
+                parts.append(literal.replace("{", "{{").replace("}", "}}"))
+                if field is None:
+                    continue
+                if field not in positions:
+                    raise ValueError(f"Message {key!r} of locale {locale!r} has an unknown placeholder {field!r}")
+                parts.append("{" + positions[field] + (f"!{conversion}" if conversion else "")
+                             + (f":{spec}" if spec else "") + "}")
+            formatters[locale] = sys.intern("".join(parts)).format
+        return formatters
+
+# The bot's messages, loaded once
+MESSAGES = MessageCatalogue.from_file()
+
+DEFAULT_LOCALE = MESSAGES.default_locale
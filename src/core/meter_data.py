@@ -0,0 +1,320 @@
+"""
+Smart-meter export ingestion and the hourly profile store.
+
+Meter exports in the Israel Electric Corp style (a few lines about the
+customer and meter, then one "date, interval start, kWh" row per 15 minutes)
+are parsed in chunks of rows and summed into an hourly profile. Only the
+profile is held in memory (about 35 KB per year), so exports of any length
+ingest in bounded memory.
+
+Profiles are stored one float32 .npy file per customer, starting at midnight
+of the first day with readings and covering whole days, next to a small JSON
+file with that start time. MeterStore.load memory-maps them, so they can be
+passed to the savings engine without a copy.
+"""
+
+import csv
+import itertools
+import json
+import os
+import re
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.core.savings import HOURS_PER_DAY
+
+# Rows parsed and aggregated per chunk
+CHUNK_ROWS = 65_536
+
+# Customer ids double as file names
+CUSTOMER_ID = re.compile(r"^[\w.-]+$")
+
+class IngestReport(NamedTuple):
+    """
+    Summary of one ingested export.
+    """
+    customer: str
+    rows: int             # Readings parsed
+    start: datetime       # First hour of the stored profile
+    hours: int            # Length of the stored profile
+    missing_hours: int    # Hours of the profile without any reading
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+class ReadingParser:
+    """
+    Converts export rows into (absolute hour, kWh) readings.
+
+    Rows before the first one starting with a date are taken as the export's
+    preamble and skipped, as are empty rows and readings with no value. Dates
+    are DD/MM/YYYY or YYYY-MM-DD, followed by the interval start (HH:MM) in its
+    own column or after a space in the same one.
+    """
+    def __init__(self):
+        # Every date and interval start repeats many times, so each is parsed once
+        self._days: Dict[str, int] = {}
+        self._hours: Dict[str, int] = {}
+        self.rows = 0
+
+    def day(self, text: str) -> Optional[int]:
+        """
+        The first absolute hour (hours since 0001-01-01) of a date, or None if it isn't one.
+        """
+        hour = self._days.get(text)
+        if hour is None:
+            parts = text.strip().split("/")
+            try:
+                if len(parts) == 3:
+                    day = date(int(parts[2]), int(parts[1]), int(parts[0]))
+                else:
+                    day = date.fromisoformat(text.strip())
+            except ValueError:
+                return None
+            hour = self._days[text] = day.toordinal() * HOURS_PER_DAY
+        return hour
+
+    def hour(self, text: str) -> int:
+        """
+        The hour of day of an interval start such as "07:45".
+        """
+        hour = self._hours.get(text)
+        if hour is None:
+            hour = int(text.strip().split(":")[0])
+            if not 0 <= hour < HOURS_PER_DAY:
+                raise ValueError(f"Invalid interval start {text!r}")
+            self._hours[text] = hour
+        return hour
+
+    def chunks(self, rows: Iterable[List[str]], chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Parse rows into chunks of readings.
+
+        Args:
+            rows: CSV rows of an export
+            chunk_rows: Rows per chunk
+
+        Yields:
+            (absolute hours, kWh) array pairs
+
+        Raises:
+            ValueError: If a row after the preamble is malformed
+        """
+        rows = iter(rows)
+        line = 0
+        # Skip the preamble up to the first reading
+        for row in rows:
+            line += 1
+            if row and self.day(row[0].split(" ")[0]) is not None:
+                rows = itertools.chain([row], rows)
+                line -= 1
+                break
+
+        while True:
+            hours: List[int] = []
+            values: List[float] = []
+            consumed = 0
+            for row in itertools.islice(rows, chunk_rows):
+                consumed += 1
+                if not row or not row[0].strip():
+                    continue
+                try:
+                    if len(row) == 2:
+                        day_text, _, start_text = row[0].strip().partition(" ")
+                        value = row[1]
+                    else:
+                        day_text, start_text, value = row[0], row[1], row[2]
+                    if not value.strip():
+                        continue
+                    day = self.day(day_text)
+                    if day is None:
+                        raise ValueError(f"invalid date {day_text!r}")
+                    hours.append(day + self.hour(start_text))
+                    values.append(float(value))
+                except (ValueError, IndexError) as e:
+                    raise ValueError(f"Malformed meter reading on line {line + consumed}: {row!r} ({e})") from e
+            line += consumed
+            if not consumed:
+                return
+            if hours:
+                self.rows += len(hours)
+                yield np.array(hours, dtype=np.int64), np.array(values, dtype=np.float64)
+
+class HourlyAccumulator:
+    """
+    Sums readings into an hourly profile that grows to cover whichever days they fall on.
+    """
+    def __init__(self):
+        self.origin: Optional[int] = None   # Absolute hour of the profile's first midnight
+        self.kwh = np.zeros(0, dtype=np.float64)
+        self.readings = np.zeros(0, dtype=np.int32)
+
+    def add(self, hours: np.ndarray, kwh: np.ndarray):
+        """
+        Add a chunk of readings; readings may arrive in any order.
+        """
+        first = int(hours.min()) // HOURS_PER_DAY * HOURS_PER_DAY
+        last = int(hours.max()) // HOURS_PER_DAY * HOURS_PER_DAY + HOURS_PER_DAY
+        if self.origin is None:
+            self.origin = first
+        if first < self.origin:
+            self._grow(self.origin - first, 0)
+            self.origin = first
+        end = self.origin + len(self.kwh)
+        if last > end:
+            # Grow by at least half again, so appending day by day stays linear
+            self._grow(0, max(last - end, len(self.kwh) // 2 // HOURS_PER_DAY * HOURS_PER_DAY))
+        offsets = hours - self.origin
+        self.kwh += np.bincount(offsets, weights=kwh, minlength=len(self.kwh))
+        self.readings += np.bincount(offsets, minlength=len(self.readings)).astype(np.int32)
+
+    def _grow(self, before: int, after: int):
+        self.kwh = np.concatenate([np.zeros(before), self.kwh, np.zeros(after)])
+        self.readings = np.concatenate([np.zeros(before, dtype=np.int32), self.readings,
+                                        np.zeros(after, dtype=np.int32)])
+
+    def profile(self) -> Tuple[Optional[int], np.ndarray, int]:
+        """
+        The profile trimmed to the days with readings.
+
+        Returns:
+            (absolute hour of its first midnight, float32 kWh per hour, hours without readings),
+            or (None, an empty profile, 0) if nothing was added
+        """
+        if self.origin is None:
+            return None, np.zeros(0, dtype=np.float32), 0
+        covered = np.flatnonzero(self.readings)
+        first = covered[0] // HOURS_PER_DAY * HOURS_PER_DAY
+        last = covered[-1] // HOURS_PER_DAY * HOURS_PER_DAY + HOURS_PER_DAY
+        missing = int(np.count_nonzero(self.readings[first:last] == 0))
+        return self.origin + int(first), self.kwh[first:last].astype(np.float32), missing
+
+def hour_datetime(hour: int) -> datetime:
+    """
+    The datetime of an absolute hour (hours since 0001-01-01).
+    """
+    return datetime.combine(date.fromordinal(hour // HOURS_PER_DAY), datetime.min.time()) + timedelta(
+        hours=hour % HOURS_PER_DAY)
+
+class MeterStore:
+    """
+    A directory of hourly profiles: per customer, a <customer>.npy file and a <customer>.json sidecar with its start time.
+
+    Each customer's files are written and read on their own, so saving or
+    loading one profile costs the same however many customers are stored.
+    """
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def customers(self) -> List[str]:
+        """
+        Ids of the stored customers.
+        """
+        return sorted(path.stem for path in self.directory.glob("*.json"))
+
+    def path(self, customer: str) -> Path:
+        """
+        The profile file of a customer.
+
+        Raises:
+            ValueError: If the customer id can't be used as a file name
+        """
+        if not CUSTOMER_ID.match(customer):
+            raise ValueError(f"Invalid customer id {customer!r}")
+        return self.directory / f"{customer}.npy"
+
+    def save(self, customer: str, start: datetime, profile: np.ndarray):
+        """
+        Store a customer's profile, replacing any earlier one.
+
+        Both files are written to a temporary name first and then renamed, so
+        readers never see a partial profile. The sidecar is written last, so a
+        customer is only listed once its profile is in place.
+        """
+        path = self.path(customer)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, "wb") as f:
+            np.save(f, np.asarray(profile, dtype=np.float32))
+        os.replace(tmp_file, path)
+
+        sidecar = path.with_suffix(".json")
+        tmp_file = f"{sidecar}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"start": start.isoformat(timespec="minutes")}, f)
+        os.replace(tmp_file, sidecar)
+
+    def load(self, customer: str) -> Tuple[datetime, np.ndarray]:
+        """
+        Memory-map a customer's profile.
+
+        Returns:
+            (the first hour, a read-only float32 array of kWh per hour)
+
+        Raises:
+            KeyError: If the customer has no stored profile
+        """
+        path = self.path(customer)
+        try:
+            with open(path.with_suffix(".json"), encoding="utf-8") as f:
+                start = json.load(f)["start"]
+        except FileNotFoundError:
+            raise KeyError(customer) from None
+        return datetime.fromisoformat(start), np.load(path, mmap_mode="r")
+
+    def year(self, customer: str, year: int) -> np.ndarray:
+        """
+        A customer's hourly kWh over one calendar year, for the tariff simulator.
+
+        A view of the stored file if the profile covers the whole year; otherwise a
+        copy with zeros for the hours outside it.
+        """
+        start, profile = self.load(customer)
+        year_start = datetime(year, 1, 1)
+        hours = (datetime(year + 1, 1, 1) - year_start) // timedelta(hours=1)
+        offset = (year_start - start) // timedelta(hours=1)
+        if 0 <= offset and offset + hours <= len(profile):
+            return profile[offset:offset + hours]
+        series = np.zeros(hours, dtype=np.float32)
+        source = profile[max(offset, 0):max(offset + hours, 0)]
+        series[max(-offset, 0):max(-offset, 0) + len(source)] = source
+        return series
+
+def ingest(export_file, store: MeterStore, customer: Optional[str] = None,
+           encoding: str = "utf-8-sig", chunk_rows: int = CHUNK_ROWS) -> IngestReport:
+    """
+    Parse a meter export and store its hourly profile.
+
+    Args:
+        export_file: Path of the export CSV
+        store: Where to store the profile
+        customer: Customer id (default: the export's file name without extension)
+        encoding: Text encoding of the export
+        chunk_rows: Rows parsed per chunk
+
+    Returns:
+        An IngestReport
+
+    Raises:
+        ValueError: If the export is malformed or has no readings
+    """
+    customer = customer or Path(export_file).stem
+    store.path(customer)
+    started = time.perf_counter()
+    parser = ReadingParser()
+    accumulator = HourlyAccumulator()
+    with open(export_file, newline="", encoding=encoding) as f:
+        for hours, kwh in parser.chunks(csv.reader(f), chunk_rows):
+            accumulator.add(hours, kwh)
+    origin, profile, missing = accumulator.profile()
+    if origin is None:
+        raise ValueError(f"No meter readings found in {export_file}")
+    start = hour_datetime(origin)
+    store.save(customer, start, profile)
+    return IngestReport(customer, parser.rows, start, len(profile), missing, time.perf_counter() - started)
@@ -0,0 +1,212 @@
+"""
+Columnar representation of the plan catalogue.
+
+A PlanTable stores one NumPy array per plan attribute instead of one Python
+object per plan, which keeps large catalogues compact and lets eligibility be
+computed with vectorised boolean masks over the whole catalogue.
+
+The calculator itself answers recommendations from its index and narrowing
+bitsets, which resolve a preference in a dictionary lookup or a few integer
+ANDs; the table is for work that touches every plan at once.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.calculator import UNKNOWN_VENDOR, Provider, vendor_key
+from src.core.registry import PACKAGES, VENDORS
+from src.core.windows import preference_window, window_overlap
+
+# Start/end hour stored for all-day plans
+ALL_DAY = -1
+
+class PlanTable:
+    """
+    Column-oriented plan catalogue backed by NumPy arrays.
+
+    Columns:
+        discount_pct: float64 discount percentage, exactly as given
+        start_hour, end_hour: int8 discount window (ALL_DAY for all-day plans)
+        requires_smart_meter: bool
+        vendor_id: int32 id in the vendor registry
+        name_id: int32 id in the package registry
+    """
+    def __init__(self, records: Iterable[Dict], providers: Optional[List[Provider]] = None):
+        """
+        Args:
+            records: The plans as providers.json entries, in catalogue order
+            providers: The Provider objects of the rows, if the table is built from them
+        """
+        self.providers = providers
+        discount = []
+        start = []
+        end = []
+        smart_meter = []
+        vendor = []
+        name = []
+
+        for record in records:
+            hours = record['hours']
+            discount.append(record['discount_pct'])
+            start.append(ALL_DAY if hours is None else hours[0])
+            end.append(ALL_DAY if hours is None else hours[1])
+            smart_meter.append(record['requires_smart_meter'])
+            vendor.append(VENDORS.intern(record['vendor']))
+            name.append(PACKAGES.intern(record['name']))
+
+        self.discount_pct = np.array(discount, dtype=np.float64)
+        self.start_hour = np.array(start, dtype=np.int8)
+        self.end_hour = np.array(end, dtype=np.int8)
+        self.requires_smart_meter = np.array(smart_meter, dtype=bool)
+        self.vendor_id = np.array(vendor, dtype=np.int32)
+        self.name_id = np.array(name, dtype=np.int32)
+        # Overlap of every plan with each preferred window asked about so far
+        self._overlaps: Dict[Tuple[int, int], np.ndarray] = {}
+
+    @classmethod
+    def from_providers(cls, providers: Iterable[Provider]) -> 'PlanTable':
+        """
+        Build a table from Provider objects.
+
+        Args:
+            providers: The plans, in catalogue order
+
+        Returns:
+            The PlanTable, whose rows map back to the given Provider objects
+        """
+        providers = list(providers)
+        return cls(({
+            'name': p.name,
+            'vendor': p.vendor,
+            'discount_pct': p.discount_pct,
+            'hours': p.hours,
+            'requires_smart_meter': p.requires_smart_meter
+        } for p in providers), providers)
+
+    def __len__(self) -> int:
+        return len(self.discount_pct)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the column arrays, in bytes.
+        """
+        return sum(column.nbytes for column in (
+            self.discount_pct, self.start_hour, self.end_hour,
+            self.requires_smart_meter, self.vendor_id, self.name_id
+        ))
+
+    def provider(self, index: int) -> Provider:
+        """
+        The Provider of a single row.
+
+        Args:
+            index: The row index
+
+        Returns:
+            The Provider the row was built from, or for a table built from
+            records, a new Provider with the row's values
+        """
+        if self.providers is not None:
+            return self.providers[index]
+        start = int(self.start_hour[index])
+        return Provider({
+            'name': PACKAGES.name(self.name_id[index]),
+            'vendor': VENDORS.name(self.vendor_id[index]),
+            'discount_pct': float(self.discount_pct[index]),
+            'hours': None if start == ALL_DAY else (start, int(self.end_hour[index])),
+            'requires_smart_meter': bool(self.requires_smart_meter[index])
+        })
+
+    def hours_mask(self, hours: Optional[tuple]) -> np.ndarray:
+        """
+        Boolean mask of plans with exactly the given discount window.
+
+        Args:
+            hours: None for all-day plans, or (start, end)
+        """
+        if hours is None:
+            return self.start_hour == ALL_DAY
+        return (self.start_hour == hours[0]) & (self.end_hour == hours[1])
+
+    def overlap(self, window: Tuple[int, int]) -> np.ndarray:
+        """
+        Fraction of a preferred window each plan discounts (0.0 for all-day plans, see window_overlap).
+        """
+        window = tuple(window)
+        cached = self._overlaps.get(window)
+        if cached is not None:
+            return cached
+        # Windows repeat across plans, so each distinct one is scored once
+        windows, inverse = np.unique(np.stack([self.start_hour, self.end_hour], axis=1), axis=0, return_inverse=True)
+        overlaps = np.array([
+            0.0 if start == ALL_DAY else window_overlap((int(start), int(end)), window) for start, end in windows
+        ])
+        cached = self._overlaps[window] = overlaps[inverse.reshape(-1)]
+        return cached
+
+    @staticmethod
+    def _window(user_prefs: Dict) -> Optional[Tuple[int, int]]:
+        if user_prefs["discount_type"] == "fixed":
+            return None
+        return preference_window(user_prefs["time_preference"])
+
+    def mask(self, user_prefs: Dict) -> np.ndarray:
+        """
+        Boolean mask of the plans eligible for the user's preferences.
+
+        Uses the same rules as ProviderCalculator.get_recommendation: all-day
+        plans for a fixed discount, and plans overlapping the preferred window otherwise.
+
+        Args:
+            user_prefs: The user preferences dictionary
+
+        Returns:
+            A boolean array in catalogue order
+        """
+        window = self._window(user_prefs)
+        mask = self.hours_mask(None) if window is None else self.overlap(window) > 0
+        if not user_prefs["has_smart_meter"]:
+            mask &= ~self.requires_smart_meter
+
+        vendor_id = vendor_key(user_prefs["vendor"])
+        if vendor_id == UNKNOWN_VENDOR:
+            return np.zeros(len(self), dtype=bool)
+        if vendor_id is not None:
+            mask &= self.vendor_id == vendor_id
+        return mask
+
+    def best(self, mask: np.ndarray, window: Optional[Tuple[int, int]] = None) -> Optional[int]:
+        """
+        Row index of the highest discount among the masked plans.
+
+        Ties resolve to the earliest row, like a linear scan.
+
+        Args:
+            mask: Boolean eligibility mask
+            window: A preferred window; plans then score their discount times
+                the fraction of it they cover
+
+        Returns:
+            The row index, or None if the mask is empty
+        """
+        if not mask.any():
+            return None
+        scores = self.discount_pct
+        if window is not None:
+            scores = scores * self.overlap(window)
+        return int(np.argmax(np.where(mask, scores, -np.inf)))
+
+    def get_recommendation(self, user_prefs: Dict) -> Optional[Provider]:
+        """
+        Recommend the best plan for the user's preferences.
+
+        Args:
+            user_prefs: The user preferences dictionary
+
+        Returns:
+            The recommended Provider, or None if no plan is eligible
+        """
+        index = self.best(self.mask(user_prefs), self._window(user_prefs))
+        return None if index is None else self.provider(index)
@@ -0,0 +1,108 @@
+"""
+Canonical ids for vendor and package names.
+
+Each name is interned once into a small integer, so plans, the plan index and
+conversation state compare vendors as integers rather than lowercased strings.
+Both registries are seeded from name_mapping.json, which also supplies the
+Hebrew names shown to users; names missing from the mapping are registered
+the first time a catalogue uses them.
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+NAME_MAPPING_FILE = Path(__file__).parent.parent / 'data' / 'name_mapping.json'
+
+class NameRegistry:
+    """
+    Interned integer ids for one kind of name, matched case-insensitively.
+    """
+    def __init__(self, translations: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            translations: Names to register up front, mapped to their Hebrew names
+        """
+        self._names: List[str] = []
+        self._translations: List[Optional[str]] = []
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for name, translation in (translations or {}).items():
+            self.intern(name, translation)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def intern(self, name: str, translation: Optional[str] = None) -> int:
+        """
+        Get the id of a name, registering it if it is new.
+
+        Args:
+            name: The canonical name
+            translation: Its Hebrew name, also accepted by lookup
+
+        Returns:
+            The name's id
+        """
+        key = name.casefold()
+        name_id = self._ids.get(key)
+        if name_id is None:
+            # Catalogues are also loaded by the reload thread
+            with self._lock:
+                name_id = self._ids.get(key)
+                if name_id is None:
+                    name_id = len(self._names)
+                    self._names.append(sys.intern(name))
+                    self._translations.append(translation)
+                    if translation:
+                        self._ids.setdefault(translation.casefold(), name_id)
+                    self._ids[key] = name_id
+        return name_id
+
+    def lookup(self, name: Union[str, int]) -> Optional[int]:
+        """
+        Find the id of a registered name, its Hebrew name or an id.
+
+        Returns:
+            The id, or None if the name isn't registered
+        """
+        if isinstance(name, int):
+            return name if 0 <= name < len(self._names) else None
+        return self._ids.get(name.casefold())
+
+    def name(self, name_id: int) -> str:
+        """
+        The canonical name for an id.
+        """
+        return self._names[name_id]
+
+    def translation(self, name_id: int) -> str:
+        """
+        The Hebrew name for an id, or the canonical name if it has none.
+        """
+        return self._translations[name_id] or self._names[name_id]
+
+    def names(self) -> List[str]:
+        """
+        All canonical names, indexed by id.
+        """
+        return list(self._names)
+
+def load_registries(mapping_file=NAME_MAPPING_FILE) -> Tuple[NameRegistry, NameRegistry]:
+    """
+    Build the vendor and package registries from a name mapping file.
+
+    Args:
+        mapping_file: JSON with "vendor" and "package_name" objects mapping names to Hebrew
+
+    Returns:
+        The (vendors, packages) registries
+    """
+    with open(mapping_file, 'r', encoding='utf-8') as f:
+        mapping = json.load(f)
+    return NameRegistry(mapping.get("vendor", {})), NameRegistry(mapping.get("package_name", {}))
+
+# The registries every catalogue and conversation share, built once
+VENDORS, PACKAGES = load_registries()
@@ -0,0 +1,150 @@
+"""
+Load-profile savings engine for electricity plans.
+
+Evaluates every plan in a catalogue at once: each plan becomes a row of a
+plans x 24 hourly discount matrix, and a consumption profile is folded into
+hour-of-day totals so the savings of all plans are one matrix-vector product.
+"""
+
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.core.calculator import Provider, vendor_key
+from src.core.windows import HOURS_PER_DAY
+
+# IEC residential tariff in ILS per kWh (including VAT)
+DEFAULT_PRICE_PER_KWH = 0.6402
+
+def hours_mask(hours: Optional[Sequence[int]]) -> np.ndarray:
+    """
+    Build the hour-of-day mask of a discount window.
+
+    Args:
+        hours: None for all-day, or (start, end) where end is exclusive.
+            Windows with start > end wrap around midnight (e.g. 23-7).
+
+    Returns:
+        A boolean array of length 24, True for discounted hours
+    """
+    starts, ends = _window_arrays([hours])
+    return _masks(starts, ends)[0]
+
+def _window_arrays(hours: Iterable[Optional[Sequence[int]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split discount windows into start and end hour arrays.
+
+    All-day plans are encoded as the window 0-0, which covers the whole day.
+    """
+    windows = [(0, 0) if h is None else (h[0] % HOURS_PER_DAY, h[1] % HOURS_PER_DAY) for h in hours]
+    windows = np.array(windows, dtype=np.int64).reshape(-1, 2)
+    return windows[:, 0], windows[:, 1]
+
+def _masks(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Vectorised plans x 24 boolean mask of discounted hours.
+
+    Windows with start >= end wrap around midnight, so start == end covers the whole day.
+    """
+    hour = np.arange(HOURS_PER_DAY)
+    starts = starts[:, None]
+    ends = ends[:, None]
+    inside = (hour >= starts) & (hour < ends)
+    wrapped = (hour >= starts) | (hour < ends)
+    return np.where(starts < ends, inside, wrapped)
+
+def fold_profile(profile: Sequence[float]) -> np.ndarray:
+    """
+    Fold a consumption profile into hour-of-day totals.
+
+    Args:
+        profile: kWh per hour; 24 values for a typical day, or any whole number
+            of days (e.g. 8760 for a year) starting at midnight
+
+    Returns:
+        A float array of length 24 with the total kWh consumed in each hour of the day
+
+    Raises:
+        ValueError: If the profile does not cover a whole number of days
+    """
+    profile = np.asarray(profile, dtype=np.float64)
+    if profile.ndim != 1 or profile.size == 0 or profile.size % HOURS_PER_DAY:
+        raise ValueError(f"Profile must contain a whole number of days of hourly values, got {profile.shape}")
+    return profile.reshape(-1, HOURS_PER_DAY).sum(axis=0)
+
+class SavingsEngine:
+    """
+    Computes expected shekel savings of every plan for a consumption profile.
+    """
+    def __init__(self, providers: Iterable[Provider], price_per_kwh: float = DEFAULT_PRICE_PER_KWH):
+        self.providers: List[Provider] = list(providers)
+        self.price_per_kwh = price_per_kwh
+
+        starts, ends = _window_arrays(p.hours for p in self.providers)
+        self.hour_masks = _masks(starts, ends)
+        discounts = np.array([p.discount_pct for p in self.providers], dtype=np.float64) / 100.0
+        self.discount_matrix = self.hour_masks * discounts[:, None]
+        self.requires_smart_meter = np.array([bool(p.requires_smart_meter) for p in self.providers], dtype=bool)
+        self.vendor_ids = np.array([p.vendor_id for p in self.providers], dtype=np.int32)
+
+    def savings(self, profile: Sequence[float]) -> np.ndarray:
+        """
+        Expected savings of every plan for a consumption profile.
+
+        Args:
+            profile: kWh per hour (see fold_profile)
+
+        Returns:
+            A float array with the savings in ILS of each plan, in catalogue order
+        """
+        return self.discount_matrix @ fold_profile(profile) * self.price_per_kwh
+
+    def overlap_scores(self, window: Optional[Sequence[int]]) -> np.ndarray:
+        """
+        Fraction of a preferred window covered by each plan's discount hours.
+
+        Args:
+            window: The preferred window (None for all-day), wrap-around allowed
+
+        Returns:
+            A float array of scores between 0.0 and 1.0, in catalogue order
+        """
+        preferred = hours_mask(window)
+        return (self.hour_masks & preferred).sum(axis=1) / preferred.sum()
+
+    def eligible(self, has_smart_meter: bool = True, vendor: Optional[Union[str, int]] = None) -> np.ndarray:
+        """
+        Boolean mask of the plans a user can take.
+
+        Args:
+            has_smart_meter: Whether the user has a smart meter
+            vendor: Restrict to one vendor (a name in any case, or a vendor id), or None/"none" for any
+
+        Returns:
+            A boolean array in catalogue order
+        """
+        mask = np.ones(len(self.providers), dtype=bool) if has_smart_meter else ~self.requires_smart_meter
+        if vendor is not None and vendor != "none":
+            mask &= self.vendor_ids == vendor_key(vendor)
+        return mask
+
+    def rank(self, profile: Sequence[float], has_smart_meter: bool = True,
+             vendor: Optional[Union[str, int]] = None, top: Optional[int] = None) -> List[Tuple[Provider, float]]:
+        """
+        Rank the eligible plans by expected savings.
+
+        Args:
+            profile: kWh per hour (see fold_profile)
+            has_smart_meter: Whether the user has a smart meter
+            vendor: Restrict to one vendor, or None/"none" for any
+            top: Maximum number of plans to return (default: all eligible plans)
+
+        Returns:
+            A list of (provider, savings in ILS) pairs, best first; ties keep catalogue order
+        """
+        savings = self.savings(profile)
+        candidates = np.flatnonzero(self.eligible(has_smart_meter, vendor))
+        order = candidates[np.argsort(-savings[candidates], kind="stable")]
+        if top is not None:
+            order = order[:top]
+        return [(self.providers[i], float(savings[i])) for i in order]
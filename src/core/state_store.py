@@ -0,0 +1,414 @@
+"""
+Pluggable storage for conversation state.
+
+ConversationHandler keeps each user's UserState in a StateStore. Backends:
+
+- MemoryStateStore: in-process, bounded by an LRU size cap and an idle TTL
+- SQLiteStateStore: a local SQLite database in WAL mode
+- RedisStateStore: any server speaking the Redis protocol (RESP), shared by bot workers
+
+The persistent backends buffer writes and flush them in batches, so a button
+press doesn't cost a synchronous fsync or network round-trip.
+"""
+
+import json
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.core.conversation import UserState
+from src.utils.metrics import Metrics, metrics as default_metrics
+
+class StateStore(ABC):
+    """
+    Interface for storing conversation state by user ID.
+    """
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[UserState]:
+        """
+        Get a user's state, or None if the store has none.
+        """
+
+    @abstractmethod
+    def set(self, user_id: str, state: UserState):
+        """
+        Store a user's state.
+        """
+
+    @abstractmethod
+    def delete(self, user_id: str):
+        """
+        Remove a user's state.
+        """
+
+    def flush(self):
+        """
+        Persist any buffered writes.
+        """
+
+    def close(self):
+        """
+        Flush buffered writes and release resources.
+        """
+        self.flush()
+
+class MemoryStateStore(StateStore):
+    """
+    In-process state store with optional LRU size cap and idle TTL.
+
+    Expired states are dropped lazily on access and in bulk by sweep(), which
+    a background sweeper thread can run periodically. Evictions and the number
+    of live sessions are published to the metrics registry.
+    """
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, metrics: Metrics = None):
+        """
+        Args:
+            max_size: Maximum number of users kept; the least recently used are evicted
+            ttl: Seconds of inactivity after which a user's state expires
+            clock: Monotonic time source (injectable for tests)
+            metrics: Metrics registry (default: the process-wide registry)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.metrics = metrics or default_metrics
+        # Ordered by last access, least recent first
+        self._states: 'OrderedDict[str, Tuple[UserState, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, user_id: str) -> Optional[UserState]:
+        now = self.clock()
+        with self._lock:
+            entry = self._states.get(user_id)
+            if entry is None:
+                return None
+            state, last_access = entry
+            if self.ttl is not None and now - last_access > self.ttl:
+                del self._states[user_id]
+                self.metrics.increment("session_evictions_ttl")
+                return None
+            self._states[user_id] = (state, now)
+            self._states.move_to_end(user_id)
+            return state
+
+    def set(self, user_id: str, state: UserState):
+        now = self.clock()
+        with self._lock:
+            self._states[user_id] = (state, now)
+            self._states.move_to_end(user_id)
+            if self.max_size is not None and len(self._states) > self.max_size:
+                evicted = len(self._states) - self.max_size
+                for _ in range(evicted):
+                    self._states.popitem(last=False)
+                self.metrics.increment("session_evictions_lru", evicted)
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._states.pop(user_id, None)
+
+    def sweep(self) -> int:
+        """
+        Drop every state idle for longer than the TTL.
+
+        Since states are ordered by last access, this only visits expired entries.
+
+        Returns:
+            The number of states removed
+        """
+        removed = 0
+        if self.ttl is not None:
+            cutoff = self.clock() - self.ttl
+            with self._lock:
+                while self._states:
+                    user_id, (_, last_access) = next(iter(self._states.items()))
+                    if last_access >= cutoff:
+                        break
+                    del self._states[user_id]
+                    removed += 1
+            if removed:
+                self.metrics.increment("session_evictions_ttl", removed)
+        self.metrics.set_gauge("live_sessions", len(self._states))
+        return removed
+
+    def start_sweeper(self, interval: float = 60.0):
+        """
+        Run sweep() every interval seconds in a background daemon thread.
+        """
+        if self._sweeper is not None:
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval,),
+                                         name="state-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            self.sweep()
+
+    def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+class BufferedStateStore(StateStore):
+    """
+    Base class for backends that serialize states and write them in batches.
+
+    Writes are buffered until batch_size users are pending or flush_interval
+    seconds have passed since the first pending write, whichever comes first.
+    Reads see buffered writes immediately.
+    """
+    def __init__(self, batch_size: int = 100, flush_interval: float = 1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Optional[Dict]] = {}  # None marks a delete
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+    @abstractmethod
+    def _load(self, user_id: str) -> Optional[Dict]:
+        """
+        Read a serialized state from the backend.
+        """
+
+    @abstractmethod
+    def _write(self, batch: Dict[str, Optional[Dict]]):
+        """
+        Write a batch of serialized states (None values are deletes) to the backend.
+        """
+
+    def get(self, user_id: str) -> Optional[UserState]:
+        with self._lock:
+            if user_id in self._pending:
+                data = self._pending[user_id]
+            else:
+                data = self._load(user_id)
+        return None if data is None else UserState.from_dict(data)
+
+    def set(self, user_id: str, state: UserState):
+        self._buffer(user_id, state.to_dict())
+
+    def delete(self, user_id: str):
+        self._buffer(user_id, None)
+
+    def _buffer(self, user_id: str, data: Optional[Dict]):
+        with self._lock:
+            self._pending[user_id] = data
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._write(batch)
+
+class SQLiteStateStore(BufferedStateStore):
+    """
+    State store backed by a SQLite database in WAL mode.
+    """
+    def __init__(self, path: str, batch_size: int = 100, flush_interval: float = 1.0):
+        """
+        Args:
+            path: Path to the database file (created if missing)
+            batch_size: Number of pending users that triggers a flush
+            flush_interval: Maximum seconds a write stays buffered
+        """
+        super().__init__(batch_size, flush_interval)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints, not on every commit
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_states ("
+            "user_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _load(self, user_id: str) -> Optional[Dict]:
+        row = self._conn.execute("SELECT data FROM user_states WHERE user_id = ?", (user_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _write(self, batch: Dict[str, Optional[Dict]]):
+        now = time.time()
+        upserts = [(uid, json.dumps(data), now) for uid, data in batch.items() if data is not None]
+        deletes = [(uid,) for uid, data in batch.items() if data is None]
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT INTO user_states (user_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                upserts
+            )
+            self._conn.executemany("DELETE FROM user_states WHERE user_id = ?", deletes)
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def close(self):
+        super().close()
+        self._conn.close()
+
+class RedisError(Exception):
+    """
+    Error reply from a Redis-protocol server.
+    """
+
+class RespConnection:
+    """
+    Minimal Redis protocol (RESP2) client supporting pipelined commands.
+    """
+    def __init__(self, host: str = "localhost", port: int = 6379, timeout: float = 5.0):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._sock.makefile("rb")
+
+    @staticmethod
+    def _encode(args: Sequence) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode("utf-8")
+        if prefix == b"-":
+            raise RedisError(payload.decode("utf-8"))
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            count = int(payload)
+            return None if count < 0 else [self._read() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def execute(self, *args):
+        """
+        Send one command and return its reply.
+        """
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands: List[Sequence]) -> List:
+        """
+        Send several commands in one write and return their replies in order.
+        """
+        self._sock.sendall(b"".join(self._encode(args) for args in commands))
+        return [self._read() for _ in commands]
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+class RedisStateStore(BufferedStateStore):
+    """
+    State store backed by a Redis-protocol server, shareable by several bot workers.
+    """
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 prefix: str = "voltwiz:state:", ttl: Optional[int] = None,
+                 batch_size: int = 100, flush_interval: float = 0.1):
+        """
+        Args:
+            host: Server host
+            port: Server port
+            db: Database number
+            prefix: Key prefix for user states
+            ttl: Expiry in seconds applied to each written state
+            batch_size: Number of pending users that triggers a flush
+            flush_interval: Maximum seconds a write stays buffered
+        """
+        super().__init__(batch_size, flush_interval)
+        self.prefix = prefix
+        self.ttl = ttl
+        self._conn = RespConnection(host, port)
+        if db:
+            self._conn.execute("SELECT", db)
+
+    def _load(self, user_id: str) -> Optional[Dict]:
+        data = self._conn.execute("GET", self.prefix + user_id)
+        return None if data is None else json.loads(data)
+
+    def _write(self, batch: Dict[str, Optional[Dict]]):
+        commands = []
+        for user_id, data in batch.items():
+            key = self.prefix + user_id
+            if data is None:
+                commands.append(("DEL", key))
+            elif self.ttl:
+                commands.append(("SET", key, json.dumps(data), "EX", self.ttl))
+            else:
+                commands.append(("SET", key, json.dumps(data)))
+        self._conn.pipeline(commands)
+
+    def close(self):
+        super().close()
+        self._conn.close()
+
+def create_state_store(url: str = "memory") -> StateStore:
+    """
+    Create a state store from a URL.
+
+    Supported forms:
+        memory or memory://?max_size=10000&ttl=3600
+        sqlite:///path/to/states.db
+        redis://host:port/db?ttl=86400
+
+    Args:
+        url: The store URL
+
+    Returns:
+        The configured StateStore
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    parsed = urlparse(url if "://" in url else f"{url}://")
+    options = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+    if parsed.scheme == "memory":
+        return MemoryStateStore(
+            max_size=int(options["max_size"]) if "max_size" in options else None,
+            ttl=float(options["ttl"]) if "ttl" in options else None
+        )
+    if parsed.scheme == "sqlite":
+        # As in SQLAlchemy: sqlite:///relative.db and sqlite:////absolute/path.db
+        return SQLiteStateStore(parsed.path[1:] or ":memory:")
+    if parsed.scheme == "redis":
+        return RedisStateStore(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            ttl=int(options["ttl"]) if "ttl" in options else None
+        )
+    raise ValueError(f"Unsupported state store: {url}")
@@ -0,0 +1,192 @@
+"""
+Precomputed statistics over the plan catalogue.
+
+Statistics are kept per segment, where a segment is the set of plans eligible
+for one normalised preference key (has_smart_meter, preference window, vendor or None),
+so messages can compare a plan against the plans the user could actually take.
+"""
+
+import bisect
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.windows import preference_windows
+
+class SegmentStats:
+    """
+    Running discount statistics for a set of plans.
+    """
+    def __init__(self, discounts: Iterable[float] = ()):
+        """
+        Args:
+            discounts: Discounts of the segment's initial plans, sorted once here
+        """
+        self._sorted = list(discounts)
+        self.count = len(self._sorted)
+        self.total = float(sum(self._sorted))
+        self._sorted.sort()  # discounts in ascending order
+        self._below: Optional[Dict[float, int]] = None  # discount -> number of lower discounts
+
+    def add(self, discount_pct: float):
+        """
+        Add a plan's discount to the segment, keeping the discounts sorted.
+
+        Args:
+            discount_pct: The plan's discount percentage
+        """
+        bisect.insort(self._sorted, discount_pct)
+        self.count += 1
+        self.total += discount_pct
+        self._below = None
+
+    @property
+    def mean(self) -> float:
+        """
+        The average discount in the segment (0.0 when empty).
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """
+        Nearest-rank percentile of the discounts in the segment.
+
+        Args:
+            q: The percentile, between 0 and 100
+
+        Returns:
+            The discount at that percentile
+
+        Raises:
+            ValueError: If the segment is empty
+        """
+        if not self.count:
+            raise ValueError("Percentile of an empty segment")
+        index = max(0, min(self.count - 1, -(-q * self.count // 100) - 1))
+        return self._sorted[int(index)]
+
+    def count_above(self, discount_pct: float) -> int:
+        """
+        Number of plans in the segment with a strictly higher discount.
+        """
+        return self.count - bisect.bisect_right(self._sorted, discount_pct)
+
+    def better_than(self, discount_pct: float) -> float:
+        """
+        Percentage of plans in the segment with a strictly lower discount.
+
+        Args:
+            discount_pct: The discount to compare
+
+        Returns:
+            A percentage between 0 and 100 (0.0 when the segment is empty)
+        """
+        if not self.count:
+            return 0.0
+        if self._below is None:
+            below = {}
+            for i, discount in enumerate(self._sorted):
+                below.setdefault(discount, i)
+            self._below = below
+        lower = self._below.get(discount_pct)
+        if lower is None:
+            lower = bisect.bisect_left(self._sorted, discount_pct)
+        return 100.0 * lower / self.count
+
+def preference_score(provider, window: Optional[Tuple[int, int]]) -> float:
+    """
+    The discount a plan is ranked by for a preference window.
+
+    Args:
+        provider: The Provider object
+        window: A preference window, or None for the fixed-discount preference
+
+    Returns:
+        The discount times the fraction of the window the plan covers (the
+        plain discount without a window)
+    """
+    if window is None:
+        return provider.discount_pct
+    return provider.discount_pct * dict(preference_windows(provider.hours)).get(window, 0.0)
+
+def preference_entries(provider) -> Iterator[Tuple[Tuple[bool, Optional[Tuple[int, int]], Optional[int]], float]]:
+    """
+    The normalised preference keys for which a plan is eligible, with its score under each.
+
+    Args:
+        provider: The Provider object
+
+    Yields:
+        ((has_smart_meter, preference window, vendor id or None), preference_score) pairs
+    """
+    meter_options = (True,) if provider.requires_smart_meter else (False, True)
+    for window, overlap in preference_windows(provider.hours):
+        score = provider.discount_pct * overlap
+        for has_smart_meter in meter_options:
+            for vendor in (provider.vendor_id, None):
+                yield (has_smart_meter, window, vendor), score
+
+def preference_keys(provider) -> Iterator[Tuple[bool, Optional[Tuple[int, int]], Optional[int]]]:
+    """
+    The normalised preference keys for which a plan is eligible.
+
+    Args:
+        provider: The Provider object
+
+    Yields:
+        (has_smart_meter, preference window, vendor id or None) keys
+    """
+    for key, _ in preference_entries(provider):
+        yield key
+
+class CatalogueStats:
+    """
+    Global and per-segment discount statistics, updated incrementally.
+
+    The overall statistics are of plain discounts. A segment's are of the
+    scores its plans are ranked by (see preference_score), so a windowed
+    recommendation is compared on the same terms it was chosen on.
+    """
+    def __init__(self, providers: Iterable = ()):
+        # Each segment's discounts are gathered first and sorted once, rather than inserted one by one
+        overall = []
+        discounts: Dict[Tuple, List[float]] = {}
+        for provider in providers:
+            overall.append(provider.discount_pct)
+            for key, score in preference_entries(provider):
+                discounts.setdefault(key, []).append(score)
+        self.overall = SegmentStats(overall)
+        self.segments: Dict[Tuple, SegmentStats] = {key: SegmentStats(values) for key, values in discounts.items()}
+
+    def add(self, provider):
+        """
+        Account for a plan added to the catalogue.
+
+        Args:
+            provider: The Provider object
+        """
+        self.overall.add(provider.discount_pct)
+        for key, score in preference_entries(provider):
+            self.segments.setdefault(key, SegmentStats()).add(score)
+
+    def segment(self, key: Tuple) -> Optional[SegmentStats]:
+        """
+        Get the statistics of the plans eligible for a preference key.
+
+        Args:
+            key: A normalised preference key
+
+        Returns:
+            The segment statistics, or None if no plan is eligible
+        """
+        return self.segments.get(key)
+
+    def rank(self, provider) -> int:
+        """
+        Rank of a plan in the whole catalogue by discount (1 is the best).
+
+        Args:
+            provider: The Provider object
+
+        Returns:
+            One plus the number of plans with a strictly higher discount
+        """
+        return self.overall.count_above(provider.discount_pct) + 1
@@ -0,0 +1,171 @@
+"""
+Calendar-aware tariff simulator for annual bills.
+
+Each plan's TariffRules are compiled, once per year and interval length, into
+a dense vector holding the discount of every interval of the year, so the
+bills of all plans for a customer's meter series are a single matrix-vector
+product. Plans without calendar rules discount their hours window every day.
+
+Series start on January 1st at 00:00 local time, one value per hour (8760 or
+8784 values) or per 15 minutes (35040 or 35136); daylight saving time is not
+modelled.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.calculator import Provider, TariffRule
+from src.core.savings import DEFAULT_PRICE_PER_KWH, HOURS_PER_DAY, hours_mask
+
+def plan_rules(provider: Provider) -> Tuple[TariffRule, ...]:
+    """
+    The calendar rules of a plan, deriving one from its discount_pct and hours if it has none.
+    """
+    return provider.rules or (TariffRule(provider.discount_pct, provider.hours),)
+
+class TariffCalendar:
+    """
+    The days of one year and the calendar attributes the rules select on.
+    """
+    def __init__(self, year: int, holidays: Iterable[date] = ()):
+        """
+        Args:
+            year: The calendar year
+            holidays: Holiday dates; those outside the year are ignored
+        """
+        self.year = year
+        days = np.arange(np.datetime64(f"{year}-01-01"), np.datetime64(f"{year + 1}-01-01"))
+        # 1970-01-01, day 0, was a Thursday
+        self.weekday = (days.astype(np.int64) + 3) % 7
+        self.month = days.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        self.holiday = np.isin(days, np.array(sorted(holidays), dtype="datetime64[D]"))
+
+    def __len__(self) -> int:
+        return len(self.weekday)
+
+    def day_mask(self, rule: TariffRule) -> np.ndarray:
+        """
+        Boolean mask of the days of the year a rule applies on.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if rule.days is not None:
+            mask &= np.isin(self.weekday, list(rule.days))
+        if rule.months is not None:
+            mask &= np.isin(self.month, list(rule.months))
+        if rule.holidays is not None:
+            mask &= self.holiday == rule.holidays
+        return mask
+
+    def discounts(self, rules: Sequence[TariffRule], intervals_per_hour: int = 1) -> np.ndarray:
+        """
+        The discount fraction of every interval of the year under a list of rules.
+
+        Args:
+            rules: Rules in priority order; the first matching rule sets an interval's discount
+            intervals_per_hour: 1 for hourly intervals, 4 for 15-minute ones
+
+        Returns:
+            A float32 array of len(self) * 24 * intervals_per_hour discounts between 0 and 1
+        """
+        vector = np.zeros((len(self), HOURS_PER_DAY * intervals_per_hour), dtype=np.float32)
+        # Applied last to first, so earlier rules overwrite later ones
+        for rule in reversed(rules):
+            slots = np.repeat(hours_mask(rule.hours), intervals_per_hour)
+            vector[np.ix_(self.day_mask(rule), slots)] = rule.discount_pct / 100.0
+        return vector.ravel()
+
+class TariffSimulator:
+    """
+    Computes the annual bill of every plan for a customer's meter series.
+    """
+    def __init__(self, providers: Iterable[Provider], price_per_kwh: float = DEFAULT_PRICE_PER_KWH,
+                 holidays: Iterable[date] = ()):
+        """
+        Args:
+            providers: The plans to simulate
+            price_per_kwh: Undiscounted price in ILS per kWh
+            holidays: Holiday dates for rules that depend on them
+        """
+        self.providers: List[Provider] = list(providers)
+        self.price_per_kwh = price_per_kwh
+        self.holidays = frozenset(holidays)
+        # Plans x intervals discount matrices keyed on (year, intervals per hour)
+        self._matrices: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def discount_matrix(self, year: int, intervals_per_hour: int = 1) -> np.ndarray:
+        """
+        The plans x intervals discount matrix of a year, compiled on first use.
+
+        Plans with the same rules share the compilation of their row.
+        """
+        key = (year, intervals_per_hour)
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            calendar = TariffCalendar(year, self.holidays)
+            matrix = np.empty((len(self.providers), len(calendar) * HOURS_PER_DAY * intervals_per_hour),
+                              dtype=np.float32)
+            rows: Dict[Tuple[TariffRule, ...], int] = {}
+            for i, provider in enumerate(self.providers):
+                rules = plan_rules(provider)
+                row = rows.get(rules)
+                if row is None:
+                    rows[rules] = i
+                    matrix[i] = calendar.discounts(rules, intervals_per_hour)
+                else:
+                    matrix[i] = matrix[row]
+            matrix.flags.writeable = False
+            self._matrices[key] = matrix
+        return matrix
+
+    def savings(self, series: Sequence[float], year: int) -> np.ndarray:
+        """
+        Annual savings of every plan for a meter series.
+
+        Args:
+            series: kWh per interval over the whole year, hourly or per 15 minutes
+            year: The year the series covers
+
+        Returns:
+            A float array with the savings in ILS of each plan, in catalogue order
+
+        Raises:
+            ValueError: If the series does not cover the year in whole intervals
+        """
+        series = np.asarray(series, dtype=np.float32)
+        hours = (date(year + 1, 1, 1) - date(year, 1, 1)).days * HOURS_PER_DAY if series.ndim == 1 else 0
+        if not hours or series.size % hours or series.size // hours not in (1, 2, 4):
+            raise ValueError(f"Series must hold the hourly, half-hourly or 15-minute values of {year}, "
+                             f"got {series.shape}")
+        matrix = self.discount_matrix(year, series.size // hours)
+        return (matrix @ series).astype(np.float64) * self.price_per_kwh
+
+    def bills(self, series: Sequence[float], year: int) -> np.ndarray:
+        """
+        Annual bill of every plan for a meter series (see savings).
+
+        Returns:
+            A float array with the bill in ILS of each plan, in catalogue order
+        """
+        total = float(np.sum(series, dtype=np.float64)) * self.price_per_kwh
+        return total - self.savings(series, year)
+
+    def rank(self, series: Sequence[float], year: int,
+             top: Optional[int] = None) -> List[Tuple[Provider, float]]:
+        """
+        Rank the plans by annual bill.
+
+        Args:
+            series: kWh per interval over the whole year (see savings)
+            year: The year the series covers
+            top: Maximum number of plans to return (default: all plans)
+
+        Returns:
+            A list of (provider, bill in ILS) pairs, cheapest first; ties keep catalogue order
+        """
+        bills = self.bills(series, year)
+        order = np.argsort(bills, kind="stable")
+        if top is not None:
+            order = order[:top]
+        return [(self.providers[i], float(bills[i])) for i in order]
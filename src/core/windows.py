@@ -0,0 +1,78 @@
+"""
+Discount windows and how well they cover the windows users prefer.
+
+A plan whose discount hours only partly cover a preferred window still
+discounts part of it, so windowed plans are matched to the time-of-day
+preferences by overlap rather than by equal windows: a plan is eligible for a
+preferred window it overlaps, and scores its discount times the fraction of the
+window it covers.
+"""
+
+from typing import Dict, FrozenSet, Optional, Sequence, Tuple
+
+HOURS_PER_DAY = 24
+
+# Discount windows offered by the conversation's time-preference question
+DAY_HOURS = (7, 17)
+EVENING_HOURS = (17, 23)
+NIGHT_HOURS = (23, 7)
+TIME_PREFERENCES = {"day": DAY_HOURS, "evening": EVENING_HOURS, "night": NIGHT_HOURS}
+PREFERENCE_WINDOWS = tuple(TIME_PREFERENCES.values())
+
+def preference_window(time_preference: str) -> Tuple[int, int]:
+    """
+    The window of an answer to the time-preference question: "day", "evening" or "night".
+    """
+    return TIME_PREFERENCES.get(time_preference, NIGHT_HOURS)
+
+def discount_hours(hours: Optional[Sequence[int]]) -> FrozenSet[int]:
+    """
+    The hours of the day a window covers.
+
+    Args:
+        hours: None for all-day, or (start, end) where end is exclusive.
+            Windows with start >= end wrap around midnight, so start == end covers the whole day.
+    """
+    if hours is None:
+        return frozenset(range(HOURS_PER_DAY))
+    start, end = hours[0] % HOURS_PER_DAY, hours[1] % HOURS_PER_DAY
+    if start < end:
+        return frozenset(range(start, end))
+    return frozenset(range(start, HOURS_PER_DAY)) | frozenset(range(end))
+
+def window_overlap(plan_hours: Optional[Sequence[int]], window: Optional[Sequence[int]]) -> float:
+    """
+    Fraction of the hours in a preferred window that a plan discounts.
+
+    Args:
+        plan_hours: The plan's discount window (None for all-day)
+        window: The preferred window (None for all-day)
+
+    Returns:
+        A score between 0.0 (no overlap) and 1.0 (window fully covered)
+    """
+    preferred = discount_hours(window)
+    return len(discount_hours(plan_hours) & preferred) / len(preferred)
+
+# preference_windows results keyed by plan window; plans share a handful of windows
+_PREFERENCE_OVERLAPS: Dict[Optional[Tuple[int, int]], Tuple[Tuple[Optional[Tuple[int, int]], float], ...]] = {}
+
+def preference_windows(hours: Optional[Tuple[int, int]]) -> Tuple[Tuple[Optional[Tuple[int, int]], float], ...]:
+    """
+    The preference windows a plan is eligible for, with the fraction of each it covers.
+
+    All-day plans are eligible for the fixed-discount preference (None) only;
+    windowed plans for every preference window they overlap.
+
+    Returns:
+        (preference window or None, overlap) pairs
+    """
+    windows = _PREFERENCE_OVERLAPS.get(hours)
+    if windows is None:
+        if hours is None:
+            windows = ((None, 1.0),)
+        else:
+            overlaps = ((window, window_overlap(hours, window)) for window in PREFERENCE_WINDOWS)
+            windows = tuple((window, overlap) for window, overlap in overlaps if overlap)
+        _PREFERENCE_OVERLAPS[hours] = windows
+    return windows
@@ -0,0 +1,121 @@
+"""
+Batch CLI for scoring customer preference files with VoltWiz.
+
+Reads a CSV with the columns has_smart_meter, discount_type, time_preference
+and vendor, and writes the same rows with the recommended plan appended.
+Rows are streamed one at a time, so files of any size run in constant memory.
+
+Usage:
+    python -m src.utils.batch_cli customers.csv recommendations.csv
+    python -m src.utils.batch_cli - - < customers.csv > recommendations.csv
+"""
+
+import argparse
+import csv
+import itertools
+import sys
+from typing import Dict, Iterable, Iterator, TextIO
+
+from src.core.calculator import PREFERENCE_FIELDS, ProviderCalculator
+
+RESULT_FIELDS = ("recommended_vendor", "recommended_plan", "discount_pct")
+
+TRUE_VALUES = {"1", "true", "yes", "y", "כן"}
+
+def parse_preferences(row: Dict[str, str]) -> Dict:
+    """
+    Convert a CSV row into a user preferences dictionary.
+
+    Args:
+        row: A CSV row with (at least) the PREFERENCE_FIELDS columns
+
+    Returns:
+        A user_prefs dictionary as accepted by ProviderCalculator
+    """
+    return {
+        "has_smart_meter": (row.get("has_smart_meter") or "").strip().lower() in TRUE_VALUES,
+        "discount_type": (row.get("discount_type") or "fixed").strip().lower(),
+        "time_preference": (row.get("time_preference") or "").strip().lower() or None,
+        "vendor": (row.get("vendor") or "none").strip().lower() or "none",
+    }
+
+def score_rows(rows: Iterable[Dict[str, str]], calculator: ProviderCalculator) -> Iterator[Dict[str, str]]:
+    """
+    Append the recommended plan to each row of a stream.
+
+    Args:
+        rows: CSV rows as dictionaries
+        calculator: The calculator to score with
+
+    Yields:
+        Each input row extended with the RESULT_FIELDS columns
+    """
+    # tee only buffers the single row in flight, so the stream stays lazy
+    rows, preference_rows = itertools.tee(rows)
+    recommendations = calculator.iter_recommendations(map(parse_preferences, preference_rows))
+
+    for row, provider in zip(rows, recommendations):
+        if provider:
+            row.update({
+                "recommended_vendor": provider.vendor,
+                "recommended_plan": provider.name,
+                "discount_pct": provider.discount_pct,
+            })
+        else:
+            row.update({field: "" for field in RESULT_FIELDS})
+        yield row
+
+def run_batch(infile: TextIO, outfile: TextIO, calculator: ProviderCalculator = None) -> int:
+    """
+    Score a CSV stream and write the results as CSV.
+
+    Args:
+        infile: Readable text stream with a header row
+        outfile: Writable text stream
+        calculator: The calculator to use (default: the bundled catalogue)
+
+    Returns:
+        The number of rows written
+    """
+    if calculator is None:
+        calculator = ProviderCalculator()
+
+    reader = csv.DictReader(infile)
+    missing = [field for field in PREFERENCE_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+
+    fieldnames = list(reader.fieldnames) + [f for f in RESULT_FIELDS if f not in reader.fieldnames]
+    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+    writer.writeheader()
+
+    count = 0
+    for row in score_rows(reader, calculator):
+        writer.writerow(row)
+        count += 1
+    return count
+
+def main(argv=None) -> None:
+    """
+    Command-line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Recommend electricity plans for a CSV of customers")
+    parser.add_argument("input", help="Input CSV file ('-' for stdin)")
+    parser.add_argument("output", help="Output CSV file ('-' for stdout)")
+    parser.add_argument("--providers", help="Path to an alternative providers.json")
+    args = parser.parse_args(argv)
+
+    calculator = ProviderCalculator(args.providers)
+    infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    outfile = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        count = run_batch(infile, outfile, calculator)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    print(f"Scored {count} rows", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
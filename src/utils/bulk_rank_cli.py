@@ -0,0 +1,65 @@
+"""
+Rank plans by savings for a whole file of customer load profiles.
+
+The profiles are a customers x intervals .npy matrix: 24 hour-of-day totals
+per customer (see fold_profile) are ranked with the flat discount windows of
+the savings engine, and a year of hourly or 15-minute values with the
+calendar-aware tariff simulator. Results go to an output directory as shards;
+running the same command again resumes an interrupted job.
+
+Usage:
+    python -m src.utils.bulk_rank_cli profiles.npy ranking/ --workers 8
+    python -m src.utils.bulk_rank_cli year.npy ranking/ --year 2025
+"""
+
+import argparse
+import sys
+from datetime import date
+
+import numpy as np
+
+from src.core.bulk_ranking import SHARD_SIZE, BulkRanker
+from src.core.calculator import ProviderCalculator
+from src.core.savings import HOURS_PER_DAY, SavingsEngine
+from src.core.tariffs import TariffSimulator
+
+def plan_matrix(providers, intervals: int, year: int = None) -> np.ndarray:
+    """
+    The plans x intervals discount matrix for profiles of the given width.
+
+    Raises:
+        ValueError: If the width needs a year and none is given, or fits no interval length
+    """
+    if intervals == HOURS_PER_DAY:
+        return SavingsEngine(providers).discount_matrix
+    if year is None:
+        raise ValueError(f"Profiles with {intervals} intervals need --year")
+    hours = (date(year + 1, 1, 1) - date(year, 1, 1)).days * HOURS_PER_DAY
+    if intervals % hours or intervals // hours not in (1, 2, 4):
+        raise ValueError(f"{intervals} intervals are not an hourly, half-hourly or 15-minute year of {year}")
+    return TariffSimulator(providers).discount_matrix(year, intervals // hours)
+
+def main(argv=None) -> None:
+    """
+    Command-line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Rank plans by savings for a file of load profiles")
+    parser.add_argument("profiles", help="Customers x intervals .npy matrix of kWh")
+    parser.add_argument("output", help="Directory for the results")
+    parser.add_argument("--providers", help="Path to an alternative providers.json")
+    parser.add_argument("--year", type=int, help="Year of full-year profiles")
+    parser.add_argument("--top", type=int, default=3, help="Plans kept per customer")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    args = parser.parse_args(argv)
+
+    providers = ProviderCalculator(args.providers).providers
+    intervals = np.load(args.profiles, mmap_mode="r").shape[-1]
+    ranker = BulkRanker(plan_matrix(providers, intervals, args.year), top=args.top,
+                        shard_size=args.shard_size, workers=args.workers)
+    report = ranker.run(args.profiles, args.output)
+    print(f"Ranked {report.ranked} of {report.customers} customers in {report.seconds:.1f}s "
+          f"({report.customers_per_second:,.0f} customers/s, {ranker.workers} workers)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
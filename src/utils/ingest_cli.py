@@ -0,0 +1,39 @@
+"""
+Ingest smart-meter exports into the hourly profile store.
+
+Each export is parsed in chunks and stored as <customer>.npy in the store
+directory, the customer id defaulting to the export's file name. Throughput is
+reported per file.
+
+Usage:
+    python -m src.utils.ingest_cli profiles/ export1.csv export2.csv
+    python -m src.utils.ingest_cli profiles/ meter.csv --customer 1234
+"""
+
+import argparse
+import sys
+
+from src.core.meter_data import MeterStore, ingest
+
+def main(argv=None) -> None:
+    """
+    Command-line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Ingest smart-meter exports into hourly profiles")
+    parser.add_argument("store", help="Directory of the profile store")
+    parser.add_argument("exports", nargs="+", help="Meter export CSV files")
+    parser.add_argument("--customer", help="Customer id (only with a single export)")
+    parser.add_argument("--encoding", default="utf-8-sig", help="Text encoding of the exports")
+    args = parser.parse_args(argv)
+    if args.customer and len(args.exports) > 1:
+        parser.error("--customer can only be given with a single export")
+
+    store = MeterStore(args.store)
+    for export in args.exports:
+        report = ingest(export, store, args.customer, encoding=args.encoding)
+        print(f"{export}: {report.rows} readings -> {report.customer}, {report.hours} hours from "
+              f"{report.start:%Y-%m-%d} ({report.missing_hours} missing), "
+              f"{report.rows_per_second:,.0f} rows/s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
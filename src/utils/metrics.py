@@ -0,0 +1,73 @@
+"""
+In-process metrics registry for the VoltWiz application.
+
+Counters, gauges and timings are kept in memory and exposed as a plain
+dictionary snapshot, which callers can log or export as they see fit.
+"""
+
+import threading
+from typing import Dict
+
+class Metrics:
+    """
+    Thread-safe registry of counters, gauges and timings.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def increment(self, name: str, value: float = 1):
+        """
+        Increase a counter.
+
+        Args:
+            name: The counter name
+            value: The amount to add
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """
+        Set a gauge to its current value.
+
+        Args:
+            name: The gauge name
+            value: The current value
+        """
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """
+        Record the duration of an operation.
+
+        Args:
+            name: The timing name
+            seconds: The measured duration in seconds
+        """
+        with self._lock:
+            timing = self.timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+            timing["last"] = seconds
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Get a copy of all recorded metrics.
+
+        Returns:
+            A dictionary with "counters", "gauges" and "timings" sections
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timings": {name: dict(timing) for name, timing in self.timings.items()},
+            }
+
+# Process-wide registry
+metrics = Metrics()
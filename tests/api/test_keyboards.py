@@ -0,0 +1,99 @@
+import json
+import os
+import pytest
+from src.api.keyboards import MAX_CALLBACK_DATA, KeyboardRegistry, keyboards
+from src.core.conversation import DEFAULT_FLOW, Choice, ConversationFlow, ConversationHandler, ConversationState
+from src.core.messages import DEFAULT_LOCALE, MESSAGES
+
+def test_each_question_has_one_shared_keyboard():
+    handler = ConversationHandler()
+    question, buttons = handler.get_next_question("1")
+    state = handler.get_user_state("1")
+    first = keyboards.markup(state.locale, state.state, buttons)
+    assert keyboards.markup(state.locale, state.state, buttons) is first
+    assert len(keyboards) >= len(DEFAULT_FLOW.steps) * len(MESSAGES.locales)
+    assert [[button.text for button in row] for row in first.inline_keyboard] == buttons
+
+def test_buttons_carry_compact_codes_that_decode():
+    for state in DEFAULT_FLOW.steps:
+        keyboard = keyboards.markup(DEFAULT_LOCALE, state)
+        for row in keyboard.inline_keyboard:
+            for button in row:
+                assert len(button.callback_data.encode()) <= 8 < MAX_CALLBACK_DATA
+    codes = [choice.code for step in DEFAULT_FLOW.steps.values() for row in step.choices for choice in row]
+    assert len(codes) == len(set(codes))
+
+def test_unknown_question_falls_back_to_labels():
+    registry = KeyboardRegistry(ConversationFlow({"start": "COMPLETED", "invalid_answer": "", "steps": []}))
+    keyboard = registry.markup("en", ConversationState.ASKING_VENDOR, [["a", "b"]])
+    assert [button.callback_data for button in keyboard.inline_keyboard[0]] == ["a", "b"]
+    assert registry.markup("en", ConversationState.ASKING_VENDOR) is keyboard
+    assert registry.markup("en", ConversationState.ASKING_SMART_METER) is None
+
+def test_oversized_callback_code_is_rejected():
+    with pytest.raises(ValueError):
+        KeyboardRegistry.build([[Choice("x" * (MAX_CALLBACK_DATA + 1), "label", 1)]])
+
+def test_every_locale_has_its_own_keyboards():
+    for locale in MESSAGES.locales:
+        for state, step in DEFAULT_FLOW.localized(locale).items():
+            keyboard = keyboards.markup(locale, state)
+            assert [[button.text for button in row] for row in keyboard.inline_keyboard] == step.buttons
+    english, hebrew = keyboards.more(3, "en"), keyboards.more(3)
+    assert english.inline_keyboard[0][0].text == "More plans ▾"
+    assert english.inline_keyboard[0][0].callback_data == hebrew.inline_keyboard[0][0].callback_data == "more:3"
+    assert keyboards.more(3, "en") is english
+
+def test_untranslated_prompt_keeps_its_locales_buttons():
+    choices = [[{"code": "m1", "label": "כן", "value": True}, {"code": "m0", "label": "לא", "value": False}]]
+    flow = ConversationFlow(
+        {"start": "ASKING_SMART_METER", "invalid_answer": "?", "steps": [dict(
+            state="ASKING_SMART_METER", prompt="מונה חכם?", field="has_smart_meter", choices=choices, next="COMPLETED"
+        )]},
+        translations={"en": {"steps": {"ASKING_SMART_METER": {"choices": {"m1": "Yes", "m0": "No"}}}}}
+    )
+    registry = KeyboardRegistry(flow)
+    assert flow.localized("en")[ConversationState.ASKING_SMART_METER].prompt == "מונה חכם?"
+    english = registry.markup("en", ConversationState.ASKING_SMART_METER)
+    hebrew = registry.markup("he", ConversationState.ASKING_SMART_METER)
+    assert [button.text for button in english.inline_keyboard[0]] == ["Yes", "No"]
+    assert [button.text for button in hebrew.inline_keyboard[0]] == ["כן", "לא"]
+
+def test_catalogue_reload_rebuilds_the_vendor_question(tmp_path, monkeypatch):
+    from src.api import telegram_bot
+    from src.core.calculator import ProviderCalculator
+    from src.core.catalogue_watcher import CatalogueWatcher
+    from src.core.registry import VENDORS
+    from src.utils.metrics import Metrics
+
+    def write(vendors, bump):
+        providers = [{"name": "Night", "vendor": vendor, "discount_pct": 20, "hours": [23, 7],
+                      "requires_smart_meter": True} for vendor in vendors]
+        providers_file.write_text(json.dumps({"providers": providers}))
+        st = os.stat(providers_file)
+        os.utime(providers_file, ns=(st.st_atime_ns, st.st_mtime_ns + bump * 1_000_000_000))
+
+    def vendor_step():
+        return telegram_bot.get_conversation_handler().flow.steps[ConversationState.ASKING_VENDOR]
+
+    providers_file = tmp_path / "providers.json"
+    write(["Bezeq"], 0)
+    monkeypatch.setattr(telegram_bot, "_calculator", ProviderCalculator(str(providers_file)))
+    monkeypatch.setattr(telegram_bot, "_conversation_handler", None)
+    monkeypatch.setattr(telegram_bot, "_keyboards", None)
+    monkeypatch.setattr(telegram_bot, "_flow_vendors", None)
+    hot = VENDORS.translation(VENDORS.lookup("HOT"))
+    assert hot not in vendor_step().buttons[0]
+
+    watcher = CatalogueWatcher(telegram_bot.get_calculator(), providers_file, metrics=Metrics(),
+                               on_swap=telegram_bot.refresh_vendors)
+    write(["Bezeq", "HOT"], 1)
+    assert watcher.check()
+
+    step = vendor_step()
+    assert hot in step.buttons[0]
+    keyboard = telegram_bot.get_keyboards().markup(DEFAULT_LOCALE, ConversationState.ASKING_VENDOR)
+    assert hot in [button.text for row in keyboard.inline_keyboard for button in row]
+    # Typed vendor names are matched against the new vendors too
+    handler = telegram_bot.get_conversation_handler()
+    assert handler.matcher.match(ConversationState.ASKING_VENDOR, "HOT") == (True, VENDORS.lookup("HOT"))
@@ -0,0 +1,159 @@
+import asyncio
+import time
+import pytest
+from telegram.error import RetryAfter
+from src.api.send_queue import BROADCAST, INTERACTIVE, SendScheduler, TokenBucket
+from src.utils.metrics import Metrics
+
+class RecordingBot:
+    def __init__(self, failures=()):
+        self.sent = []
+        self.failures = list(failures)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((chat_id, text, kwargs, time.monotonic()))
+        return len(self.sent)
+
+def _scheduler(bot, **kwargs):
+    kwargs.setdefault("global_rate", 1000)
+    kwargs.setdefault("chat_rate", 1000)
+    return SendScheduler(bot, metrics=Metrics(), **kwargs)
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2, capacity=2, now=0.0)
+    assert bucket.delay(0.0) == 0
+    bucket.consume()
+    bucket.consume()
+    assert bucket.delay(0.0) == pytest.approx(0.5)
+    assert bucket.delay(0.25) == pytest.approx(0.25)
+    assert bucket.time_to_full(0.25) == pytest.approx(0.75)
+    assert bucket.delay(10.0) == 0
+    assert bucket.tokens == 2
+
+def test_consecutive_messages_are_coalesced():
+    bot = RecordingBot()
+
+    async def main():
+        scheduler = _scheduler(bot)
+        first = scheduler.submit(1, "welcome")
+        second = scheduler.submit(1, "question?", reply_markup="keyboard")
+        scheduler.start()
+        results = await asyncio.gather(first, second)
+        await scheduler.stop()
+        return scheduler, results
+
+    scheduler, results = asyncio.run(main())
+    assert [(chat, text, kwargs) for chat, text, kwargs, _ in bot.sent] == [
+        (1, "welcome\n\nquestion?", {"reply_markup": "keyboard"})
+    ]
+    assert results == [1, 1]
+    assert scheduler.coalesced == 1
+
+def test_message_with_keyboard_is_not_extended():
+    bot = RecordingBot()
+
+    async def main():
+        scheduler = _scheduler(bot)
+        scheduler.submit(1, "question?", reply_markup="keyboard")
+        scheduler.submit(1, "reminder")
+        scheduler.submit(2, "other chat")
+        scheduler.start()
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert [text for chat, text, _, _ in bot.sent if chat == 1] == ["question?", "reminder"]
+    assert len(bot.sent) == 3
+
+def test_per_chat_rate_is_respected():
+    bot = RecordingBot()
+
+    async def main():
+        scheduler = _scheduler(bot, chat_rate=20, chat_burst=1, coalesce=False)
+        scheduler.start()
+        await asyncio.gather(*(scheduler.send_message(1, f"m{i}") for i in range(5)))
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert [text for _, text, _, _ in bot.sent] == ["m0", "m1", "m2", "m3", "m4"]
+    times = [sent_at for _, _, _, sent_at in bot.sent]
+    assert times[-1] - times[0] >= 4 / 20 * 0.9
+
+def test_interactive_replies_go_before_broadcasts():
+    bot = RecordingBot()
+
+    async def main():
+        scheduler = _scheduler(bot, global_rate=50, global_burst=1)
+        for chat_id in range(10, 15):
+            scheduler.submit(chat_id, "news", priority=BROADCAST)
+        scheduler.submit(1, "answer", priority=INTERACTIVE)
+        scheduler.start()
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert bot.sent[0][:2] == (1, "answer")
+    assert len(bot.sent) == 6
+
+def test_retry_after_pauses_and_retries():
+    bot = RecordingBot(failures=[RetryAfter(0)])
+
+    async def main():
+        scheduler = _scheduler(bot)
+        scheduler.start()
+        result = await scheduler.send_message(1, "hello")
+        await scheduler.stop()
+        return scheduler, result
+
+    scheduler, result = asyncio.run(main())
+    assert result == 1
+    assert scheduler.retries == 1
+    assert scheduler.metrics.counters["send_retry_after"] == 1
+
+def test_failures_are_reported_per_message():
+    bot = RecordingBot(failures=[RetryAfter(0), ValueError("bad chat")])
+
+    async def main():
+        scheduler = _scheduler(bot, max_retries=0, coalesce=False)
+        scheduler.start()
+        with pytest.raises(RetryAfter):
+            await scheduler.send_message(1, "first")
+        with pytest.raises(ValueError):
+            await scheduler.send_message(1, "second")
+        assert await scheduler.send_message(1, "third") == 1
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert [text for _, text, _, _ in bot.sent] == ["third"]
+
+def test_failures_of_submitted_messages_are_logged(caplog):
+    bot = RecordingBot(failures=[ValueError("bad chat")])
+
+    async def main():
+        scheduler = _scheduler(bot)
+        scheduler.start()
+        scheduler.submit(1, "hello")
+        await scheduler.stop()
+
+    with caplog.at_level("WARNING", logger="src.api.send_queue"):
+        asyncio.run(main())
+    [record] = caplog.records
+    assert "chat 1 failed: bad chat" in record.getMessage()
+    assert isinstance(record.exc_info[1], ValueError)
+
+def test_stop_sends_queued_messages_and_forgets_idle_chats():
+    bot = RecordingBot()
+
+    async def main():
+        scheduler = _scheduler(bot, coalesce=False)
+        scheduler.start()
+        for chat_id in range(20):
+            scheduler.submit(chat_id, "hi")
+        await scheduler.stop()
+        await asyncio.sleep(0.01)
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert len(bot.sent) == 20
+    assert scheduler.pending == 0
+    assert scheduler.metrics.counters["messages_sent"] == 20
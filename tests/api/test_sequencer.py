@@ -0,0 +1,155 @@
+import asyncio
+import random
+from types import SimpleNamespace
+import pytest
+from telegram import Update
+from telegram.ext import SimpleUpdateProcessor
+from benchmarks.fake_bot_api import FakeBotAPI, callback_update, command_update
+from src.api import telegram_bot
+from src.api.sequencer import PerUserUpdateProcessor, UserSequencer, user_key
+from src.core.conversation import ConversationHandler
+
+ANSWERS = ["כן", "הנחה בשעות משתנות", "לילה (23:00-7:00)", "אף אחד מהם"]
+
+@pytest.fixture(autouse=True)
+def no_catalogue_watcher(monkeypatch):
+    monkeypatch.setenv("CATALOGUE_RELOAD_INTERVAL", "0")
+    monkeypatch.setenv("OUTBOUND_RATE_LIMIT", "0")
+
+def _update(user_id):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_chat=None)
+
+async def _press(handler, user_id, answer):
+    # Same shape as button_callback: awaits on the Bot API around the state changes
+    await asyncio.sleep(0)
+    if handler.process_answer(user_id, answer) is None and not handler.is_conversation_complete(user_id):
+        await asyncio.sleep(0)
+        handler.get_next_question(user_id)
+        await asyncio.sleep(0)
+
+async def _interleaved_presses(processor, handler, users):
+    rng = random.Random(7)
+    tasks = []
+    for answer in ANSWERS:
+        order = list(users)
+        rng.shuffle(order)
+        for user_id in order:
+            coroutine = _press(handler, str(user_id), answer)
+            tasks.append(asyncio.create_task(processor.process_update(_update(user_id), coroutine)))
+    await asyncio.gather(*tasks)
+
+def _run_conversations(processor, users):
+    handler = ConversationHandler()
+    for user_id in users:
+        handler.get_next_question(str(user_id))
+    asyncio.run(_interleaved_presses(processor, handler, users))
+    return handler
+
+def test_hold_serializes_same_key_and_cleans_up():
+    sequencer = UserSequencer()
+    events = []
+
+    async def job(key, name):
+        async with sequencer.hold(key):
+            events.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} end")
+
+    async def main():
+        await asyncio.gather(job(1, "a"), job(1, "b"), job(2, "c"))
+
+    asyncio.run(main())
+    assert events.index("a end") < events.index("b start")
+    assert events.index("c start") < events.index("a end")
+    assert len(sequencer) == 0
+
+def test_hold_releases_on_error():
+    sequencer = UserSequencer()
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            async with sequencer.hold(1):
+                raise RuntimeError("boom")
+        async with sequencer.hold(1):
+            pass
+
+    asyncio.run(main())
+    assert len(sequencer) == 0
+
+def test_user_key():
+    assert user_key(_update(5)) == 5
+    assert user_key(SimpleNamespace(effective_user=None, effective_chat=SimpleNamespace(id=-9))) == -9
+    assert user_key(object()) is None
+
+def test_interleaved_presses_for_10k_users_lose_no_transitions():
+    users = range(10_000)
+    processor = PerUserUpdateProcessor(256)
+    handler = _run_conversations(processor, users)
+
+    for user_id in users:
+        data = handler.get_user_data(str(user_id))
+        assert data is not None
+        assert (data.has_smart_meter, data.discount_type, data.time_preference, data.vendor) == (
+            True, "variable", "night", "none"
+        )
+    assert len(processor.sequencer) == 0
+
+def test_one_users_flood_does_not_block_other_users():
+    processor = PerUserUpdateProcessor(4)
+    release = asyncio.Event()
+    finished = []
+
+    async def press(user_id):
+        if user_id == 1:
+            await release.wait()
+        finished.append(user_id)
+
+    async def main():
+        flood = [asyncio.create_task(processor.process_update(_update(1), press(1))) for _ in range(10)]
+        await asyncio.sleep(0)
+        # The flood's queued presses wait on their user's lock, not on a concurrency slot
+        await asyncio.wait_for(processor.process_update(_update(2), press(2)), timeout=1)
+        assert finished == [2]
+        release.set()
+        await asyncio.gather(*flood)
+
+    asyncio.run(main())
+    assert finished == [2] + [1] * 10
+    assert len(processor.sequencer) == 0
+
+def test_unsequenced_presses_do_lose_transitions():
+    # Guards the stress test above: without sequencing the same workload races
+    users = range(100)
+    handler = _run_conversations(SimpleUpdateProcessor(256), users)
+    assert not all(handler.is_conversation_complete(str(user_id)) for user_id in users)
+
+def test_bot_serializes_each_users_updates():
+    api = FakeBotAPI()
+    users = range(9000, 9050)
+
+    async def main():
+        application = telegram_bot.build_application("123:TEST", concurrent_updates=True, request=api)
+        assert isinstance(application.update_processor, PerUserUpdateProcessor)
+        await application.initialize()
+        await application.start()
+        try:
+            update_id = 0
+            for answer in [None] + ANSWERS:
+                for user_id in users:
+                    update_id += 1
+                    data = command_update(update_id, user_id) if answer is None else callback_update(update_id, user_id, answer)
+                    await application.update_queue.put(Update.de_json(data, application.bot))
+            # Welcome, four questions and the recommendation per user
+            for _ in range(500):
+                if len(api.sent_messages()) >= 6 * len(users):
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await application.stop()
+            await application.shutdown()
+
+    asyncio.run(main())
+    for user_id in users:
+        data = telegram_bot.conversation_handler.get_user_data(str(user_id))
+        assert data is not None and data.vendor == "none"
+        assert len(api.sent_messages(user_id)) == 6
@@ -0,0 +1,19 @@
+from benchmarks.bench_startup import import_times, top_level
+
+# Cumulative -X importtime budget for the bot module; it took ~420 ms when it
+# imported python-telegram-bot and built the catalogue at import time
+IMPORT_BUDGET_US = 100_000
+
+def test_bot_module_import_is_lazy():
+    times = import_times("src.api.telegram_bot")
+    packages = top_level(times)
+    for heavy in ("telegram", "httpx", "dotenv", "numpy"):
+        assert heavy not in packages
+    assert "src.core.calculator" not in times
+    assert times["src.api.telegram_bot"] < IMPORT_BUDGET_US
+
+def test_singletons_are_created_on_first_use():
+    from src.api import telegram_bot
+    handler = telegram_bot.get_conversation_handler()
+    assert telegram_bot.conversation_handler is handler
+    assert telegram_bot.calculator is telegram_bot.get_calculator() is handler.calculator
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import pytest
+from benchmarks.fake_bot_api import FakeBotAPI, callback_update, command_update
+from src.api import telegram_bot
+from src.core.registry import VENDORS
+
+@pytest.fixture(autouse=True)
+def no_catalogue_watcher(monkeypatch):
+    monkeypatch.setenv("CATALOGUE_RELOAD_INTERVAL", "0")
+
+def _post(update, secret):
+    body = json.dumps(update).encode()
+    return (
+        f"POST /hook HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+        f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\n\r\n"
+    ).encode() + body
+
+def test_webhook_mode_end_to_end():
+    api = FakeBotAPI()
+
+    async def wait_for_messages(count):
+        for _ in range(200):
+            if len(api.sent_messages(7001)) >= count:
+                return
+            await asyncio.sleep(0.01)
+
+    async def main():
+        application = telegram_bot.build_application("123:TEST", concurrent_updates=True, request=api)
+        server = await telegram_bot.start_webhook(
+            application, "https://example.com/hook", port=0, secret_token="s3cret", listen="127.0.0.1"
+        )
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            for update, expected_messages in ((command_update(1, 7001), 1), (callback_update(2, 7001, "כן"), 2)):
+                writer.write(_post(update, "s3cret"))
+                await writer.drain()
+                assert (await reader.readline()).startswith(b"HTTP/1.1 200")
+                await reader.readuntil(b"\r\n\r\n")
+                await wait_for_messages(expected_messages)
+            writer.close()
+        finally:
+            await telegram_bot.stop_webhook(application, server)
+
+    asyncio.run(main())
+
+    set_webhook = [params for endpoint, params in api.calls if endpoint == "setWebhook"]
+    assert set_webhook[0]["url"] == "https://example.com/hook"
+    assert set_webhook[0]["secret_token"] == "s3cret"
+
+    # The welcome message and the first question are coalesced into one message
+    texts = [m["text"] for m in api.sent_messages(7001)]
+    assert texts[0].endswith("\n\nהאם יש לכם שעון חכם?")
+    assert texts[1] == "איזה סוג הנחה אתם מעדיפים?"
+    keyboard = api.sent_messages(7001)[1]["reply_markup"]
+    assert [button["callback_data"] for button in keyboard["inline_keyboard"][0]] == ["d1", "d2"]
+
+def test_recommendation_pages_ranked_plans(monkeypatch):
+    from telegram import Update
+    monkeypatch.setenv("OUTBOUND_RATE_LIMIT", "0")
+    api = FakeBotAPI()
+    user_id = 7002
+    presses = ["m1", "d2", "t2", "v0", "more:3"]
+
+    async def main():
+        application = telegram_bot.build_application("123:TEST", request=api)
+        await application.initialize()
+        await application.start()
+        try:
+            updates = [command_update(1, user_id)] + [
+                callback_update(i, user_id, data) for i, data in enumerate(presses, 2)
+            ]
+            for update in updates:
+                before = len(api.sent_messages(user_id))
+                await application.update_queue.put(Update.de_json(update, application.bot))
+                for _ in range(200):
+                    if len(api.sent_messages(user_id)) > before:
+                        break
+                    await asyncio.sleep(0.01)
+        finally:
+            await application.stop()
+            await application.shutdown()
+
+    asyncio.run(main())
+
+    messages = api.sent_messages(user_id)
+    recommendation, more = messages[-2:]
+    assert "\n1. Bezeq - Night (20%" in recommendation["text"]
+    assert "\n3. " in recommendation["text"] and "\n4. " not in recommendation["text"]
+    assert recommendation["reply_markup"]["inline_keyboard"][0][0]["callback_data"] == "more:3"
+    # The catalogue has five night plans, so the second page is the last
+    assert [line.split(".")[0] for line in more["text"].split("\n")[1:]] == ["4", "5"]
+    assert "reply_markup" not in more
+
+def test_typed_answers_are_understood(monkeypatch):
+    from telegram import Update
+    from benchmarks.fake_bot_api import text_update
+    monkeypatch.setenv("OUTBOUND_RATE_LIMIT", "0")
+    api = FakeBotAPI()
+    user_id = 7003
+
+    async def main():
+        application = telegram_bot.build_application("123:TEST", request=api)
+        await application.initialize()
+        await application.start()
+        try:
+            updates = [text_update(1, user_id, "hello"), command_update(2, user_id)] + [
+                text_update(i, user_id, text) for i, text in enumerate(["כן", "קבוע", "הוט"], 3)
+            ]
+            for update in updates:
+                before = len(api.sent_messages(user_id))
+                await application.update_queue.put(Update.de_json(update, application.bot))
+                for _ in range(200):
+                    if len(api.sent_messages(user_id)) > before:
+                        break
+                    await asyncio.sleep(0.01)
+        finally:
+            await application.stop()
+            await application.shutdown()
+
+    asyncio.run(main())
+
+    texts = [m["text"] for m in api.sent_messages(user_id)]
+    assert "/start" in texts[0]
+    data = telegram_bot.conversation_handler.get_user_data(str(user_id))
+    assert (data.has_smart_meter, data.discount_type, data.vendor) == (True, "fixed", VENDORS.lookup("HOT"))
+    assert texts[-1].startswith("✅")
+
+def test_users_are_answered_in_their_language(monkeypatch):
+    from telegram import Update
+    monkeypatch.setenv("OUTBOUND_RATE_LIMIT", "0")
+    api = FakeBotAPI()
+    user_id = 7004
+
+    def with_language(update):
+        message = update.get("message") or update["callback_query"]
+        message["from"]["language_code"] = "ru"
+        return update
+
+    language = command_update(7, user_id, "/language en")
+    language["message"]["entities"][0]["length"] = len("/language")
+    updates = [with_language(command_update(1, user_id))] + [
+        with_language(callback_update(i, user_id, data)) for i, data in enumerate(["m1", "d2", "t2", "v0"], 2)
+    ] + [language, with_language(command_update(8, user_id))]
+
+    async def main():
+        application = telegram_bot.build_application("123:TEST", request=api)
+        await application.initialize()
+        await application.start()
+        try:
+            for update in updates:
+                before = len(api.sent_messages(user_id))
+                await application.update_queue.put(Update.de_json(update, application.bot))
+                for _ in range(200):
+                    if len(api.sent_messages(user_id)) > before:
+                        break
+                    await asyncio.sleep(0.01)
+        finally:
+            await application.stop()
+            await application.shutdown()
+
+    asyncio.run(main())
+
+    messages = api.sent_messages(user_id)
+    texts = [m["text"] for m in messages]
+    assert texts[0].startswith("Я VoltWiz")
+    assert texts[1] == "У вас есть умный счётчик?"
+    assert [button["text"] for button in messages[1]["reply_markup"]["inline_keyboard"][0]] == ["Да", "Нет"]
+    recommendation = messages[-4]
+    assert recommendation["text"].startswith("✅ *Рекомендуемый поставщик: Bezeq - Night*")
+    assert "\n\n🏆 *Лучшие тарифы для вас:*\n1. Bezeq - Night (20%" in recommendation["text"]
+    assert recommendation["reply_markup"]["inline_keyboard"][0][0]["text"] == "Ещё тарифы ▾"
+    # The chosen language outlasts the client's language and a new conversation
+    assert texts[-3] == "I'll speak English with you from now on."
+    assert texts[-2].startswith("I'm VoltWiz")
+    assert texts[-1] == "Do you have a smart meter?"
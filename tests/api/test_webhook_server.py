@@ -0,0 +1,142 @@
+import asyncio
+import json
+import pytest
+from src.api.webhook_server import WebhookServer
+
+SECRET = "s3cret"
+
+def _request(body: bytes, path="/hook", method="POST", secret=SECRET, extra=""):
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+    if secret is not None:
+        head += f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\n"
+    return (head + extra + "\r\n").encode() + body
+
+async def _exchange(port, *requests):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    statuses = []
+    for request in requests:
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            break
+        statuses.append(int(status_line.split()[1]))
+        await reader.readuntil(b"\r\n\r\n")
+    writer.close()
+    return statuses
+
+def _run(scenario, **kwargs):
+    received = []
+
+    async def on_update(update):
+        received.append(update)
+
+    async def main():
+        server = WebhookServer(on_update, path="/hook", secret_token=SECRET, host="127.0.0.1", port=0, **kwargs)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main()), received
+
+def test_accepts_valid_update():
+    body = json.dumps({"update_id": 1}).encode()
+    statuses, received = _run(lambda server: _exchange(server.port, _request(body)))
+    assert statuses == [200]
+    assert received == [{"update_id": 1}]
+
+def test_keep_alive_handles_many_requests_per_connection():
+    requests = [_request(json.dumps({"update_id": i}).encode()) for i in range(50)]
+    statuses, received = _run(lambda server: _exchange(server.port, *requests))
+    assert statuses == [200] * 50
+    assert sorted(u["update_id"] for u in received) == list(range(50))
+
+@pytest.mark.parametrize("request_bytes,status", [
+    (_request(b"{}", secret="wrong"), 403),
+    (_request(b"{}", secret=None), 403),
+    (_request(b"{}", path="/other"), 404),
+    (_request(b"", method="GET"), 405),
+    (_request(b"not json"), 400),
+])
+def test_rejects_invalid_requests(request_bytes, status):
+    statuses, received = _run(lambda server: _exchange(server.port, request_bytes))
+    assert statuses == [status]
+    assert received == []
+
+def test_rejects_oversized_body_without_reading_it():
+    body = b"x" * 2048
+    statuses, received = _run(lambda server: _exchange(server.port, _request(body), _request(b"{}")),
+                              max_body_size=1024)
+    # The connection is closed after the 413, so the second request is never answered
+    assert statuses == [413]
+    assert received == []
+
+def test_errors_in_handler_do_not_affect_response():
+    async def failing(update):
+        raise RuntimeError("boom")
+
+    async def main():
+        server = WebhookServer(failing, path="/hook", host="127.0.0.1", port=0)
+        await server.start()
+        try:
+            return await _exchange(server.port, _request(b"{}", secret=None))
+        finally:
+            await server.stop()
+
+    assert asyncio.run(main()) == [200]
+
+def test_answers_503_once_max_pending_updates_are_in_flight():
+    release = asyncio.Event()
+    received = []
+
+    async def blocked(update):
+        await release.wait()
+        received.append(update)
+
+    async def main():
+        server = WebhookServer(blocked, path="/hook", host="127.0.0.1", port=0, max_pending=2)
+        await server.start()
+        try:
+            requests = [_request(json.dumps({"update_id": i}).encode(), secret=None) for i in range(4)]
+            statuses = await _exchange(server.port, *requests)
+            release.set()
+            # Capacity is back once the pending updates finish
+            await asyncio.sleep(0.01)
+            statuses += await _exchange(server.port, _request(b"{}", secret=None))
+            return statuses, server.rejected
+        finally:
+            await server.stop()
+
+    assert asyncio.run(main()) == ([200, 200, 503, 503, 200], 2)
+    assert [update.get("update_id") for update in received] == [0, 1, None]
+
+def test_stalled_client_is_disconnected():
+    async def scenario(server):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"POST /hook HTTP/1.1\r\nContent-Length: 10\r\n\r\n{}")
+        await writer.drain()
+        # The body never completes, so the server gives up and closes the connection
+        closed = await asyncio.wait_for(reader.read(), timeout=2)
+        writer.close()
+        return closed
+
+    closed, received = _run(scenario, read_timeout=0.1)
+    assert closed == b""
+    assert received == []
+
+def test_stop_closes_idle_keep_alive_connections():
+    async def main():
+        server = WebhookServer(lambda update: asyncio.sleep(0), path="/hook", host="127.0.0.1", port=0)
+        await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(_request(b"{}", secret=None))
+        await writer.drain()
+        await reader.readuntil(b"\r\n\r\n")
+        # The connection stays open, waiting for another request
+        await asyncio.wait_for(server.stop(), timeout=2)
+        assert await reader.read() == b""
+        writer.close()
+
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+import pytest
+from src.core.answer_matcher import AnswerMatcher, FieldMatcher, normalise
+from src.core.conversation import ConversationHandler, ConversationState
+from src.core.registry import VENDORS
+
+@pytest.fixture(scope="module")
+def matcher():
+    return AnswerMatcher.from_files()
+
+def test_normalise():
+    assert normalise("  Yes, PLEASE!! ") == "yes please"
+    assert normalise("לַיְלָה") == "לילה"
+    assert normalise("יום (7:00-17:00)") == "יום 7 00 17 00"
+
+@pytest.mark.parametrize("state,text,value", [
+    (ConversationState.ASKING_SMART_METER, "כן!", True),
+    (ConversationState.ASKING_SMART_METER, "yess", True),
+    (ConversationState.ASKING_SMART_METER, "אין לי", False),
+    (ConversationState.ASKING_SMART_METER, "No thanks", False),
+    (ConversationState.ASKING_DISCOUNT_TYPE, "Fixd", "fixed"),
+    (ConversationState.ASKING_DISCOUNT_TYPE, "קבועהה", "fixed"),
+    (ConversationState.ASKING_DISCOUNT_TYPE, "הנחה משתנה בבקשה", "variable"),
+    (ConversationState.ASKING_TIME_PREFERENCE, "בלילה", "night"),
+    (ConversationState.ASKING_TIME_PREFERENCE, "Nigth", "night"),
+    (ConversationState.ASKING_TIME_PREFERENCE, "7:00-17:00 יום", "day"),
+    (ConversationState.ASKING_TIME_PREFERENCE, "in the evening", "evening"),
+    (ConversationState.ASKING_VENDOR, "HOT", VENDORS.lookup("HOT")),
+    (ConversationState.ASKING_VENDOR, "הוט", VENDORS.lookup("HOT")),
+    (ConversationState.ASKING_VENDOR, "אמישרגז", VENDORS.lookup("AmisraGaz")),
+    (ConversationState.ASKING_VENDOR, "בזק", VENDORS.lookup("Bezeq")),
+    (ConversationState.ASKING_VENDOR, "cellcom", VENDORS.lookup("Cellcom")),
+    (ConversationState.ASKING_VENDOR, "none of them", "none"),
+])
+def test_noisy_answers_are_matched(matcher, state, text, value):
+    assert matcher.match(state, text) == (True, value)
+
+@pytest.mark.parametrize("state,text", [
+    (ConversationState.ASKING_SMART_METER, "כן אין לי"),  # contradicts itself
+    (ConversationState.ASKING_SMART_METER, "m1"),  # button data, decoded by the flow
+    (ConversationState.ASKING_VENDOR, "banana"),
+    (ConversationState.COMPLETED, "כן"),
+])
+def test_unclear_answers_are_not_matched(matcher, state, text):
+    assert matcher.match(state, text) == (False, None)
+
+def test_typos_that_reach_two_answers_are_ambiguous():
+    field = FieldMatcher([("abcd", 1), ("abce", 2)])
+    assert field.match("abcd") == (True, 1)
+    assert field.match("abcx") == (False, None)
+
+def test_conflicting_phrases_are_rejected():
+    with pytest.raises(ValueError):
+        FieldMatcher([("Yes", True), ("yes!", False)])
+
+def test_handler_accepts_typed_answers(matcher):
+    handler = ConversationHandler(matcher=matcher)
+    handler.get_next_question("1")
+    assert handler.is_awaiting_answer("1")
+    for answer in ["yes", "variable discount", "at night", "Hot"]:
+        assert handler.process_answer("1", answer) is None
+        handler.get_next_question("1")
+    data = handler.get_user_data("1")
+    assert (data.has_smart_meter, data.discount_type, data.time_preference, data.vendor) == (True, "variable", "night", VENDORS.lookup("HOT"))
+    assert not handler.is_awaiting_answer("1")
+
+def test_handler_without_matcher_rejects_typed_answers():
+    handler = ConversationHandler()
+    handler.get_next_question("1")
+    assert handler.process_answer("1", "yess") is not None
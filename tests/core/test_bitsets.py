@@ -0,0 +1,61 @@
+import itertools
+import pytest
+from src.core.bitsets import value_bitsets
+from src.core.calculator import PREFERENCE_FIELDS, Provider, ProviderCalculator, vendor_key
+from src.core.windows import preference_window
+
+@pytest.fixture
+def calculator():
+    return ProviderCalculator()
+
+def test_value_bitsets():
+    assert value_bitsets(["a", "b", "a", None]) == {"a": 0b0101, "b": 0b0010, None: 0b1000}
+    assert value_bitsets([]) == {}
+    # More distinct values than fit in a byte
+    column = list(range(300)) + [7]
+    bitsets = value_bitsets(column)
+    assert bitsets[7] == (1 << 7) | (1 << 300)
+    assert bitsets[299] == 1 << 299
+
+def test_plans_are_numbered_best_first(calculator):
+    bitsets = calculator.catalogue.bitsets
+    assert len(bitsets) == len(calculator.providers)
+    discounts = [provider.discount_pct for provider in bitsets.ranked]
+    assert discounts == sorted(discounts, reverse=True)
+    assert list(bitsets.plans(bitsets.all)) == bitsets.ranked
+    assert bitsets.best(0) is None
+    assert list(bitsets.plans(0)) == []
+
+@pytest.mark.parametrize("has_smart_meter,discount_type,time_preference,vendor", list(itertools.product(
+    [True, False], ["fixed", "variable"], ["day", "evening", "night"], ["none", "hot", "amisragaz", "unknown"]
+)))
+def test_mask_matches_lookup(calculator, has_smart_meter, discount_type, time_preference, vendor):
+    user_prefs = {
+        "has_smart_meter": has_smart_meter,
+        "discount_type": discount_type,
+        "time_preference": time_preference,
+        "vendor": vendor
+    }
+    bitsets = calculator.catalogue.bitsets
+    answers = [(field, user_prefs[field]) for field in PREFERENCE_FIELDS]
+    if discount_type == "fixed":
+        answers.remove(("time_preference", time_preference))
+    mask = bitsets.all
+    for field, value in answers:
+        mask &= bitsets.answer_mask(field, value)
+    hours = None if discount_type == "fixed" else preference_window(time_preference)
+    assert bitsets.best(mask, hours) is calculator.get_recommendation(user_prefs)
+    assert mask == bitsets.key_mask((has_smart_meter, hours, vendor_key(vendor)))
+
+def test_fields_without_plan_attributes_keep_every_plan(calculator):
+    bitsets = calculator.catalogue.bitsets
+    assert bitsets.answer_mask("monthly_kwh", "high") == bitsets.all
+    assert bitsets.answer_mask("has_smart_meter", True) == bitsets.all
+
+def test_bitsets_are_rebuilt_after_add(calculator):
+    bitsets = calculator.catalogue.bitsets
+    calculator.add_provider(Provider({
+        "name": "Top", "vendor": "HOT", "discount_pct": 99, "hours": None, "requires_smart_meter": False
+    }))
+    assert calculator.catalogue.bitsets is not bitsets
+    assert calculator.catalogue.bitsets.ranked[0].name == "Top"
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from src.core.bulk_ranking import BulkRanker, rank_profiles, read_results, shard_path
+from src.core.calculator import ProviderCalculator
+from src.core.savings import SavingsEngine, fold_profile
+
+@pytest.fixture
+def engine():
+    return SavingsEngine(ProviderCalculator().providers, price_per_kwh=1.0)
+
+@pytest.fixture
+def profiles_file(tmp_path):
+    profiles = np.random.default_rng(0).gamma(2.0, 0.3, size=(250, 24)).astype(np.float32)
+    path = tmp_path / "profiles.npy"
+    np.save(path, profiles)
+    return path
+
+def test_rank_profiles_matches_engine_rank(engine):
+    profiles = np.random.default_rng(1).gamma(2.0, 0.3, size=(20, 24))
+    plans, savings = rank_profiles(engine.discount_matrix.astype(np.float32), profiles, 3, 1.0)
+    for profile, customer_plans, customer_savings in zip(profiles, plans, savings):
+        expected = engine.rank(profile, top=3)
+        assert [engine.providers[i] for i in customer_plans] == [p for p, _ in expected]
+        assert np.allclose(customer_savings, [s for _, s in expected], rtol=1e-5)
+
+def test_ties_keep_catalogue_order():
+    discounts = np.array([[0.1] * 24, [0.2] * 24, [0.1] * 24, [0.2] * 24], dtype=np.float32)
+    plans, _ = rank_profiles(discounts, np.ones((1, 24)), 3, 1.0)
+    assert plans.tolist() == [[1, 3, 0]]
+    plans, _ = rank_profiles(discounts, np.ones((1, 24)), 10, 1.0)
+    assert plans.tolist() == [[1, 3, 0, 2]]
+    # Longer rankings are sorted rather than selected
+    plans, _ = rank_profiles(np.tile(discounts, (5, 1)), np.ones((1, 24)), 18, 1.0)
+    assert plans.tolist() == [list(range(1, 20, 2)) + list(range(0, 16, 2))]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_ranks_every_customer(engine, profiles_file, tmp_path, workers):
+    output = tmp_path / "out"
+    report = BulkRanker(engine.discount_matrix, price_per_kwh=1.0, shard_size=40, workers=workers).run(
+        profiles_file, output)
+    assert (report.customers, report.shards, report.ranked) == (250, 7, 250)
+    plans, savings = read_results(output)
+    expected, _ = rank_profiles(engine.discount_matrix.astype(np.float32), np.load(profiles_file), 3, 1.0)
+    assert np.array_equal(plans, expected)
+    assert savings.shape == (250, 3)
+    assert savings[0, 0] == pytest.approx(engine.savings(fold_profile(np.load(profiles_file)[0])).max(), rel=1e-5)
+
+def test_interrupted_job_resumes(engine, profiles_file, tmp_path):
+    output = tmp_path / "out"
+    ranker = BulkRanker(engine.discount_matrix, shard_size=100, workers=1)
+    ranker.run(profiles_file, output)
+    complete = read_results(output)
+    shard_path(output, 1).unlink()
+    with pytest.raises(ValueError, match="1 of 3 shards"):
+        read_results(output)
+
+    report = ranker.run(profiles_file, output)
+    assert report.ranked == 100
+    assert all(np.array_equal(a, b) for a, b in zip(read_results(output), complete))
+
+def test_changed_job_is_rejected(engine, profiles_file, tmp_path):
+    output = tmp_path / "out"
+    BulkRanker(engine.discount_matrix, workers=1).run(profiles_file, output)
+    with pytest.raises(ValueError, match="different ranking job"):
+        BulkRanker(engine.discount_matrix, top=5, workers=1).run(profiles_file, output)
+    with pytest.raises(ValueError, match="intervals"):
+        BulkRanker(np.zeros((2, 48)), workers=1).run(profiles_file, tmp_path / "other")
@@ -1,5 +1,6 @@
 import pytest
-from src.core.calculator import Provider, ProviderCalculator
+from src.core.calculator import PREFERENCE_FIELDS, Catalogue, Provider, ProviderCalculator, Ranking
+from src.core.windows import window_overlap
 
 @pytest.fixture
 def sample_providers():
@@ -88,4 +89,278 @@ def test_format_recommendation(calculator):
     recommendation = calculator.format_recommendation(provider, user_prefs)
     assert "Test Vendor - Test Plan" in recommendation
     assert "15.0%" in recommendation
-    assert "18:00-22:00" in recommendation 
\ No newline at end of file
+    assert "18:00-22:00" in recommendation 
+
+@pytest.fixture
+def catalogue_calculator():
+    return ProviderCalculator()
+
+def _scan_eligible(providers, user_prefs):
+    valid = [p for p in providers if not p.requires_smart_meter or user_prefs["has_smart_meter"]]
+    if user_prefs["discount_type"] == "fixed":
+        valid = [p for p in valid if p.hours is None]
+    else:
+        valid = [p for p in valid if p.hours is not None and _scan_overlap(p, user_prefs)]
+    if user_prefs["vendor"] != "none":
+        valid = [p for p in valid if p.vendor.lower() == user_prefs["vendor"].lower()]
+    return valid
+
+def _scan_overlap(provider, user_prefs):
+    if user_prefs["discount_type"] == "fixed":
+        return 1.0
+    window = {"day": (7, 17), "evening": (17, 23), "night": (23, 7)}[user_prefs["time_preference"]]
+    return window_overlap(provider.hours, window)
+
+def _scan_sorted(providers, user_prefs):
+    return sorted(_scan_eligible(providers, user_prefs), key=lambda p: -p.discount_pct * _scan_overlap(p, user_prefs))
+
+def _scan_recommendation(providers, user_prefs):
+    ranked = _scan_sorted(providers, user_prefs)
+    return ranked[0] if ranked else None
+
+@pytest.mark.parametrize("has_smart_meter", [True, False])
+@pytest.mark.parametrize("discount_type,time_preference", [
+    ("fixed", None), ("variable", "day"), ("variable", "evening"), ("variable", "night")
+])
+@pytest.mark.parametrize("vendor", ["none", "hot", "amisragaz", "electra"])
+def test_indexed_recommendation_matches_scan(catalogue_calculator, has_smart_meter,
+                                             discount_type, time_preference, vendor):
+    user_prefs = {
+        "has_smart_meter": has_smart_meter,
+        "discount_type": discount_type,
+        "time_preference": time_preference,
+        "vendor": vendor
+    }
+    expected = _scan_recommendation(catalogue_calculator.providers, user_prefs)
+    assert catalogue_calculator.get_recommendation(user_prefs) is expected
+
+def test_indexed_recommendation_tie_breaks_by_catalogue_order(catalogue_calculator):
+    user_prefs = {
+        "has_smart_meter": True,
+        "discount_type": "variable",
+        "time_preference": "night",
+        "vendor": "none"
+    }
+    provider = catalogue_calculator.get_recommendation(user_prefs)
+    assert (provider.vendor, provider.name) == ("Bezeq", "Night")
+
+def test_windowed_plans_are_scored_by_overlap(catalogue_calculator):
+    prefs = {"has_smart_meter": True, "discount_type": "variable", "vendor": "none"}
+    # 17-23 overlaps neither day nor night, but is the whole evening window
+    evening = catalogue_calculator.get_top_recommendations(dict(prefs, time_preference="evening"), k=2)
+    assert [(p.vendor, p.name) for p in evening] == [("Electra", "Hi-Tech"), ("Cellcom", "Family Savings")]
+    # 14-20 covers 3 of the 10 day hours: 18% * 0.3 ranks below the full-day 15% plans
+    day = catalogue_calculator.get_top_recommendations(dict(prefs, time_preference="day"), k=10)
+    assert [(p.vendor, p.name) for p in day][-1] == ("Cellcom", "Family Savings")
+    family = dict(prefs, time_preference="evening", vendor="cellcom")
+    assert catalogue_calculator.get_recommendation(family).name == "Family Savings"
+
+def test_get_recommendations_batch_matches_single(catalogue_calculator):
+    records = [
+        {"has_smart_meter": True, "discount_type": "variable", "time_preference": "day", "vendor": "hot"},
+        (False, "fixed", None, "none"),
+        {"has_smart_meter": True, "discount_type": "variable", "time_preference": "day", "vendor": "hot"},
+        (True, "variable", "night", "amisragaz"),
+    ]
+    results = catalogue_calculator.get_recommendations_batch(records)
+    expected = [
+        catalogue_calculator.get_recommendation(
+            r if isinstance(r, dict) else dict(zip(PREFERENCE_FIELDS, r))
+        )
+        for r in records
+    ]
+    assert results == expected
+    assert results[0] is results[2]
+    assert results[3] is None
+
+def test_iter_recommendations_resolves_each_combination_once(catalogue_calculator, monkeypatch):
+    calls = []
+    lookup = catalogue_calculator.catalogue.lookup
+    monkeypatch.setattr(catalogue_calculator.catalogue, "lookup", lambda key: calls.append(key) or lookup(key))
+    records = [(True, "fixed", None, "none"), (False, "fixed", None, "hot")] * 1000
+    results = list(catalogue_calculator.iter_recommendations(records))
+    assert len(results) == 2000
+    assert len(calls) == 2
+
+def test_recommendation_message_cache_counts_hits_and_misses(catalogue_calculator):
+    user_prefs = {"has_smart_meter": True, "discount_type": "fixed", "time_preference": None, "vendor": "none"}
+    first = catalogue_calculator.get_recommendation_message(user_prefs)
+    second = catalogue_calculator.get_recommendation_message(dict(user_prefs, time_preference="day"))
+    assert first is second
+    assert first == catalogue_calculator.format_recommendation(
+        catalogue_calculator.get_recommendation(user_prefs), user_prefs
+    )
+    assert catalogue_calculator.cache_info() == {"hits": 1, "misses": 1, "size": 1}
+
+def test_recommendation_message_cache_stores_misses_as_none(catalogue_calculator):
+    user_prefs = {"has_smart_meter": True, "discount_type": "variable", "time_preference": "night", "vendor": "amisragaz"}
+    assert catalogue_calculator.get_recommendation_message(user_prefs) is None
+    assert catalogue_calculator.get_recommendation_message(user_prefs) is None
+    assert catalogue_calculator.cache_info()["hits"] == 1
+
+def test_set_providers_invalidates_message_cache(catalogue_calculator):
+    user_prefs = {"has_smart_meter": False, "discount_type": "fixed", "time_preference": None, "vendor": "none"}
+    assert "PazGaz" in catalogue_calculator.get_recommendation_message(user_prefs)
+
+    catalogue_calculator.set_providers([Provider({
+        "name": "Mega", "vendor": "Electra", "discount_pct": 30, "hours": None, "requires_smart_meter": False
+    })])
+    assert catalogue_calculator.cache_info()["size"] == 0
+    assert "Electra - Mega" in catalogue_calculator.get_recommendation_message(user_prefs)
+
+def test_format_recommendation_compares_against_eligible_plans(catalogue_calculator):
+    user_prefs = {"has_smart_meter": False, "discount_type": "fixed", "time_preference": None, "vendor": "none"}
+    provider = catalogue_calculator.get_recommendation(user_prefs)
+    recommendation = catalogue_calculator.format_recommendation(provider, user_prefs)
+    # The 9 eligible all-day plans average 6.28%, and 8 of them have a lower discount than 10%
+    assert "ב-3.7%" in recommendation
+    assert "טובה יותר מ-89%" in recommendation
+
+def test_windowed_recommendation_is_compared_on_its_overlap_score(catalogue_calculator):
+    user_prefs = {"has_smart_meter": True, "discount_type": "variable", "time_preference": "evening", "vendor": "none"}
+    provider = catalogue_calculator.get_recommendation(user_prefs)
+    # Hi-Tech's 10% is below Family Savings' 18%, but covers all of the evening against half of it (9 points)
+    assert (provider.name, provider.discount_pct) == ("Hi-Tech", 10)
+    recommendation = catalogue_calculator.format_recommendation(provider, user_prefs, "en")
+    assert "- Discount 0.5% above the average\n- Better than 50% of the plans" in recommendation
+    family = next(p for p in catalogue_calculator.providers if p.name == "Family Savings")
+    recommendation = catalogue_calculator.format_recommendation(family, user_prefs, "en")
+    assert "- Discount 0.5% below the average\n- Better than 0% of the plans" in recommendation
+
+def test_add_provider_updates_index_and_stats(catalogue_calculator):
+    user_prefs = {"has_smart_meter": False, "discount_type": "fixed", "time_preference": None, "vendor": "hot"}
+    catalogue_calculator.get_recommendation_message(user_prefs)
+
+    provider = Provider({
+        "name": "Hot Plus", "vendor": "HOT", "discount_pct": 12, "hours": None, "requires_smart_meter": False
+    })
+    catalogue_calculator.add_provider(provider)
+    assert catalogue_calculator.get_recommendation(user_prefs) is provider
+    assert catalogue_calculator.stats.rank(provider) == 11
+    assert catalogue_calculator.cache_info()["size"] == 0
+    assert "טובה יותר מ-100%" not in catalogue_calculator.get_recommendation_message(user_prefs)
+
+@pytest.mark.parametrize("has_smart_meter", [True, False])
+@pytest.mark.parametrize("discount_type, time_preference", [("fixed", None), ("variable", "day"), ("variable", "evening"), ("variable", "night")])
+@pytest.mark.parametrize("vendor", ["hot", "amisragaz", "none"])
+def test_narrowing_answer_by_answer_matches_lookup(catalogue_calculator, has_smart_meter,
+                                                   discount_type, time_preference, vendor):
+    answers = (("has_smart_meter", has_smart_meter), ("discount_type", discount_type))
+    if time_preference:
+        answers += (("time_preference", time_preference),)
+    answers += (("vendor", vendor),)
+    user_prefs = dict(answers, time_preference=time_preference)
+    catalogue = catalogue_calculator.catalogue
+
+    _, best = catalogue.narrow(answers)
+    assert best is catalogue_calculator.get_recommendation(user_prefs)
+    # Every shorter answer sequence was narrowed on the way, each a subset of the one before
+    for length in range(len(answers)):
+        narrower, wider = catalogue.narrowed[answers[:length + 1]][0], catalogue.narrowed[answers[:length]][0]
+        assert narrower & ~wider == 0
+
+def test_settled_answer(catalogue_calculator):
+    values = ("fixed", "variable")
+    # Without a smart meter only fixed-discount plans remain
+    assert catalogue_calculator.settled_answer("discount_type", values, (("has_smart_meter", False),)) == (True, "fixed")
+    assert catalogue_calculator.settled_answer("discount_type", values, (("has_smart_meter", True),)) == (False, None)
+    # Fields that don't affect plans are never settled
+    assert catalogue_calculator.settled_answer("monthly_kwh", ("low", "high"), ()) == (False, None)
+
+def test_add_provider_clears_narrowing_cache(catalogue_calculator):
+    catalogue_calculator.catalogue.narrow((("vendor", "hot"),))
+    catalogue_calculator.add_provider(Provider({
+        "name": "Super", "vendor": "HOT", "discount_pct": 30, "hours": None, "requires_smart_meter": False
+    }))
+    assert catalogue_calculator.catalogue.narrow((("vendor", "hot"),))[1].name == "Super"
+
+def test_snapshot_round_trip(calculator, tmp_path):
+    providers_file = calculator.catalogue.source
+    snapshot_file = tmp_path / "providers.snapshot"
+    first = ProviderCalculator(providers_file, snapshot_file=snapshot_file)
+    assert snapshot_file.exists()
+    second = ProviderCalculator(providers_file, snapshot_file=snapshot_file)
+    assert [str(p) for p in second.providers] == [str(p) for p in first.providers]
+    prefs = {"has_smart_meter": True, "discount_type": "fixed", "time_preference": None, "vendor": "none"}
+    assert second.get_recommendation(prefs).name == first.get_recommendation(prefs).name
+    assert second.stats.overall.count == first.stats.overall.count
+
+def test_stale_or_corrupt_snapshot_is_rebuilt(calculator, tmp_path):
+    import json, os
+    providers_file = calculator.catalogue.source
+    snapshot_file = tmp_path / "providers.snapshot"
+    Catalogue.load(providers_file, snapshot_file)
+    assert Catalogue.load_snapshot(snapshot_file, providers_file) is not None
+
+    with open(providers_file, 'w') as f:
+        json.dump({"providers": [{"name": "Only", "vendor": "HOT", "discount_pct": 5,
+                                  "hours": None, "requires_smart_meter": False}]}, f)
+    os.utime(providers_file, ns=(0, 0))
+    assert Catalogue.load_snapshot(snapshot_file, providers_file) is None
+    assert [p.name for p in Catalogue.load(providers_file, snapshot_file).providers] == ["Only"]
+    assert Catalogue.load_snapshot(snapshot_file, providers_file) is not None
+
+    snapshot_file.write_bytes(b"not a pickle")
+    assert [p.name for p in Catalogue.load(providers_file, snapshot_file).providers] == ["Only"]
+
+NIGHT_PREFS = {"has_smart_meter": True, "discount_type": "variable", "time_preference": "night", "vendor": "none"}
+
+@pytest.mark.parametrize("has_smart_meter", [True, False])
+@pytest.mark.parametrize("discount_type,time_preference", [
+    ("fixed", None), ("variable", "day"), ("variable", "evening"), ("variable", "night")
+])
+@pytest.mark.parametrize("vendor", ["none", "hot", "electra"])
+def test_top_recommendations_match_stable_sort(catalogue_calculator, has_smart_meter,
+                                               discount_type, time_preference, vendor):
+    user_prefs = {
+        "has_smart_meter": has_smart_meter,
+        "discount_type": discount_type,
+        "time_preference": time_preference,
+        "vendor": vendor
+    }
+    expected = _scan_sorted(catalogue_calculator.providers, user_prefs)
+    top = catalogue_calculator.get_top_recommendations(user_prefs, k=5)
+    assert top == expected[:5]
+    if expected:
+        assert top[0] is catalogue_calculator.get_recommendation(user_prefs)
+
+def test_top_recommendations_page_through_cached_ranking(catalogue_calculator):
+    pages = [catalogue_calculator.get_top_recommendations(NIGHT_PREFS, k=2, offset=offset) for offset in (0, 2, 4)]
+    full = catalogue_calculator.get_top_recommendations(NIGHT_PREFS, k=100)
+    assert [p for page in pages for p in page] == full[:6]
+    # Ties at 20% keep catalogue order
+    assert [(p.vendor, p.name) for p in full[:2]] == [("Bezeq", "Night"), ("Cellcom", "Night")]
+    assert catalogue_calculator.get_top_recommendations(NIGHT_PREFS, k=3, offset=len(full)) == []
+
+def test_top_recommendations_with_custom_ranking(catalogue_calculator):
+    eligible = _scan_eligible(catalogue_calculator.providers, NIGHT_PREFS)
+    ranking = Ranking(("vendor", "smart_meter", "discount"), preferred_vendors=("Electra",))
+    top = catalogue_calculator.get_top_recommendations(NIGHT_PREFS, k=len(eligible), ranking=ranking)
+    key = ranking.sort_key((23, 7))
+    assert top == sorted(eligible, key=key)
+    assert top[0].vendor == "Electra"
+    with pytest.raises(ValueError):
+        Ranking(("price",)).sort_key()
+
+def test_format_ranking_numbers_from_offset(catalogue_calculator):
+    lines = catalogue_calculator.format_ranking(catalogue_calculator.get_top_recommendations(NIGHT_PREFS, 2, 3), 3)
+    assert [line.split(".")[0] for line in lines.split("\n")] == ["4", "5"]
+
+def test_add_provider_clears_ranking_cache(catalogue_calculator):
+    catalogue_calculator.get_top_recommendations(NIGHT_PREFS, k=3)
+    catalogue_calculator.add_provider(Provider({
+        "name": "Owl", "vendor": "HOT", "discount_pct": 40, "hours": [23, 7], "requires_smart_meter": True
+    }))
+    assert catalogue_calculator.get_top_recommendations(NIGHT_PREFS, k=1)[0].name == "Owl"
+
+def test_vendor_preference_by_name_translation_or_id(catalogue_calculator):
+    from src.core.registry import VENDORS
+    prefs = dict(NIGHT_PREFS)
+    results = []
+    for vendor in ("hot", "HOT", "הוט", VENDORS.lookup("HOT")):
+        prefs["vendor"] = vendor
+        results.append(catalogue_calculator.get_recommendation(prefs))
+    assert results[0].vendor == "HOT" and all(result is results[0] for result in results)
+    prefs["vendor"] = "No Such Vendor"
+    assert catalogue_calculator.get_recommendation(prefs) is None
+    assert catalogue_calculator.get_top_recommendations(prefs) == []
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import threading
+import pytest
+from src.core.calculator import ProviderCalculator
+from src.core.catalogue_watcher import CatalogueWatcher
+from src.utils.metrics import Metrics
+
+NIGHT_PREFS = {"has_smart_meter": True, "discount_type": "variable", "time_preference": "night", "vendor": "none"}
+
+def _catalogue(vendor, discount_pct):
+    return {"providers": [
+        {"name": "Night", "vendor": vendor, "discount_pct": discount_pct, "hours": [23, 7], "requires_smart_meter": True},
+        {"name": "Fixed", "vendor": vendor, "discount_pct": 5, "hours": None, "requires_smart_meter": False}
+    ]}
+
+def _write(path, data, bump):
+    path.write_text(json.dumps(data))
+    # Force a distinct mtime even on filesystems with coarse timestamps
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump * 1_000_000_000))
+
+@pytest.fixture
+def providers_file(tmp_path):
+    path = tmp_path / "providers.json"
+    _write(path, _catalogue("Bezeq", 20), 0)
+    return path
+
+@pytest.fixture
+def calculator(providers_file):
+    return ProviderCalculator(str(providers_file))
+
+def test_check_reloads_changed_file(calculator, providers_file):
+    metrics = Metrics()
+    watcher = CatalogueWatcher(calculator, providers_file, metrics=metrics)
+    assert not watcher.check()
+
+    calculator.get_recommendation_message(NIGHT_PREFS)
+    _write(providers_file, _catalogue("HOT", 25), 1)
+    assert watcher.check()
+    assert calculator.get_recommendation(NIGHT_PREFS).vendor == "HOT"
+    assert calculator.cache_info()["size"] == 0
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["catalogue_reloads"] == 1
+    assert snapshot["gauges"]["catalogue_plans"] == 2
+    assert snapshot["timings"]["catalogue_reload_seconds"]["count"] == 1
+
+def test_invalid_file_keeps_current_catalogue(calculator, providers_file):
+    metrics = Metrics()
+    watcher = CatalogueWatcher(calculator, providers_file, metrics=metrics)
+    bad = _catalogue("HOT", 25)
+    bad["providers"][0]["discount_pct"] = 250
+    _write(providers_file, bad, 1)
+
+    assert not watcher.check()
+    assert calculator.get_recommendation(NIGHT_PREFS).vendor == "Bezeq"
+    assert metrics.snapshot()["counters"]["catalogue_reload_failures"] == 1
+    # The same broken file is not retried on every poll
+    assert not watcher.changed()
+
+def test_recommendations_stay_consistent_during_reloads(calculator, providers_file):
+    watcher = CatalogueWatcher(calculator, providers_file, metrics=Metrics())
+    initial_message = calculator.get_recommendation_message(NIGHT_PREFS)
+    stop = threading.Event()
+    errors = []
+
+    def hammer():
+        try:
+            while not stop.is_set():
+                provider = calculator.get_recommendation(NIGHT_PREFS)
+                assert (provider.vendor, provider.discount_pct) in {("Bezeq", 20), ("HOT", 25)}
+                message = calculator.get_recommendation_message(NIGHT_PREFS)
+                assert "Bezeq - Night" in message or "HOT - Night" in message
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for i in range(1, 41):
+        _write(providers_file, _catalogue("HOT", 25) if i % 2 else _catalogue("Bezeq", 20), i)
+        assert watcher.check()
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert calculator.get_recommendation_message(NIGHT_PREFS) == initial_message
+
+def test_run_polls_from_event_loop(calculator, providers_file):
+    watcher = CatalogueWatcher(calculator, providers_file, interval=0.01, metrics=Metrics())
+
+    async def scenario():
+        task = asyncio.create_task(watcher.run())
+        _write(providers_file, _catalogue("HOT", 25), 1)
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if calculator.get_recommendation(NIGHT_PREFS).vendor == "HOT":
+                break
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert calculator.get_recommendation(NIGHT_PREFS).vendor == "HOT"
@@ -0,0 +1,161 @@
+import pytest
+from src.core.calculator import Provider, ProviderCalculator
+from src.core.conversation import ConversationFlow, ConversationHandler, ConversationState, UserState
+from src.core.registry import VENDORS
+from src.core.state_store import MemoryStateStore
+
+HOT = VENDORS.lookup("HOT")
+
+@pytest.fixture
+def handler():
+    return ConversationHandler()
+
+def _complete(handler, user_id):
+    handler.get_next_question(user_id)
+    handler.process_answer(user_id, "כן")
+    handler.get_next_question(user_id)
+    handler.process_answer(user_id, "הנחה קבועה")
+    handler.get_next_question(user_id)
+    handler.process_answer(user_id, "הוט")
+    handler.get_next_question(user_id)
+
+def test_full_flow(handler):
+    _complete(handler, "1")
+    assert handler.is_conversation_complete("1")
+    data = handler.get_user_data("1")
+    assert (data.has_smart_meter, data.discount_type, data.vendor) == (True, "fixed", HOT)
+
+def test_read_only_calls_do_not_allocate(handler):
+    assert not handler.is_conversation_complete("ghost")
+    assert handler.get_user_data("ghost") is None
+    assert handler.process_answer("ghost", "כן") is None
+    assert len(handler.store) == 0
+
+def test_expired_conversation_restarts():
+    store = MemoryStateStore(ttl=10)
+    now = [0.0]
+    store.clock = lambda: now[0]
+    handler = ConversationHandler(store)
+    handler.get_next_question("1")
+    now[0] = 11
+    assert handler.get_user_state("1").state == ConversationState.INITIAL
+
+def test_callback_codes_are_decoded(handler):
+    handler.get_next_question("1")
+    # Vendor codes follow the registry ids: AmisraGaz is the fifth vendor in name_mapping.json
+    for code in ["m1", "d2", "t2", "v5"]:
+        assert handler.process_answer("1", code) is None
+        handler.get_next_question("1")
+    data = handler.get_user_data("1")
+    assert (data.has_smart_meter, data.discount_type, data.time_preference, data.vendor) == (
+        True, "variable", "night", VENDORS.lookup("amisragaz")
+    )
+
+def test_typed_and_invalid_answers(handler):
+    handler.get_next_question("1")
+    assert handler.process_answer("1", "NO") is None
+    assert handler.get_user_state("1").has_smart_meter is False
+    assert handler.process_answer("1", "maybe") == "לא הבנתי. אנא בחר 'כן' או 'לא'."
+    handler.get_next_question("1")
+    # A button from another question is rejected, not recorded
+    assert handler.process_answer("1", "m1") == "אנא בחר אחת מהאפשרויות המוצגות."
+    assert handler.get_user_state("1").vendor is None
+
+def _flow(steps, start="ASKING_SMART_METER"):
+    return ConversationFlow({"start": start, "invalid_answer": "?", "steps": steps})
+
+def _step(state, field, values, next_state, **extra):
+    choices = [[{"code": f"{field}{i}", "label": str(value), "value": value} for i, value in enumerate(values)]]
+    return dict(state=state, prompt=f"{field}?", field=field, choices=choices, next=next_state, **extra)
+
+def test_flow_is_data():
+    # A different flow, including a question recording a new field, needs no code changes
+    flow = _flow([
+        _step("ASKING_SMART_METER", "has_smart_meter", [True, False], "ASKING_VENDOR",
+              branches=[{"when": False, "next": "COMPLETED"}]),
+        _step("ASKING_VENDOR", "monthly_kwh", ["low", "high"], "COMPLETED"),
+    ])
+    handler = ConversationHandler(flow=flow)
+    assert handler.get_next_question("1") == ("has_smart_meter?", [["True", "False"]])
+    handler.process_answer("1", "has_smart_meter0")
+    assert handler.get_next_question("1") == ("monthly_kwh?", [["low", "high"]])
+    assert handler.process_answer("1", "other") == "?"
+    handler.process_answer("1", "monthly_kwh1")
+    assert handler.get_next_question("1") == (None, None)
+    data = handler.get_user_data("1")
+    assert data.monthly_kwh == "high"
+    assert UserState.from_dict(data.to_dict()).monthly_kwh == "high"
+
+    handler.get_next_question("2")
+    handler.process_answer("2", "False")
+    assert handler.get_next_question("2") == (None, None)
+
+def test_invalid_flows_are_rejected():
+    with pytest.raises(ValueError, match="ASKING_VENDOR"):
+        _flow([_step("ASKING_SMART_METER", "has_smart_meter", [True], "ASKING_VENDOR")])
+    with pytest.raises(ValueError, match="Unknown conversation state"):
+        _flow([_step("ASKING_KWH", "kwh", [1], "COMPLETED")])
+    with pytest.raises(ValueError, match="missing"):
+        ConversationFlow({"start": "COMPLETED", "steps": []})
+
+@pytest.fixture
+def narrowing_handler():
+    return ConversationHandler(calculator=ProviderCalculator())
+
+def test_questions_that_cannot_change_the_result_are_skipped(narrowing_handler):
+    handler = narrowing_handler
+    handler.get_next_question("1")
+    handler.process_answer("1", "לא")
+    # Without a smart meter every plan has a fixed discount, so that question is skipped
+    question, _ = handler.get_next_question("1")
+    assert question == "האם אתם לקוחות של אחת מהחברות הבאות?"
+    assert handler.get_user_state("1").discount_type == "fixed"
+    handler.process_answer("1", "v0")
+    assert handler.get_next_question("1") == (None, None)
+    assert handler.preview("1").name == "Yellow Accumulation"
+
+def test_vendor_question_skipped_when_one_vendor_remains(narrowing_handler):
+    handler = narrowing_handler
+    handler.calculator.set_providers([
+        Provider({"name": "Day", "vendor": "HOT", "discount_pct": 15, "hours": [7, 17], "requires_smart_meter": True}),
+        Provider({"name": "Fixed", "vendor": "HOT", "discount_pct": 5, "hours": None, "requires_smart_meter": False}),
+        Provider({"name": "Fixed", "vendor": "Bezeq", "discount_pct": 6, "hours": None, "requires_smart_meter": False}),
+    ])
+    for answer in ["m1", "d2"]:
+        handler.get_next_question("1")
+        handler.process_answer("1", answer)
+    # Only HOT offers a time-of-day discount; with a single day plan the time question is settled too
+    assert handler.get_next_question("1") == (None, None)
+    data = handler.get_user_data("1")
+    assert (data.time_preference, data.vendor) == ("day", HOT)
+    assert handler.preview("1").name == "Day"
+
+def test_question_is_asked_when_answers_leave_different_plans(narrowing_handler):
+    handler = narrowing_handler
+    handler.calculator.set_providers([
+        Provider({"name": "Fixed", "vendor": "HOT", "discount_pct": 30, "hours": None, "requires_smart_meter": False}),
+        Provider({"name": "Night", "vendor": "HOT", "discount_pct": 20, "hours": [23, 7], "requires_smart_meter": True}),
+        Provider({"name": "Night", "vendor": "Bezeq", "discount_pct": 10, "hours": [23, 7],
+                  "requires_smart_meter": False}),
+    ])
+    # Either meter answer leads to the fixed 30% plan, but not to the same night plans
+    assert handler.get_next_question("1")[0] == "האם יש לכם שעון חכם?"
+    for answer in ["m0", "d2"]:
+        handler.process_answer("1", answer)
+        handler.get_next_question("1")
+    assert handler.get_user_state("1").has_smart_meter is False
+    assert handler.preview("1").discount_pct == 10
+
+def test_without_calculator_every_question_is_asked(handler):
+    handler.get_next_question("1")
+    handler.process_answer("1", "לא")
+    assert handler.get_next_question("1")[0] == "איזה סוג הנחה אתם מעדיפים?"
+    assert handler.preview("1") is None
+
+def test_vendor_question_is_generated_from_vendors():
+    bezeq, hot = VENDORS.lookup("Bezeq"), VENDORS.lookup("HOT")
+    flow = ConversationFlow.from_file(vendors=[bezeq, hot])
+    step = flow.steps[ConversationState.ASKING_VENDOR]
+    assert step.buttons == [["בזק", "הוט"], ["אף אחד מהם"]]
+    assert step.values == (bezeq, hot, "none")
+    assert step.decode(f"v{hot + 1}") == hot
@@ -0,0 +1,47 @@
+import itertools
+import pytest
+from benchmarks.bench_messages import legacy_format_recommendation
+from src.core.calculator import Provider, ProviderCalculator
+from src.core.message_templates import DEFAULT_LOCALE, plan_fragments
+
+@pytest.fixture
+def calculator():
+    return ProviderCalculator()
+
+PREFERENCES = [
+    {"has_smart_meter": has_smart_meter, "discount_type": discount_type,
+     "time_preference": time_preference, "vendor": vendor}
+    for has_smart_meter, (discount_type, time_preference), vendor in itertools.product(
+        [True, False], [("fixed", None), ("variable", "day"), ("variable", "evening"), ("variable", "night")], ["none", "hot", "amisragaz"]
+    )
+]
+
+def test_fragments_are_rendered_for_every_plan(calculator):
+    fragments = calculator.catalogue.fragments[DEFAULT_LOCALE]
+    assert set(fragments) == set(calculator.providers)
+
+@pytest.mark.parametrize("user_prefs", PREFERENCES)
+def test_messages_are_byte_identical_to_the_formatter(calculator, user_prefs):
+    # Every plan, not just the recommended one, against the user's segment
+    for provider in calculator.providers:
+        expected = legacy_format_recommendation(calculator, provider, user_prefs)
+        assert calculator.format_recommendation(provider, user_prefs).encode() == expected.encode()
+
+def test_added_and_outside_plans_are_formatted(calculator):
+    user_prefs = PREFERENCES[0]
+    provider = Provider({
+        "name": "New", "vendor": "HOT", "discount_pct": 12.5, "hours": [23, 7], "requires_smart_meter": True
+    })
+    outside = calculator.format_recommendation(provider, user_prefs)
+    assert outside == legacy_format_recommendation(calculator, provider, user_prefs)
+    calculator.add_provider(provider)
+    assert calculator.catalogue.fragments[DEFAULT_LOCALE][provider] == plan_fragments(provider)
+    assert calculator.format_recommendation(provider, user_prefs) == \
+        legacy_format_recommendation(calculator, provider, user_prefs)
+
+def test_fragments_survive_snapshots(calculator, tmp_path):
+    snapshot = tmp_path / "providers.snapshot"
+    ProviderCalculator(calculator.catalogue.source, snapshot_file=snapshot)
+    loaded = ProviderCalculator(calculator.catalogue.source, snapshot_file=snapshot)
+    provider = loaded.providers[0]
+    assert loaded.catalogue.fragments[DEFAULT_LOCALE][provider] == plan_fragments(provider)
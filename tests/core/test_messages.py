@@ -0,0 +1,103 @@
+import sys
+import pytest
+from src.core.calculator import ProviderCalculator
+from src.core.conversation import ConversationHandler, UserState
+from src.core.messages import DEFAULT_LOCALE, MESSAGES, MessageCatalogue
+
+USER_PREFS = {"has_smart_meter": True, "discount_type": "variable", "time_preference": "night", "vendor": "none"}
+
+def test_every_locale_has_every_message():
+    assert set(MESSAGES.locales) == {"he", "en", "ar", "ru"}
+    keys = set(MESSAGES.texts(DEFAULT_LOCALE))
+    for locale in MESSAGES.locales:
+        assert set(MESSAGES.texts(locale)) == keys
+        assert set(MESSAGES.flows.get(locale, {}).get("steps", {})) <= {
+            "ASKING_SMART_METER", "ASKING_DISCOUNT_TYPE", "ASKING_TIME_PREFERENCE", "ASKING_VENDOR"
+        }
+
+def test_messages_are_interned_and_fall_back_to_the_default_locale():
+    catalogue = MessageCatalogue({"default": "he", "locales": {
+        "he": {"messages": {"hello": "שלום", "bye": "ביי"}},
+        "en": {"messages": {"hello": "".join(["Hel", "lo"])}},
+    }})
+    assert catalogue.text("hello", "en") is sys.intern("Hello")
+    assert catalogue.text("bye", "en") == "ביי"
+    assert catalogue.text("hello", "fr") == "שלום"
+    with pytest.raises(ValueError):
+        MessageCatalogue({"default": "he", "locales": {}})
+
+def test_compiled_messages_take_fields_positionally_in_any_order():
+    catalogue = MessageCatalogue({"default": "he", "locales": {
+        "he": {"messages": {"score": "{a:.1f} / {b}"}},
+        "en": {"messages": {"score": "{{{b}}} then {a!r}"}},
+    }})
+    formatters = catalogue.compile("score", ("a", "b"))
+    assert formatters["he"](1.25, "x") == catalogue.format("score", "he", a=1.25, b="x") == "1.2 / x"
+    assert formatters["en"](1.25, "x") == "{x} then 1.25"
+    with pytest.raises(ValueError):
+        catalogue.compile("score", ("a",))
+
+@pytest.mark.parametrize("language_code, locale", [
+    (None, "he"), ("en", "en"), ("en-US", "en"), ("ru_RU", "ru"), ("AR", "ar"), ("fr", "he")
+])
+def test_language_codes_map_to_locales(language_code, locale):
+    assert MESSAGES.locale(language_code) == locale
+
+def test_recommendations_are_cached_per_locale():
+    calculator = ProviderCalculator()
+    hebrew = calculator.get_recommendation_message(USER_PREFS)
+    english = calculator.get_recommendation_message(USER_PREFS, "en")
+    assert hebrew.startswith("✅ *הספק המומלץ: ")
+    assert english.startswith("✅ *Recommended provider: Bezeq - Night*\n\n📊 *Plan details:*\n- Discount: 20%")
+    assert "\n- Hours: 23:00-7:00\n- Requires a smart meter: Yes\n" in english
+    assert english.endswith("\n- Shift your electricity use to the discount hours")
+    assert calculator.get_recommendation_message(USER_PREFS, "en") is english
+    assert calculator.cache_info()["size"] == 2
+    fixed = next(provider for provider in calculator.providers if provider.hours is None)
+    assert calculator.format_ranking([fixed], locale="ru").endswith("%, Весь день)")
+
+def test_other_locales_are_rendered_on_first_use_and_not_snapshotted(tmp_path):
+    calculator = ProviderCalculator()
+    assert set(calculator.catalogue.fragments) == {DEFAULT_LOCALE}
+    calculator.format_recommendation(calculator.providers[0], USER_PREFS, "ar")
+    assert set(calculator.catalogue.fragments) == {DEFAULT_LOCALE, "ar"}
+    assert len(calculator.catalogue.fragments["ar"]) == len(calculator.providers)
+    # Unsupported locales share the default locale's fragments
+    assert calculator.catalogue.locale_fragments("xx") is calculator.catalogue.fragments[DEFAULT_LOCALE]
+
+    snapshot = tmp_path / "providers.snapshot"
+    calculator.catalogue.save_snapshot(snapshot)
+    loaded = calculator.catalogue.load_snapshot(snapshot, calculator.catalogue.source)
+    assert set(loaded.fragments) == {DEFAULT_LOCALE}
+
+def test_snapshot_fragments_are_rerendered_when_messages_change(tmp_path):
+    calculator = ProviderCalculator()
+    provider = calculator.providers[0]
+    calculator.catalogue.fragments[DEFAULT_LOCALE][provider] = ("stale", "stale")
+    calculator.catalogue.templates = "older"
+    snapshot = tmp_path / "providers.snapshot"
+    calculator.catalogue.save_snapshot(snapshot)
+    loaded = calculator.catalogue.load_snapshot(snapshot, calculator.catalogue.source)
+    assert loaded.templates == MESSAGES.checksum
+    assert loaded.fragments[DEFAULT_LOCALE][loaded.providers[0]] != ("stale", "stale")
+
+def test_conversation_is_asked_in_the_users_locale():
+    handler = ConversationHandler()
+    handler.reset_conversation("1", "en")
+    assert handler.get_next_question("1") == ("Do you have a smart meter?", [["Yes", "No"]])
+    assert handler.process_answer("1", "maybe") == "I didn't understand. Please choose 'Yes' or 'No'."
+    # Labels of the default locale and typed aliases are still understood
+    assert handler.process_answer("1", "כן") is None
+    assert handler.get_next_question("1")[0] == "Which type of discount do you prefer?"
+
+    handler.reset_conversation("1")
+    assert handler.get_locale("1") == "en"
+    handler.set_locale("1", "ru")
+    assert handler.get_next_question("1")[0] == "У вас есть умный счётчик?"
+    assert handler.get_locale("2", "ar-EG") == "ar"
+
+def test_locale_survives_serialisation():
+    state = UserState()
+    state.locale = "ar"
+    assert UserState.from_dict(state.to_dict()).locale == "ar"
+    assert UserState.from_dict({"state": "INITIAL"}).locale == DEFAULT_LOCALE
@@ -0,0 +1,103 @@
+import csv
+import io
+from datetime import datetime
+import numpy as np
+import pytest
+from src.core.meter_data import HourlyAccumulator, MeterStore, ReadingParser, ingest
+from src.core.savings import fold_profile
+
+EXPORT = (
+    "שם לקוח,ישראל ישראלי\n"
+    "מספר מונה,12345678\n"
+    "\n"
+    'תאריך,מועד תחילת הפעימה,"צריכה בקוט""ש"\n'
+    "31/12/2024,23:00,0.5\n"
+    "31/12/2024,23:15,0.25\n"
+    "01/01/2025,00:45,1.0\n"
+    "\n"
+    "01/01/2025,01:00,\n"
+    "01/01/2025,23:45,2.0\n"
+)
+
+def _profile(text, chunk_rows=2):
+    parser = ReadingParser()
+    accumulator = HourlyAccumulator()
+    for hours, kwh in parser.chunks(csv.reader(io.StringIO(text)), chunk_rows):
+        accumulator.add(hours, kwh)
+    return parser, accumulator.profile()
+
+def test_readings_are_summed_per_hour():
+    parser, (origin, profile, missing) = _profile(EXPORT)
+    assert parser.rows == 4
+    assert profile.dtype == np.float32
+    assert len(profile) == 48
+    assert profile[23] == pytest.approx(0.75)
+    assert profile[24] == pytest.approx(1.0)
+    assert profile[47] == pytest.approx(2.0)
+    assert missing == 45
+
+def test_chunking_and_order_do_not_change_the_profile():
+    rows = EXPORT.splitlines(keepends=True)
+    shuffled = "".join(rows[:4] + rows[:3:-1])
+    _, (origin, expected, _) = _profile(EXPORT, chunk_rows=1000)
+    _, (shuffled_origin, profile, _) = _profile(shuffled, chunk_rows=1)
+    assert shuffled_origin == origin
+    assert np.array_equal(profile, expected)
+
+def test_combined_date_time_and_iso_dates():
+    _, (_, profile, _) = _profile("2025-01-01 07:15,1.5\n2025-01-01 07:30,0.5\n")
+    assert profile[7] == pytest.approx(2.0)
+
+def test_malformed_rows_are_reported():
+    with pytest.raises(ValueError, match="line 2"):
+        _profile("01/01/2025,00:00,1\n01/01/2025,00:15,lots\n")
+    with pytest.raises(ValueError):
+        _profile("01/01/2025,25:00,1\n")
+
+def test_ingest_stores_a_memory_mapped_profile(tmp_path):
+    export = tmp_path / "customer-1.csv"
+    export.write_text(EXPORT, encoding="utf-8")
+    store = MeterStore(tmp_path / "profiles")
+    report = ingest(export, store, chunk_rows=2)
+    assert (report.customer, report.rows, report.hours) == ("customer-1", 4, 48)
+    assert report.start == datetime(2024, 12, 31)
+
+    start, profile = store.load("customer-1")
+    assert start == report.start
+    assert isinstance(profile, np.memmap)
+    assert fold_profile(profile)[23] == pytest.approx(2.75)
+    assert store.customers() == ["customer-1"]
+
+def test_store_keeps_each_start_next_to_its_profile(tmp_path):
+    store = MeterStore(tmp_path)
+    store.save("a", datetime(2025, 1, 1), np.ones(24))
+    store.save("b", datetime(2025, 2, 1), np.ones(48))
+    store.save("a", datetime(2025, 3, 1), np.zeros(24))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.json", "a.npy", "b.json", "b.npy"]
+    assert store.customers() == ["a", "b"]
+    start, profile = store.load("a")
+    assert start == datetime(2025, 3, 1) and not profile.any()
+    assert store.load("b")[0] == datetime(2025, 2, 1)
+    with pytest.raises(KeyError):
+        store.load("c")
+
+def test_year_series(tmp_path):
+    store = MeterStore(tmp_path)
+    profile = np.arange(2 * 8760, dtype=np.float32)
+    store.save("c", datetime(2025, 1, 1), profile)
+    # A whole stored year is a view of the file
+    year = store.year("c", 2026)
+    assert isinstance(year, np.memmap)
+    assert year[0] == 8760 and len(year) == 8760
+    # A partly covered year is padded with zeros
+    leap = store.year("c", 2024)
+    assert len(leap) == 8784 and not leap.any()
+
+def test_invalid_customer_and_empty_export(tmp_path):
+    store = MeterStore(tmp_path)
+    with pytest.raises(ValueError):
+        store.path("../escape")
+    export = tmp_path / "empty.csv"
+    export.write_text("שם לקוח,ישראל ישראלי\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="No meter readings"):
+        ingest(export, store)
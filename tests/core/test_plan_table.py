@@ -0,0 +1,76 @@
+import itertools
+import numpy as np
+import pytest
+from src.core.calculator import Provider, ProviderCalculator
+from src.core.plan_table import ALL_DAY, PlanTable
+from src.core.registry import VENDORS
+
+def _key(provider):
+    if provider is None:
+        return None
+    return (provider.vendor, provider.name, provider.hours,
+            provider.requires_smart_meter, float(provider.discount_pct))
+
+@pytest.fixture
+def calculator():
+    return ProviderCalculator()
+
+def test_provider_uses_slots_and_tuple_hours():
+    provider = Provider({
+        "name": "Night", "vendor": "HOT", "discount_pct": 20, "hours": [23, 7], "requires_smart_meter": True
+    })
+    assert provider.hours == (23, 7)
+    assert not hasattr(provider, "__dict__")
+    with pytest.raises(AttributeError):
+        provider.extra = 1
+
+def test_table_columns(calculator):
+    table = calculator.catalogue.table
+    assert len(table) == len(calculator.providers)
+    assert table.start_hour.dtype == np.int8
+    assert table.start_hour[0] == ALL_DAY
+    assert VENDORS.name(table.vendor_id[0]) == "PazGaz"
+    assert table.nbytes == len(table) * (8 + 1 + 1 + 1 + 4 + 4)
+
+def test_provider_round_trip(calculator):
+    table = PlanTable({"name": p.name, "vendor": p.vendor, "discount_pct": p.discount_pct, "hours": p.hours,
+                       "requires_smart_meter": p.requires_smart_meter} for p in calculator.providers)
+    for i, original in enumerate(calculator.providers):
+        assert _key(table.provider(i)) == _key(original)
+
+def test_discounts_are_stored_losslessly():
+    table = PlanTable([{"name": "Odd", "vendor": "HOT", "discount_pct": 6.1, "hours": None,
+                        "requires_smart_meter": False}])
+    assert table.provider(0).discount_pct == 6.1
+
+def test_catalogue_table_rows_are_the_catalogue_plans(calculator):
+    table = calculator.catalogue.table
+    assert all(table.provider(i) is provider for i, provider in enumerate(calculator.providers))
+    user_prefs = {"has_smart_meter": True, "discount_type": "variable", "time_preference": "night", "vendor": "none"}
+    assert table.get_recommendation(user_prefs) is calculator.get_recommendation(user_prefs)
+
+@pytest.mark.parametrize("has_smart_meter,discount_type,time_preference,vendor", list(itertools.product(
+    [True, False], ["fixed", "variable"], ["day", "evening", "night"], ["none", "hot", "amisragaz", "unknown"]
+)))
+def test_table_recommendation_matches_index(calculator, has_smart_meter, discount_type, time_preference, vendor):
+    user_prefs = {
+        "has_smart_meter": has_smart_meter,
+        "discount_type": discount_type,
+        "time_preference": time_preference,
+        "vendor": vendor
+    }
+    expected = calculator.get_recommendation(user_prefs)
+    result = calculator.catalogue.table.get_recommendation(user_prefs)
+    assert _key(result) == _key(expected)
+
+def test_table_is_rebuilt_after_add(calculator):
+    table = calculator.catalogue.table
+    calculator.add_provider(Provider({
+        "name": "New", "vendor": "HOT", "discount_pct": 9, "hours": None, "requires_smart_meter": False
+    }))
+    assert calculator.catalogue.table is not table
+    assert len(calculator.catalogue.table) == len(calculator.providers)
+
+def test_best_of_empty_mask():
+    table = PlanTable([])
+    assert table.best(np.zeros(0, dtype=bool)) is None
@@ -0,0 +1,41 @@
+import threading
+from src.core.registry import NameRegistry, PACKAGES, VENDORS, load_registries
+
+def test_intern_is_case_insensitive_and_stable():
+    registry = NameRegistry({"HOT": "הוט"})
+    assert registry.intern("hot") == registry.intern("HOT") == 0
+    assert registry.intern("Bezeq") == 1
+    assert len(registry) == 2
+    assert registry.name(0) == "HOT"
+    assert registry.names() == ["HOT", "Bezeq"]
+
+def test_lookup_accepts_names_translations_and_ids():
+    registry = NameRegistry({"HOT": "הוט"})
+    assert registry.lookup("הוט") == registry.lookup("Hot") == registry.lookup(0) == 0
+    assert registry.lookup("Electra") is None
+    assert registry.lookup(5) is None
+    assert registry.translation(0) == "הוט"
+    assert registry.translation(registry.intern("Electra")) == "Electra"
+
+def test_concurrent_interning_gives_one_id_per_name():
+    registry = NameRegistry()
+    names = [f"Vendor {i % 50}" for i in range(2000)]
+    ids = {}
+
+    def intern_all(offset):
+        for name in names[offset::4]:
+            ids.setdefault(name, set()).add(registry.intern(name))
+
+    threads = [threading.Thread(target=intern_all, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(registry) == 50
+    assert all(len(found) == 1 for found in ids.values())
+
+def test_default_registries_follow_name_mapping():
+    vendors, packages = load_registries()
+    assert vendors.names()[:len(vendors)] == VENDORS.names()[:len(vendors)]
+    assert VENDORS.translation(VENDORS.lookup("AmisraGaz")) == "אמישראגז"
+    assert PACKAGES.lookup("חיות לילה") == PACKAGES.lookup("Nightlife")
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from src.core.calculator import Provider
+from src.core.savings import SavingsEngine, fold_profile, hours_mask
+from src.core.windows import window_overlap
+
+def _plan(name, discount_pct, hours, requires_smart_meter=True, vendor="Vendor"):
+    return Provider({
+        "name": name,
+        "vendor": vendor,
+        "discount_pct": discount_pct,
+        "hours": hours,
+        "requires_smart_meter": requires_smart_meter
+    })
+
+@pytest.fixture
+def engine():
+    return SavingsEngine([
+        _plan("Fixed", 6, None, requires_smart_meter=False, vendor="PazGaz"),
+        _plan("Day", 15, [7, 17], vendor="HOT"),
+        _plan("Night", 20, [23, 7], vendor="Bezeq"),
+    ], price_per_kwh=1.0)
+
+def test_hours_mask_regular_and_wrapping_windows():
+    assert list(np.flatnonzero(hours_mask([7, 17]))) == list(range(7, 17))
+    assert list(np.flatnonzero(hours_mask([23, 7]))) == [0, 1, 2, 3, 4, 5, 6, 23]
+    assert hours_mask(None).all()
+
+def test_window_overlap():
+    assert window_overlap([23, 7], [23, 7]) == 1.0
+    assert window_overlap([14, 20], [7, 17]) == pytest.approx(0.3)
+    assert window_overlap(None, [22, 2]) == 1.0
+    assert window_overlap([7, 17], [23, 7]) == 0.0
+
+def test_fold_profile_annual():
+    profile = np.tile(np.arange(24, dtype=float), 365)
+    assert np.allclose(fold_profile(profile), np.arange(24) * 365)
+
+def test_fold_profile_rejects_partial_days():
+    with pytest.raises(ValueError):
+        fold_profile(np.ones(25))
+
+def test_savings_flat_profile(engine):
+    savings = engine.savings(np.ones(24))
+    assert np.allclose(savings, [24 * 0.06, 10 * 0.15, 8 * 0.20])
+
+def test_rank_prefers_night_plan_for_night_consumption(engine):
+    profile = np.zeros(24)
+    profile[[0, 1, 2, 23]] = 2.0
+    ranked = engine.rank(profile)
+    assert [p.name for p, _ in ranked] == ["Night", "Fixed", "Day"]
+    assert ranked[0][1] == pytest.approx(8 * 0.20)
+
+def test_rank_respects_eligibility(engine):
+    ranked = engine.rank(np.ones(24), has_smart_meter=False)
+    assert [p.name for p, _ in ranked] == ["Fixed"]
+    ranked = engine.rank(np.ones(24), vendor="hot")
+    assert [p.name for p, _ in ranked] == ["Day"]
+
+def test_overlap_scores(engine):
+    assert np.allclose(engine.overlap_scores([7, 17]), [1.0, 1.0, 0.0])
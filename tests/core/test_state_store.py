@@ -0,0 +1,223 @@
+import socketserver
+import sqlite3
+import threading
+import time
+import pytest
+from src.core.conversation import ConversationHandler, ConversationState, UserState
+from src.core.state_store import (
+    MemoryStateStore, RedisError, RedisStateStore, SQLiteStateStore, create_state_store
+)
+from src.utils.metrics import Metrics
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Speaks enough of RESP2 for the state store: GET, SET [EX], DEL, SELECT, PING."""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        server = self.server
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            name = args[0].upper()
+            server.commands.append(args)
+            if name == b"GET":
+                value = server.data.get(args[1])
+                self.wfile.write(b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value))
+            elif name == b"SET":
+                server.data[args[1]] = args[2]
+                if len(args) > 4:
+                    server.expiry[args[1]] = int(args[4])
+                self.wfile.write(b"+OK\r\n")
+            elif name == b"DEL":
+                self.wfile.write(b":%d\r\n" % (server.data.pop(args[1], None) is not None))
+            elif name in (b"SELECT", b"PING"):
+                self.wfile.write(b"+OK\r\n")
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+@pytest.fixture
+def redis_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeRedisHandler)
+    server.daemon_threads = True
+    server.data = {}
+    server.expiry = {}
+    server.commands = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _state(step=ConversationState.ASKING_VENDOR):
+    state = UserState()
+    state.state = step
+    state.has_smart_meter = True
+    state.discount_type = "variable"
+    state.time_preference = "night"
+    return state
+
+def test_user_state_round_trip():
+    restored = UserState.from_dict(_state().to_dict())
+    assert restored.to_dict() == _state().to_dict()
+    assert restored.state == ConversationState.ASKING_VENDOR
+
+def test_memory_store_lru_eviction():
+    store = MemoryStateStore(max_size=2)
+    store.set("a", UserState())
+    store.set("b", UserState())
+    store.get("a")
+    store.set("c", UserState())
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert len(store) == 2
+
+def test_memory_store_idle_ttl():
+    clock = FakeClock()
+    store = MemoryStateStore(ttl=10, clock=clock)
+    store.set("a", UserState())
+    clock.now = 8
+    assert store.get("a") is not None
+    clock.now = 16
+    assert store.get("a") is not None
+    clock.now = 27
+    assert store.get("a") is None
+    assert len(store) == 0
+
+def test_sqlite_store_batches_writes(tmp_path):
+    path = str(tmp_path / "states.db")
+    store = SQLiteStateStore(path, batch_size=3, flush_interval=60)
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def persisted():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM user_states").fetchone()[0]
+
+    store.set("a", _state())
+    store.set("b", _state())
+    assert store.get("a").discount_type == "variable"
+    assert persisted() == 0
+
+    store.set("c", _state())
+    assert persisted() == 3
+
+    store.delete("a")
+    assert store.get("a") is None
+    store.close()
+    assert persisted() == 2
+
+def test_sqlite_store_flushes_after_interval(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "states.db"), batch_size=100, flush_interval=0.01)
+    store.set("a", _state())
+    store._timer.join()
+    assert store._load("a")["time_preference"] == "night"
+    store.close()
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / "states.db")
+    handler = ConversationHandler(SQLiteStateStore(path))
+    handler.get_next_question("42")
+    handler.process_answer("42", "כן")
+    handler.store.close()
+
+    handler = ConversationHandler(SQLiteStateStore(path))
+    state = handler.get_user_state("42")
+    assert state.state == ConversationState.ASKING_SMART_METER
+    assert state.has_smart_meter is True
+    handler.store.close()
+
+def test_redis_store_pipelines_batches(redis_server):
+    host, port = redis_server.server_address
+    store = RedisStateStore(host, port, db=1, ttl=3600, batch_size=2, flush_interval=60)
+    store.set("a", _state())
+    assert store.get("a").vendor is None
+    assert [c[0] for c in redis_server.commands] == [b"SELECT"]
+
+    store.set("b", _state())
+    assert redis_server.data[b"voltwiz:state:a"].startswith(b"{")
+    assert redis_server.expiry[b"voltwiz:state:b"] == 3600
+
+    store.delete("a")
+    store.flush()
+    assert b"voltwiz:state:a" not in redis_server.data
+    assert store.get("b").state == ConversationState.ASKING_VENDOR
+    assert store.get("missing") is None
+    store.close()
+
+def test_redis_error_reply(redis_server):
+    host, port = redis_server.server_address
+    store = RedisStateStore(host, port)
+    with pytest.raises(RedisError):
+        store._conn.execute("FLUSHALL")
+    store.close()
+
+def test_create_state_store(tmp_path, redis_server):
+    store = create_state_store("memory://?max_size=5&ttl=60")
+    assert isinstance(store, MemoryStateStore)
+    assert (store.max_size, store.ttl) == (5, 60.0)
+
+    store = create_state_store(f"sqlite:///{tmp_path}/states.db")
+    assert isinstance(store, SQLiteStateStore)
+    assert store.path == f"{tmp_path}/states.db"
+    store.close()
+
+    host, port = redis_server.server_address
+    store = create_state_store(f"redis://{host}:{port}/0")
+    assert isinstance(store, RedisStateStore)
+    store.close()
+
+    with pytest.raises(ValueError):
+        create_state_store("postgres://localhost")
+
+def test_memory_store_sweep_publishes_metrics():
+    clock = FakeClock()
+    metrics = Metrics()
+    store = MemoryStateStore(ttl=10, clock=clock, metrics=metrics)
+    for i in range(5):
+        clock.now = i
+        store.set(str(i), UserState())
+    clock.now = 11.5
+    assert store.sweep() == 2
+    assert len(store) == 3
+
+    snapshot = metrics.snapshot()
+    assert snapshot["gauges"]["live_sessions"] == 3
+    assert snapshot["counters"]["session_evictions_ttl"] == 2
+
+def test_memory_store_counts_lru_evictions():
+    metrics = Metrics()
+    store = MemoryStateStore(max_size=100, metrics=metrics)
+    for i in range(150):
+        store.set(str(i), UserState())
+    assert len(store) == 100
+    assert metrics.snapshot()["counters"]["session_evictions_lru"] == 50
+
+def test_memory_store_background_sweeper():
+    clock = FakeClock()
+    store = MemoryStateStore(ttl=10, clock=clock, metrics=Metrics())
+    store.set("a", UserState())
+    clock.now = 11
+    store.start_sweeper(interval=0.01)
+    for _ in range(100):
+        if not len(store):
+            break
+        time.sleep(0.01)
+    store.close()
+    assert len(store) == 0
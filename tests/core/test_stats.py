@@ -0,0 +1,76 @@
+import pytest
+from src.core.calculator import Provider
+from src.core.registry import VENDORS
+from src.core.stats import CatalogueStats, SegmentStats, preference_keys, preference_score
+
+HOT = VENDORS.lookup("hot")
+
+def _plan(vendor, discount_pct, hours=None, requires_smart_meter=False):
+    return Provider({
+        "name": "Plan",
+        "vendor": vendor,
+        "discount_pct": discount_pct,
+        "hours": hours,
+        "requires_smart_meter": requires_smart_meter
+    })
+
+def test_segment_stats_summary():
+    segment = SegmentStats()
+    for discount in [5, 20, 10, 10]:
+        segment.add(discount)
+    assert segment.count == 4
+    assert segment.mean == pytest.approx(11.25)
+    assert segment.percentile(50) == 10
+    assert segment.percentile(100) == 20
+    assert segment.percentile(0) == 5
+    assert segment.better_than(20) == 75.0
+    assert segment.better_than(10) == 25.0
+    assert segment.better_than(12) == 75.0
+    assert segment.count_above(10) == 1
+
+def test_segment_stats_from_discounts_match_incremental_adds():
+    discounts = [5, 20, 10, 10, 7.5]
+    incremental = SegmentStats()
+    for discount in discounts:
+        incremental.add(discount)
+    bulk = SegmentStats(discounts)
+    assert (bulk.count, bulk.mean, bulk._sorted) == (incremental.count, incremental.mean, incremental._sorted)
+    assert [bulk.better_than(d) for d in discounts] == [incremental.better_than(d) for d in discounts]
+
+def test_empty_segment():
+    segment = SegmentStats()
+    assert segment.mean == 0.0
+    assert segment.better_than(10) == 0.0
+    with pytest.raises(ValueError):
+        segment.percentile(50)
+
+def test_preference_keys_follow_eligibility():
+    keys = set(preference_keys(_plan("HOT", 20, [23, 7], requires_smart_meter=True)))
+    assert keys == {(True, (23, 7), HOT), (True, (23, 7), None)}
+    keys = set(preference_keys(_plan("HOT", 5)))
+    assert keys == {(False, None, HOT), (False, None, None), (True, None, HOT), (True, None, None)}
+
+def test_catalogue_stats_segments_and_rank():
+    plans = [_plan("HOT", 5), _plan("Bezeq", 10), _plan("Bezeq", 20, [23, 7], requires_smart_meter=True)]
+    stats = CatalogueStats(plans)
+    assert stats.overall.mean == pytest.approx(35 / 3)
+    assert stats.segment((False, None, None)).count == 2
+    assert stats.segment((False, None, HOT)).mean == 5
+    assert stats.segment((False, (23, 7), None)) is None
+    assert [stats.rank(p) for p in plans] == [3, 2, 1]
+
+def test_catalogue_stats_incremental_add():
+    stats = CatalogueStats([_plan("HOT", 5)])
+    assert stats.segment((True, None, None)).better_than(5) == 0.0
+    stats.add(_plan("HOT", 3))
+    assert stats.segment((True, None, None)).better_than(5) == 50.0
+
+def test_windowed_segments_hold_overlap_scores():
+    plans = [_plan("HOT", 10, [17, 23], requires_smart_meter=True), _plan("HOT", 18, [14, 20], requires_smart_meter=True)]
+    stats = CatalogueStats(plans)
+    evening = stats.segment((True, (17, 23), None))
+    assert evening._sorted == [9.0, 10.0]
+    assert preference_score(plans[1], (17, 23)) == 9.0
+    assert preference_score(plans[1], (23, 7)) == 0.0
+    assert preference_score(plans[1], None) == 18
+    assert stats.overall._sorted == [10, 18]
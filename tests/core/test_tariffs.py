@@ -0,0 +1,103 @@
+from datetime import date
+import numpy as np
+import pytest
+from src.core.calculator import Provider, TariffRule, validate_plan
+from src.core.savings import SavingsEngine
+from src.core.tariffs import TariffCalendar, TariffSimulator, plan_rules
+
+def _plan(name, discount_pct, hours, rules=None):
+    data = {"name": name, "vendor": "Vendor", "discount_pct": discount_pct,
+            "hours": hours, "requires_smart_meter": True}
+    if rules is not None:
+        data["rules"] = rules
+    validate_plan(data)
+    return Provider(data)
+
+WEEKEND_PLAN = _plan("Weekend", 0, None, rules=[
+    {"discount_pct": 30, "days": ["fri", "sat"]},
+    {"discount_pct": 10, "hours": [23, 7]},
+])
+SUMMER_PLAN = _plan("Summer", 0, None, rules=[
+    {"discount_pct": 20, "months": [7, 8], "holidays": False},
+])
+
+def test_rules_are_parsed():
+    assert plan_rules(WEEKEND_PLAN) == (
+        TariffRule(30, days=frozenset({4, 5})),
+        TariffRule(10, hours=(23, 7)),
+    )
+    fixed = _plan("Fixed", 7, [7, 17])
+    assert fixed.rules == ()
+    assert plan_rules(fixed) == (TariffRule(7, (7, 17)),)
+
+@pytest.mark.parametrize("rule", [
+    {"discount_pct": 120},
+    {"discount_pct": 10, "days": ["someday"]},
+    {"discount_pct": 10, "months": [13]},
+    {"discount_pct": 10, "hours": [7]},
+    {"discount_pct": 10, "holidays": "yes"},
+])
+def test_invalid_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        _plan("Bad", 5, None, rules=[rule])
+
+def test_calendar():
+    calendar = TariffCalendar(2024, holidays=[date(2024, 4, 23), date(2025, 1, 1)])
+    assert len(calendar) == 366
+    # 2024-01-01 was a Monday
+    assert calendar.weekday[0] == 0
+    assert calendar.month[59] == 2 and calendar.month[60] == 3
+    assert calendar.holiday.sum() == 1
+
+def test_first_matching_rule_wins():
+    calendar = TariffCalendar(2025)
+    discounts = calendar.discounts(plan_rules(WEEKEND_PLAN)).reshape(-1, 24)
+    # 2025-01-03 was a Friday: the weekend rule covers the night hours too
+    assert np.allclose(discounts[2], 0.3)
+    assert np.allclose(discounts[1][[0, 6, 23]], 0.1)
+    assert np.allclose(discounts[1][7:23], 0.0)
+
+def test_quarter_hour_intervals_repeat_hourly_discounts():
+    calendar = TariffCalendar(2025)
+    hourly = calendar.discounts(plan_rules(WEEKEND_PLAN))
+    quarterly = calendar.discounts(plan_rules(WEEKEND_PLAN), intervals_per_hour=4)
+    assert len(quarterly) == 35040
+    assert np.array_equal(np.repeat(hourly, 4), quarterly)
+
+def test_plain_plans_match_savings_engine():
+    providers = [_plan("Fixed", 6, None), _plan("Day", 15, [7, 17]), _plan("Night", 20, [23, 7])]
+    series = np.random.default_rng(0).gamma(2.0, 0.3, size=8760)
+    simulator = TariffSimulator(providers, price_per_kwh=1.0)
+    expected = SavingsEngine(providers, price_per_kwh=1.0).savings(series)
+    assert np.allclose(simulator.savings(series, 2025), expected, rtol=1e-5)
+    assert np.allclose(simulator.bills(series, 2025), series.sum() - expected, rtol=1e-5)
+
+def test_holiday_and_season_rules():
+    simulator = TariffSimulator([SUMMER_PLAN], price_per_kwh=1.0, holidays=[date(2025, 7, 1)])
+    series = np.ones(8760)
+    # July and August have 62 days, one of them a holiday
+    assert simulator.savings(series, 2025)[0] == pytest.approx(61 * 24 * 0.2)
+
+def test_matrix_is_cached_per_year():
+    simulator = TariffSimulator([WEEKEND_PLAN, SUMMER_PLAN, WEEKEND_PLAN])
+    matrix = simulator.discount_matrix(2025, 4)
+    assert simulator.discount_matrix(2025, 4) is matrix
+    assert matrix.shape == (3, 35040)
+    assert np.array_equal(matrix[0], matrix[2])
+    assert simulator.discount_matrix(2024).shape == (3, 8784)
+
+def test_rank_by_bill():
+    simulator = TariffSimulator([_plan("Day", 15, [7, 17]), _plan("Night", 20, [23, 7]), WEEKEND_PLAN])
+    series = np.zeros((365, 24))
+    series[:, 12] = 1.0
+    ranked = simulator.rank(series.ravel(), 2025, top=2)
+    assert [p.name for p, _ in ranked] == ["Day", "Weekend"]
+    # 104 Fridays and Saturdays in 2025
+    assert ranked[1][1] == pytest.approx(simulator.price_per_kwh * (365 - 104 * 0.3))
+
+def test_series_must_cover_the_year():
+    simulator = TariffSimulator([WEEKEND_PLAN])
+    with pytest.raises(ValueError):
+        simulator.savings(np.ones(8760), 2024)
+    with pytest.raises(ValueError):
+        simulator.savings(np.ones(8760 * 3), 2025)
@@ -0,0 +1,42 @@
+import csv
+import io
+import pytest
+from src.core.calculator import ProviderCalculator
+from src.utils.batch_cli import main, parse_preferences, run_batch
+
+INPUT_CSV = (
+    "customer_id,has_smart_meter,discount_type,time_preference,vendor\n"
+    "1,yes,variable,night,none\n"
+    "2,no,fixed,,hot\n"
+    "3,yes,variable,day,amisragaz\n"
+)
+
+@pytest.fixture
+def calculator():
+    return ProviderCalculator()
+
+def test_parse_preferences_defaults():
+    prefs = parse_preferences({"has_smart_meter": "TRUE", "discount_type": "", "time_preference": "", "vendor": ""})
+    assert prefs == {"has_smart_meter": True, "discount_type": "fixed", "time_preference": None, "vendor": "none"}
+
+def test_run_batch_appends_recommendations(calculator):
+    out = io.StringIO()
+    count = run_batch(io.StringIO(INPUT_CSV), out, calculator)
+    assert count == 3
+
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [r["customer_id"] for r in rows] == ["1", "2", "3"]
+    assert (rows[0]["recommended_vendor"], rows[0]["recommended_plan"]) == ("Bezeq", "Night")
+    assert (rows[1]["recommended_vendor"], rows[1]["recommended_plan"]) == ("HOT", "Hot")
+    assert rows[2]["recommended_plan"] == ""
+
+def test_run_batch_requires_preference_columns(calculator):
+    with pytest.raises(ValueError, match="vendor"):
+        run_batch(io.StringIO("has_smart_meter,discount_type,time_preference\n"), io.StringIO(), calculator)
+
+def test_main_reads_and_writes_files(tmp_path):
+    infile = tmp_path / "in.csv"
+    outfile = tmp_path / "out.csv"
+    infile.write_text(INPUT_CSV, encoding="utf-8")
+    main([str(infile), str(outfile)])
+    assert "recommended_plan" in outfile.read_text(encoding="utf-8").splitlines()[0]
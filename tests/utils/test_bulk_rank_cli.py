@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+from src.core.bulk_ranking import read_results
+from src.utils.bulk_rank_cli import main, plan_matrix
+
+def test_main_ranks_profiles(tmp_path, capsys):
+    profiles = np.zeros((3, 24), dtype=np.float32)
+    profiles[:, 23] = 1.0
+    np.save(tmp_path / "profiles.npy", profiles)
+    main([str(tmp_path / "profiles.npy"), str(tmp_path / "out"), "--top", "1", "--workers", "1"])
+
+    plans, _ = read_results(tmp_path / "out")
+    assert plans.shape == (3, 1)
+    assert "Ranked 3 of 3 customers" in capsys.readouterr().err
+
+def test_year_profiles_need_a_matching_year():
+    with pytest.raises(ValueError, match="--year"):
+        plan_matrix([], 8760)
+    with pytest.raises(ValueError):
+        plan_matrix([], 8760, year=2024)
+    assert plan_matrix([], 35040, year=2025).shape == (0, 35040)
@@ -0,0 +1,13 @@
+import numpy as np
+from src.core.meter_data import MeterStore
+from src.utils.ingest_cli import main
+
+def test_main_ingests_each_export(tmp_path, capsys):
+    for customer in ("a", "b"):
+        (tmp_path / f"{customer}.csv").write_text("01/01/2025,10:00,1.25\n", encoding="utf-8")
+    main([str(tmp_path / "store"), str(tmp_path / "a.csv"), str(tmp_path / "b.csv")])
+
+    store = MeterStore(tmp_path / "store")
+    assert store.customers() == ["a", "b"]
+    assert np.flatnonzero(store.load("b")[1]).tolist() == [10]
+    assert "rows/s" in capsys.readouterr().err